@@ -0,0 +1,197 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from crawl_base import CrawlerBase
+from crawl_output import COOKIE_FILE, video_key
+
+API_BASE = 'https://api.bilibili.com'
+FEED_PATH = '/x/web-interface/index/top/feed/rcmd'
+NAV_PATH = '/x/web-interface/nav'
+
+DEFAULT_HEADERS = {
+    'User-Agent': ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                   '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'),
+    'Referer': 'https://www.bilibili.com/',
+    'Origin': 'https://www.bilibili.com'
+}
+
+
+def load_cookies(path=COOKIE_FILE):
+    """读取导出的Cookie，支持 Selenium get_cookies() 的列表格式和 {名称: 值} 字典格式"""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, list):
+        return {cookie['name']: cookie['value'] for cookie in data if 'name' in cookie}
+    return dict(data)
+
+
+def format_play_count(view):
+    """将播放量数值格式化为与网页一致的字符串，例如 "12.3万" """
+    if view is None:
+        return '未知'
+    try:
+        view = int(view)
+    except (TypeError, ValueError):
+        return str(view)
+    if view >= 10000:
+        return f"{view / 10000:.1f}万"
+    return str(view)
+
+
+def parse_feed_item(item):
+    """将推荐接口返回的条目转换为与浏览器爬取一致的 video_info，广告和非视频条目返回None"""
+    bvid = item.get('bvid')
+    if item.get('goto') != 'av' or not bvid:
+        return None
+    owner = item.get('owner') or {}
+    stat = item.get('stat') or {}
+    mid = owner.get('mid')
+    return {
+        "title": item.get('title'),
+        "bvid": bvid,
+        "thumbnail": item.get('pic'),
+        "link": item.get('uri') or f"https://www.bilibili.com/video/{bvid}",
+        "up_name": owner.get('name') or "未知",
+        "up_link": f"https://space.bilibili.com/{mid}" if mid else None,
+        "play_count": format_play_count(stat.get('view'))
+    }
+
+
+class HttpTransport:
+    """带连接池和重试的HTTP传输层
+
+    base_url 可以指向本地的桩服务器以便测试。
+    """
+
+    def __init__(self, base_url=API_BASE, cookies=None, pool_size=8, retries=3, backoff=0.5, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET'])
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update(DEFAULT_HEADERS)
+        if cookies:
+            self.session.cookies.update(cookies)
+
+    def get_json(self, path, params=None):
+        """发送GET请求并解析JSON，接口返回错误码时抛出异常"""
+        response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if data.get('code', 0) != 0:
+            raise Exception(f"接口返回错误: {data.get('code')} {data.get('message', '')}")
+        return data.get('data') or {}
+
+    def close(self):
+        self.session.close()
+
+
+class BilibiliFeed(CrawlerBase):
+    """不启动浏览器、直接请求首页推荐接口的爬取后端
+
+    使用此前登录导出的Cookie，输出与浏览器爬取相同的 video_info 记录和状态消息。
+    只依赖 requests，不导入selenium。
+    """
+
+    def __init__(self, num=100, status_queue=None, aggregator=None, output_format='jsonl', snapshot_every=50,
+                 cookie_file=COOKIE_FILE, transport=None, concurrency=4, page_size=12, max_pages=None, page_interval=0.2,
+                 output_dir=None, crawl_session=None):
+        self.cookie_file = cookie_file
+        self._init_crawl_state(num, status_queue, aggregator, output_format, snapshot_every, output_dir, crawl_session)
+        self.transport = transport or HttpTransport(cookies=load_cookies(cookie_file), pool_size=concurrency)
+        self.concurrency = concurrency
+        self.page_size = page_size
+        # 默认最多请求的页数，防止接口持续返回重复内容时无限请求
+        self.max_pages = max_pages or max(10, num // page_size * 5)
+        self.page_interval = page_interval
+
+    def teardown_method(self, method):
+        self.transport.close()
+
+    def check_login(self):
+        """通过导航接口检查Cookie是否处于登录状态"""
+        try:
+            return bool(self.transport.get_json(NAV_PATH).get('isLogin'))
+        except Exception as e:
+            print(f"登录检测出错: {str(e)}")
+            return False
+
+    def fetch_page(self, index):
+        """请求一页推荐数据"""
+        params = {
+            'fresh_type': 4,
+            'version': 1,
+            'ps': self.page_size,
+            'fresh_idx': index,
+            'fresh_idx_1h': index,
+            'brush': index
+        }
+        return self.transport.get_json(FEED_PATH, params).get('item') or []
+
+    def iter_pages(self):
+        """并发请求推荐页，按页序逐页产出条目列表"""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for start in range(1, self.max_pages + 1, self.concurrency):
+                indexes = range(start, min(start + self.concurrency, self.max_pages + 1))
+                futures = [executor.submit(self.fetch_page, index) for index in indexes]
+                for future in futures:
+                    try:
+                        yield future.result()
+                    except Exception as e:
+                        self.send_status({"type": "message", "data": f"请求推荐数据出错: {str(e)}"})
+                time.sleep(self.page_interval)
+
+    def bilibili(self):
+        self.send_status({"type": "message", "data": "开始爬取..."})
+        if self.check_login():
+            self.send_status({"type": "message", "data": "已使用保存的Cookie登录"})
+        else:
+            self.send_status({"type": "message", "data": "未检测到有效的登录Cookie，将获取未登录状态下的推荐"})
+
+        videos_info = []
+        processed_ids = set()
+        self.send_status({"type": "message", "data": "开始收集视频信息..."})
+        writer = self._open_writer()
+
+        try:
+            for items in self.iter_pages():
+                for item in items:
+                    video_info = parse_feed_item(item)
+                    if video_info is None:
+                        print(f"过滤掉非视频条目: {item.get('goto')}")
+                        continue
+                    if not video_info["title"] or video_key(video_info) in processed_ids:
+                        continue
+                    self._accept_video(video_info, videos_info, processed_ids, writer)
+                    if len(videos_info) >= self.num:
+                        break
+
+                self._save_progress(videos_info, writer)
+                if len(videos_info) >= self.num:
+                    self.send_status({"type": "message", "data": "已达到"+str(self.num)+"个有效视频，停止收集"})
+                    break
+        except Exception as e:
+            self.send_status({"type": "message", "data": f"爬取过程出错: {str(e)}"})
+
+        self._finish_output(videos_info, writer)
+
+
+if __name__ == "__main__":
+    spider = BilibiliFeed()
+    try:
+        spider.bilibili()
+    finally:
+        spider.teardown_method(None)
@@ -1,6 +1,7 @@
 # Generated by Selenium IDE
 import time
 import json
+import os
 import re
 from selenium import webdriver
 from selenium.webdriver.common.by import By
@@ -10,26 +11,63 @@ from selenium.webdriver.support.wait import WebDriverWait
 from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.common.desired_capabilities import DesiredCapabilities
 from queue import Queue
+from crawl_base import CrawlerBase
+from crawl_output import COOKIE_FILE, parse_bvid, video_key
 
-class Bilibili():
-    def __init__(self, num=100, status_queue=None):
-        # 無頭模式
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.add_argument('--headless')
-        self.driver = webdriver.Chrome(options=chrome_options)
+# 在页面内一次性提取所有未处理的推荐卡片，并在同一次调用中标记为已处理，
+# 避免对每张卡片发起多次 WebDriver 请求
+EXTRACT_CARDS_SCRIPT = """
+const cards = document.querySelectorAll(".bili-video-card.is-rcmd:not([data-processed='true'])");
+const pick = (card, selector) => card.querySelector(selector);
+const href = el => (el && el.hasAttribute('href')) ? el.href : null;
+const results = [];
+cards.forEach(card => {
+    card.setAttribute('data-processed', 'true');
+    const titleEl = pick(card, '.bili-video-card__info--tit');
+    const linkEl = pick(card, '.bili-video-card__wrap a');
+    const coverEl = pick(card, '.bili-video-card__cover img');
+    const ownerEl = pick(card, '.bili-video-card__info--owner');
+    const authorEl = pick(card, '.bili-video-card__info--author');
+    const statsEl = pick(card, '.bili-video-card__stats--item');
+    results.push({
+        title: titleEl ? titleEl.getAttribute('title') : null,
+        link: href(linkEl),
+        thumbnail: coverEl ? coverEl.src : null,
+        up_name: authorEl ? authorEl.innerText.trim() : null,
+        up_link: href(ownerEl),
+        play_count: statsEl ? statsEl.innerText.trim() : null
+    });
+});
+return results;
+"""
+
+class Bilibili(CrawlerBase):
+    def __init__(self, num=100, status_queue=None, aggregator=None, output_format='jsonl', snapshot_every=50, driver=None,
+                 output_dir=None, cookie_file=COOKIE_FILE, crawl_session=None):
+        # 传入的浏览器（例如从 DriverPool 借出）由调用方负责关闭
+        self._owns_driver = driver is None
+        if driver is None:
+            # 無頭模式
+            chrome_options = webdriver.ChromeOptions()
+            chrome_options.add_argument('--headless')
+            driver = webdriver.Chrome(options=chrome_options)
+        self.driver = driver
         self.vars = {}
-        self.status_queue = status_queue
-        self.num = num
-    
+        self.cookie_file = cookie_file
+        self._init_crawl_state(num, status_queue, aggregator, output_format, snapshot_every, output_dir, crawl_session)
+
     def teardown_method(self, method):
-        self.driver.quit()
-    
-    def send_status(self, message):
-        """发送状态消息"""
-        if self.status_queue:
-            self.status_queue.put(message)
-        print(message if isinstance(message, str) else message.get('data', ''))
+        if self._owns_driver:
+            self.driver.quit()
     
+    def save_cookies(self, path=None):
+        """导出登录后的Cookie，供接口爬取模式使用"""
+        try:
+            with open(path or self.cookie_file, 'w', encoding='utf-8') as f:
+                json.dump(self.driver.get_cookies(), f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            print(f"保存Cookie失败: {str(e)}")
+
     def check_login(self):
         """检查是否已登录"""
         try:
@@ -85,6 +123,7 @@ class Bilibili():
                     # 检查是否登录成功
                     if self.check_login():
                         self.send_status({"type": "message", "data": "登录成功！"})
+                        self.save_cookies()
                         # 额外等待确保登录状态完全加载
                         time.sleep(0.3)
                         # 刷新页面
@@ -103,7 +142,7 @@ class Bilibili():
             raise Exception("登录失败：未找到二维码")
     
     def scroll_and_collect(self):
-        """边滚动边收集数据，使用更快的滚动方式"""
+        """边滚动边收集数据，使用更快的滚动方式，每次产出一批卡片数据（字典列表）"""
         try:
             window_height = self.driver.execute_script("return window.innerHeight")
             scroll_pause_time = 0.1
@@ -129,15 +168,10 @@ class Bilibili():
                 current_position += scroll_step
                 new_height = self.driver.execute_script(scroll_script, current_position)
                 
-                video_cards = self.driver.find_elements(By.CSS_SELECTOR, ".bili-video-card.is-rcmd:not([data-processed='true'])")
+                # 一次脚本调用取出所有未处理卡片的数据并标记为已处理
+                video_cards = self.driver.execute_script(EXTRACT_CARDS_SCRIPT)
                 
                 if video_cards:
-                    self.driver.execute_script("""
-                        arguments[0].forEach(card => {
-                            card.setAttribute('data-processed', 'true');
-                        });
-                    """, video_cards)
-                    
                     yield video_cards
                     no_new_content_count = 0
                 else:
@@ -170,75 +204,51 @@ class Bilibili():
                 raise Exception("登录失败，程序退出")
         
         videos_info = []
-        processed_titles = set()
+        # 按BV号去重，标题相同的不同视频（如重新上传）不会被误删
+        processed_ids = set()
         self.send_status({"type": "message", "data": "开始收集视频信息..."})
+        writer = self._open_writer()
         
         try:
             for video_cards in self.scroll_and_collect():
-                new_videos = []
                 for card in video_cards:
                     try:
-                        title = card.find_element(By.CSS_SELECTOR, ".bili-video-card__info--tit").get_attribute("title")
-                        link = card.find_element(By.CSS_SELECTOR, ".bili-video-card__wrap a").get_attribute("href")
+                        title = card.get("title")
+                        link = card.get("link")
+                        if not title:
+                            print("警告: 视频卡片缺少标题，跳过此卡片")
+                            continue
                   
-                        if title not in processed_titles:
+                        if video_key({"title": title, "link": link}) not in processed_ids:
                             if link is None:
                                 print(f"警告: 视频 '{title}' 的链接为None，跳过此视频")
                                 continue
+                            # 过滤掉广告链接
+                            if link.startswith("https://cm.bilibili.com"):
+                                print(f"过滤掉广告视频: {title}")
+                                continue
                             
-                            # 获取UP主信息和主页链接
-                            up_element = card.find_element(By.CSS_SELECTOR, ".bili-video-card__info--owner")
-                            up_link = up_element.get_attribute("href") if up_element else None
-                            up_name = card.find_element(By.CSS_SELECTOR, ".bili-video-card__info--author").text if card.find_elements(By.CSS_SELECTOR, ".bili-video-card__info--author") else "未知"
-                            print(f"作者链接：{up_link}")
+                            print(f"作者链接：{card.get('up_link')}")
                             video_info = {
                                 "title": title,
-                                "thumbnail": card.find_element(By.CSS_SELECTOR, ".bili-video-card__cover img").get_attribute("src"),
+                                "bvid": parse_bvid(link),
+                                "thumbnail": card.get("thumbnail"),
                                 "link": link,
-                                "up_name": up_name,
-                                "up_link": up_link,  # 添加UP主主页链接
-                                "play_count": card.find_element(By.CSS_SELECTOR, ".bili-video-card__stats--item").text if card.find_elements(By.CSS_SELECTOR, ".bili-video-card__stats--item") else "未知"
+                                "up_name": card.get("up_name") or "未知",
+                                "up_link": card.get("up_link"),  # 添加UP主主页链接
+                                "play_count": card.get("play_count") or "未知"
                             }
-                            new_videos.append(video_info)
-                            
-                            # 每次添加新视频后，立即保存当前数据
-                            valid_videos = [video for video in videos_info if video["link"] is not None and not video["link"].startswith("https://cm.bilibili.com")]
-                            with open("bilibili_videos.json", "w", encoding="utf-8") as f:
-                                json.dump(valid_videos, f, ensure_ascii=False, indent=2)
-                                
-                            # 发送进度更新
-                            self.send_status({
-                                "type": "progress",
-                                "data": {
-                                    "title": title,
-                                    "up_name": up_name,
-                                    "current": len(valid_videos),
-                                    "total": self.num,
-                                    "percentage": round(len(valid_videos) / self.num * 100, 1)
-                                }
-                            })
+                            self._accept_video(video_info, videos_info, processed_ids, writer)
                             
                     except Exception as e:
                         self.send_status({"type": "message", "data": f"处理视频卡片出错: {str(e)}"})
                         continue
                 
-                # 过滤掉广告链接
-                filtered_videos = []
-                for video in new_videos:
-                    if video["link"] is None:
-                        print(f"警告: 发现link为None的视频，标题为: {video['title']}")
-                        continue
-                    if not video["link"].startswith("https://cm.bilibili.com"):
-                        filtered_videos.append(video)
-                    else:
-                        print(f"过滤掉广告视频: {video['title']}")
-                
-                # 批量更新处理过的标题
-                processed_titles.update(video["title"] for video in filtered_videos)
-                videos_info.extend(filtered_videos)
+                # 每批卡片处理完后保存一次数据
+                self._save_progress(videos_info, writer)
                 
                 # 更新进度信息
-                valid_count = len([v for v in videos_info if not v["link"].startswith("https://cm.bilibili.com")])
+                valid_count = len(videos_info)
                 self.send_status({
                     "type": "progress",
                     "data": {
@@ -255,17 +265,7 @@ class Bilibili():
         except Exception as e:
             self.send_status({"type": "message", "data": f"爬取过程出错: {str(e)}"})
         
-        # 最后一次保存（可以删除，因为已经在循环中实时保存了）
-        try:
-            valid_videos = [video for video in videos_info if video["link"] is not None and not video["link"].startswith("https://cm.bilibili.com")]
-            
-            with open("bilibili_videos.json", "w", encoding="utf-8") as f:
-                json.dump(valid_videos[:self.num], f, ensure_ascii=False, indent=2)
-            
-            self.send_status({"type": "message", "data": f"爬取完成！成功收集{len(valid_videos)}个有效视频"})
-            self.send_status({"type": "message", "data": "数据已保存到 bilibili_videos.json"})
-        except Exception as e:
-            self.send_status({"type": "message", "data": f"保存数据时出错: {str(e)}"})
+        self._finish_output(videos_info, writer)
 
 # 添加以下代码来运行测试
 if __name__ == "__main__":
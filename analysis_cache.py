@@ -0,0 +1,152 @@
+import json
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# SQLite 单条语句的参数个数有限，批量查询时分批进行
+_QUERY_BATCH = 500
+# 每写入这么多条结果执行一次保留策略
+PRUNE_EVERY = 5000
+
+
+def normalize_text(text):
+    """标题归一化：全角转半角、去掉首尾空白、合并连续空白并转小写"""
+    text = unicodedata.normalize('NFKC', text or '')
+    return re.sub(r'\s+', ' ', text).strip().lower()
+
+
+class AnalysisCache:
+    """单个视频分析结果的持久化缓存
+
+    结果保存在SQLite中，并在内存中保留最近使用的一部分（LRU）。
+    键由归一化后的标题、UP主名称以及模型/关键词表的版本指纹组成，
+    模型或关键词表变化后旧结果自动失效。
+    失效的结果不会再被读到，打开时和每写入 PRUNE_EVERY 条后删除超过 max_age_days 天未写入的结果，
+    并在总条数超过 max_rows 时删除最早写入的，数据库大小保持有界。
+    """
+
+    def __init__(self, db_path='analysis_cache.db', max_memory_items=5000, max_rows=500000, max_age_days=90):
+        self.db_path = db_path
+        self.max_memory_items = max_memory_items
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+        self._written = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS video_analysis (
+                    key TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    keywords TEXT NOT NULL,
+                    scores TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    topic TEXT,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_video_analysis_version ON video_analysis (version)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_video_analysis_updated ON video_analysis (updated_at)")
+            self._conn.commit()
+        self.prune()
+
+    @staticmethod
+    def make_key(title, up_name, version):
+        """生成缓存键"""
+        raw = f"{version}\x00{normalize_text(title)}\x00{normalize_text(up_name)}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _remember(self, key, record):
+        self._memory[key] = record
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        """批量查询缓存，返回 {键: 结果}，未命中的键不出现在结果中"""
+        found = {}
+        missing = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+
+            for start in range(0, len(missing), _QUERY_BATCH):
+                batch = missing[start:start + _QUERY_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, keywords, scores, category, topic FROM video_analysis "
+                    f"WHERE key IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for key, keywords, scores, category, topic in rows:
+                    record = {
+                        "keywords": json.loads(keywords),
+                        "scores": json.loads(scores),
+                        "category": category,
+                        "topic": topic
+                    }
+                    found[key] = record
+                    self._remember(key, record)
+        return found
+
+    def put_many(self, records, version):
+        """批量写入 {键: 结果}"""
+        if not records:
+            return
+        now = time.time()
+        rows = [
+            (key, version, json.dumps(record["keywords"], ensure_ascii=False),
+             json.dumps(record["scores"], ensure_ascii=False), record["category"], record["topic"], now)
+            for key, record in records.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO video_analysis "
+                "(key, version, keywords, scores, category, topic, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            for key, record in records.items():
+                self._remember(key, record)
+            self._written += len(rows)
+            need_prune = self._written >= PRUNE_EVERY
+        if need_prune:
+            self.prune()
+
+    def prune(self, keep_version=None):
+        """按保存时间和总条数清理旧结果，给出 keep_version 时还删除其他版本的结果，返回删除的条数"""
+        with self._lock:
+            self._written = 0
+            cutoff = time.time() - self.max_age_days * 86400
+            deleted = self._conn.execute("DELETE FROM video_analysis WHERE updated_at < ?", (cutoff,)).rowcount
+            if keep_version is not None:
+                deleted += self._conn.execute("DELETE FROM video_analysis WHERE version != ?",
+                                              (keep_version,)).rowcount
+            deleted += self._conn.execute(
+                "DELETE FROM video_analysis WHERE rowid IN "
+                "(SELECT rowid FROM video_analysis ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,)
+            ).rowcount
+            self._conn.commit()
+            if deleted:
+                self._memory.clear()
+            return deleted
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM video_analysis")
+            self._conn.commit()
+            self._memory.clear()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
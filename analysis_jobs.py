@@ -0,0 +1,100 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AnalysisJobs:
+    """后台分析任务队列
+
+    分析在有界的线程池中运行，每个任务有独立的ID，可通过ID等待或查询结果。
+    同一数据集（key）的请求会合并：数据快照相同且任务尚未结束时共用同一个任务；
+    快照更新时取消尚未开始的旧任务，只分析最新的数据。
+    """
+
+    def __init__(self, max_workers=2, max_finished=100):
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis')
+        self._lock = threading.Lock()
+        self.jobs = OrderedDict()
+        # 每个数据集最近一次提交的任务
+        self._latest = {}
+
+    def submit(self, key, snapshot, func):
+        """提交分析任务，返回任务ID；可与同一数据集的已有任务合并"""
+        with self._lock:
+            latest_id = self._latest.get(key)
+            if latest_id in self.jobs:
+                latest = self.jobs[latest_id]
+                if latest['snapshot'] == snapshot and latest['state'] in ('pending', 'running'):
+                    return latest_id
+                if latest['state'] == 'pending' and latest['future'].cancel():
+                    latest['state'] = 'superseded'
+                    latest['finished_at'] = time.time()
+                    latest['done'].set()
+
+            job_id = uuid.uuid4().hex[:12]
+            job = {
+                'key': key,
+                'snapshot': snapshot,
+                'state': 'pending',
+                'submitted_at': time.time(),
+                'finished_at': None,
+                'result': None,
+                'done': threading.Event()
+            }
+            self.jobs[job_id] = job
+            self._latest[key] = job_id
+            job['future'] = self._executor.submit(self._run, job_id, func)
+            self._trim()
+        return job_id
+
+    def _run(self, job_id, func):
+        job = self.jobs[job_id]
+        with self._lock:
+            job['state'] = 'running'
+        try:
+            result = func()
+            state = 'done'
+        except Exception as e:
+            result = {"status": "error", "message": f"分析数据时出错: {str(e)}"}
+            state = 'error'
+        with self._lock:
+            job['result'] = result
+            job['state'] = state
+            job['finished_at'] = time.time()
+        job['done'].set()
+
+    def _trim(self):
+        """只保留最近的 max_finished 个已结束任务"""
+        finished = [job_id for job_id, job in self.jobs.items() if job['done'].is_set()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self.jobs[job_id]
+
+    def wait(self, job_id, timeout=None):
+        """等待任务结束（最多 timeout 秒），返回任务信息；任务不存在时返回None"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job['done'].wait(timeout)
+        return self.info(job_id)
+
+    def info(self, job_id):
+        """任务的状态和结果"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return {
+                'job_id': job_id,
+                'key': job['key'],
+                'state': job['state'],
+                'submitted_at': job['submitted_at'],
+                'finished_at': job['finished_at'],
+                'superseded_by': self._latest.get(job['key']) if job['state'] == 'superseded' else None,
+                'result': job['result']
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
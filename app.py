@@ -1,11 +1,22 @@
-from flask import Flask, render_template, jsonify, request, send_file
-from BilibiliSpider import Bilibili
-from bilibili_analyzer import BilibiliAnalyzer
+from flask import Flask, render_template, jsonify, request, send_file, Response, stream_with_context
+from driver_pool import DriverPool
+from crawl_orchestrator import CrawlOrchestrator
+from bilibili_analyzer import BilibiliAnalyzer, analysis_version
+from analysis_cache import AnalysisCache
+from analysis_jobs import AnalysisJobs
+from profile_cache import ProfileCache
+from profile_aggregator import ProfileAggregator
+from crawl_output import VIDEOS_JSON, VIDEOS_JSONL, latest_videos_path, parse_videos, read_videos
+from crawl_store import DEFAULT_ACCOUNT, CrawlSession, CrawlStore, category_drift, parse_time
+from event_stream import EventBroker
+from message_log import MessageLog
+from keyword_extraction import prepare_jieba
+from warmup import Warmup
 import json
 import threading
 import queue
 import os
-from gensim.models import KeyedVectors
+from vector_store import DEFAULT_VEC_FILE, load_word_vectors as load_vector_store
 
 app = Flask(__name__, static_url_path='')
 
@@ -13,76 +24,127 @@ app = Flask(__name__, static_url_path='')
 status_queue = queue.Queue()
 is_crawling = False
 
-# 用于存储历史消息
-message_history = []
-
 # 全局变量存储词向量模型
+WORD_VECTORS_FILE = DEFAULT_VEC_FILE
 word_vectors = None
 model_loading_error = None
 
+# 单个视频分析结果的持久化缓存，实时分析时只需计算新增的视频
+analysis_cache = AnalysisCache('analysis_cache.db')
+
+# 完整分析结果的缓存，数据文件和分析配置不变时直接返回之前的画像
+profile_cache = ProfileCache('profile_cache')
+
+# 全部爬取历史，用于按时间段/账号生成画像和比较画像变化；清除数据时不会删除
+crawl_store = CrawlStore()
+
+# 后台分析任务队列，同一数据集的分析请求会合并
+analysis_jobs = AnalysisJobs(max_workers=int(os.environ.get('BILI_ANALYSIS_WORKERS', 2)))
+
+# 常驻浏览器池，在多次爬取之间复用浏览器和登录状态
+driver_pool = DriverPool(size=int(os.environ.get('BILI_DRIVER_POOL_SIZE', 1)))
+
+def warm_driver_pool():
+    """预热浏览器，使首次爬取无需等待浏览器冷启动"""
+    if os.environ.get('BILI_WARM_DRIVERS', '1') == '1':
+        driver_pool.warm()
+
+# 多账号并行爬取调度器，首次使用时创建
+crawl_orchestrator = None
+orchestrator_lock = threading.Lock()
+
+def get_orchestrator():
+    global crawl_orchestrator
+    with orchestrator_lock:
+        if crawl_orchestrator is None:
+            crawl_orchestrator = CrawlOrchestrator()
+        return crawl_orchestrator
+
+# 当前爬取任务的增量画像聚合器，爬虫每接受一个视频就推送进去
+profile_aggregator = None
+
 def load_word_vectors():
     """加载词向量模型的函数"""
     global word_vectors, model_loading_error
     try:
         print("开始加载词向量模型...")
-        word_vectors = KeyedVectors.load_word2vec_format('wiki.zh.vec')
+        # 使用内存映射的二进制缓存，首次运行时自动从 .vec 转换
+        word_vectors = load_vector_store(WORD_VECTORS_FILE)
         print("词向量模型加载完成")
     except Exception as e:
         model_loading_error = str(e)
         print(f"词向量模型加载失败: {e}")
+        raise
 
-# 在后台线程中加载词向量模型
-loading_thread = threading.Thread(target=load_word_vectors)
-loading_thread.start()
+# 启动预热：jieba词典、词向量模型和浏览器池分别在后台线程中加载，
+# 通过环境变量 BILI_WARMUP 选择预热的组件，其余组件在首次使用时加载
+warmup = Warmup()
+warmup.register('jieba', prepare_jieba)
+warmup.register('vectors', load_word_vectors)
+warmup.register('driver', warm_driver_pool)
+warmup.start()
 
-def save_messages():
-    """保存消息到文件"""
-    with open('message_history.json', 'w', encoding='utf-8') as f:
-        json.dump(message_history, f, ensure_ascii=False, indent=2)
+@app.before_request
+def record_first_request():
+    warmup.mark('first_request')
 
-def load_messages():
-    """从文件加载消息"""
-    global message_history
-    try:
-        if os.path.exists('message_history.json'):
-            with open('message_history.json', 'r', encoding='utf-8') as f:
-                message_history = json.load(f)
-    except Exception as e:
-        print(f"加载历史消息出错: {e}")
-        message_history = []
+# 追加写入的历史消息日志，首次运行时导入旧版 message_history.json
+message_log = MessageLog('message_log.db', blob_dir='message_blobs')
+last_seq = message_log.import_legacy('message_history.json', message_log.last_seq)
+
+# 状态消息广播器：后台线程消费 status_queue，写入历史日志并通过 /events 以SSE推送给所有客户端
+# 断线太久或服务重启后续传的消息从历史日志补发
+event_broker = EventBroker(status_queue, on_events=message_log.append_many, start_seq=last_seq,
+                           history=message_log)
+
+def recent_messages(limit=200):
+    """页面恢复显示所需的最近消息，另外附上最新的分析结果"""
+    events = message_log.tail(limit, skip_types=('qr_code', 'analysis_result'))
+    latest_analysis = message_log.latest('analysis_result')
+    if latest_analysis:
+        events.append(latest_analysis)
+        events.sort(key=lambda event: event[0])
+    return [message for _, message in events]
 
 @app.route('/model_status')
 def model_status():
-    """检查词向量模型加载状态"""
+    """检查词向量模型加载状态，同时返回各预热组件的状态和启动耗时指标"""
     if model_loading_error:
-        return jsonify({
+        result = {
             "status": "error",
             "message": f"词向量模型加载失败: {model_loading_error}"
-        })
+        }
+    elif word_vectors is None and warmup.components['vectors']['state'] == 'skipped':
+        result = {
+            "status": "idle",
+            "message": "词向量模型将在首次分析时加载"
+        }
     elif word_vectors is None:
-        return jsonify({
+        result = {
             "status": "loading",
             "message": "词向量模型正在加载中..."
-        })
+        }
     else:
-        return jsonify({
+        result = {
             "status": "ready",
             "message": "词向量模型已加载完成"
-        })
+        }
+    result.update(warmup.status())
+    return jsonify(result)
 
 @app.route('/clear_data')
 def clear_data():
     """清除所有数据"""
-    global message_history
+    global profile_aggregator
     try:
-        # 清除消息历史
-        message_history = []
-        if os.path.exists('message_history.json'):
-            os.remove('message_history.json')
+        # 清除消息历史（内存中的最近消息和历史日志）
+        event_broker.clear()
             
-        # 清除爬取的数据
-        if os.path.exists('bilibili_videos.json'):
-            os.remove('bilibili_videos.json')
+        # 清除爬取的数据（爬取历史库保留，用于比较画像随时间的变化）
+        profile_aggregator = None
+        for path in (VIDEOS_JSON, VIDEOS_JSONL):
+            if os.path.exists(path):
+                os.remove(path)
             
         return jsonify({
             "status": "success",
@@ -94,27 +156,56 @@ def clear_data():
             "message": f"清除数据时出错: {str(e)}"
         })
 
-def run_spider(num):
-    """运行爬虫的函数"""
-    global is_crawling
+def create_live_analyzer():
+    """创建用于逐个分析视频的分析器，词向量模型未就绪时返回None"""
+    if word_vectors is None:
+        return None
+    return BilibiliAnalyzer(json_file=None, word_vectors=word_vectors, cache=analysis_cache, store=crawl_store)
+
+def run_spider(num, backend='browser'):
+    """运行爬虫的函数，backend 为 browser（Selenium）或 http（直接请求推荐接口）"""
+    global is_crawling, profile_aggregator
     spider = None
+    driver = None
+    session = None
+    status = 'error'
     try:
         status_queue.put("开始运行爬虫...")
-        spider = Bilibili(num,status_queue=status_queue)
+        profile_aggregator = ProfileAggregator(create_live_analyzer(), status_queue=status_queue)
+        session = CrawlSession(crawl_store, DEFAULT_ACCOUNT, backend)
+        # 爬虫模块在首次爬取时才导入，接口爬取模式不导入selenium
+        if backend == 'http':
+            from BilibiliFeedSpider import BilibiliFeed
+            spider = BilibiliFeed(num, status_queue=status_queue, aggregator=profile_aggregator, crawl_session=session)
+        else:
+            from BilibiliSpider import Bilibili
+            # 从浏览器池借出已预热、保留登录状态的浏览器
+            driver = driver_pool.acquire(timeout=60)
+            spider = Bilibili(num, status_queue=status_queue, aggregator=profile_aggregator, driver=driver,
+                              crawl_session=session)
         spider.bilibili()
+        status = 'done'
         status_queue.put("爬虫运行完成！")
     except Exception as e:
         status_queue.put(f"爬虫出错: {str(e)}")
     finally:
+        if session:
+            try:
+                session.close(status)
+            except Exception as e:
+                print(f"写入爬取历史失败: {e}")
         if spider:
             spider.teardown_method(None)
+        if driver:
+            driver_pool.release(driver)
         is_crawling = False
 
 @app.route('/')
 def index():
     """主页路由"""
-    load_messages()  # 加载历史消息
-    return render_template('index.html', message_history=message_history)
+    # 先取序号再加载历史，宁可重复显示也不漏掉消息
+    last_event_id = event_broker.last_id
+    return render_template('index.html', message_history=recent_messages(), last_event_id=last_event_id)
 
 @app.route('/start_crawl')
 def start_crawl():
@@ -124,91 +215,232 @@ def start_crawl():
         is_crawling = True
         # 获取爬取数量参数，默认为100
         num = request.args.get('num', 100, type=int)
-        while not status_queue.empty():
-            status_queue.get()
+        # 爬取方式：browser 使用浏览器，http 使用已保存的Cookie直接请求推荐接口
+        backend = request.args.get('backend', 'browser')
         # 传递爬取数量参数
-        thread = threading.Thread(target=run_spider, args=(num,))
+        thread = threading.Thread(target=run_spider, args=(num, backend))
         thread.start()
         return jsonify({"status": "started"})
     return jsonify({"status": "already_running"})
 
+@app.route('/jobs', methods=['POST'])
+def submit_jobs():
+    """提交多账号爬取任务，请求体: {"accounts": [{"account": ..., "num": 100, "backend": "http", "cookie_file": ...}]}"""
+    try:
+        accounts = (request.json or {}).get('accounts', [])
+        if not accounts:
+            return jsonify({"status": "error", "message": "未指定账号"})
+        orchestrator = get_orchestrator()
+        job_ids = []
+        for item in accounts:
+            job_ids.append(orchestrator.submit(
+                item['account'],
+                num=int(item.get('num', 100)),
+                backend=item.get('backend', 'browser'),
+                cookie_file=item.get('cookie_file')
+            ))
+        backends = {item.get('backend', 'browser') for item in accounts}
+        return jsonify({"status": "started", "job_ids": job_ids,
+                        "max_workers": {backend: orchestrator.workers_for(backend) for backend in backends}})
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"提交爬取任务出错: {str(e)}"})
+
+@app.route('/jobs')
+def list_jobs():
+    """列出所有多账号爬取任务"""
+    if crawl_orchestrator is None:
+        return jsonify({"jobs": []})
+    return jsonify({"jobs": crawl_orchestrator.list_jobs()})
+
+@app.route('/jobs/<job_id>/status')
+def job_status(job_id):
+    """获取单个爬取任务的新消息和状态"""
+    result = crawl_orchestrator.poll(job_id) if crawl_orchestrator else None
+    if result is None:
+        return jsonify({"status": "error", "message": "任务不存在"}), 404
+    return jsonify(result)
+
+@app.route('/events')
+def events():
+    """以SSE推送状态消息，断线重连时根据 Last-Event-ID 补发错过的消息"""
+    last_id = request.headers.get('Last-Event-ID', type=int)
+    if last_id is None:
+        last_id = request.args.get('after', type=int)
+    response = Response(stream_with_context(event_broker.stream(last_id)), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # 关闭反向代理的缓冲，保证消息即时送达
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/history')
+def history():
+    """按序号分页读取历史消息，inline=0 时大消息只返回引用，可通过 /history/blobs/<digest> 获取"""
+    after = request.args.get('after', 0, type=int)
+    limit = min(request.args.get('limit', 100, type=int), 1000)
+    inline = request.args.get('inline', '1') != '0'
+    page = message_log.read_page(after, limit, inline=inline)
+    return jsonify({
+        "messages": [{"seq": seq, "message": message} for seq, message in page['events']],
+        "last_seq": page['last_seq'],
+        "has_more": page['has_more']
+    })
+
+@app.route('/history/blobs/<digest>')
+def history_blob(digest):
+    """读取单独存放的大消息"""
+    message = message_log.read_blob(digest) if digest.isalnum() else None
+    if message is None:
+        return jsonify({"status": "error", "message": "消息不存在或已被清理"}), 404
+    return jsonify(message)
+
 @app.route('/get_status')
 def get_status():
-    """获取爬虫状态的路由"""
-    messages = []
-    while not status_queue.empty():
-        message = status_queue.get()
-        messages.append(message)
-        message_history.append(message)  # 添加到历史记录
-    
-    if messages:  # 如果有新消息，保存历史记录
-        save_messages()
-        
+    """获取爬虫状态的路由，供不支持SSE的客户端轮询，after 为上次收到的最后一条消息序号"""
+    after = request.args.get('after', 0, type=int)
+    events = event_broker.events_after(after)
+    return jsonify({
+        "messages": [message for _, message in events],
+        "last_id": events[-1][0] if events else max(after, event_broker.last_id),
+        "is_crawling": is_crawling
+    })
+
+def file_snapshot(path):
+    """数据文件的快照标识，文件内容变化后标识随之变化"""
+    try:
+        stat = os.stat(path)
+        return (path, stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        return (path, None, None)
+
+def model_error_response():
+    """词向量模型未就绪时的错误响应，已就绪时返回None"""
+    if word_vectors is not None:
+        return None
+    # 未预热词向量模型时，在首次分析请求时开始加载
+    warmup.ensure('vectors')
+    if model_loading_error:
+        return jsonify({
+            "status": "error",
+            "message": f"词向量模型加载失败: {model_loading_error}"
+        })
     return jsonify({
-        "messages": messages,
-        "is_crawling": is_crawling,
-        "history": message_history  # 返回完整历史
+        "status": "error",
+        "message": "词向量模型正在加载中，请稍后再试"
     })
 
+def job_response(job_id, default_wait):
+    """等待分析任务结束并返回结果，wait 参数为最长等待秒数，超时后返回任务ID供稍后查询"""
+    job = analysis_jobs.wait(job_id, request.args.get('wait', default_wait, type=float))
+    if job is None:
+        return jsonify({"status": "error", "message": "分析任务不存在"}), 404
+    if job['state'] in ('done', 'error'):
+        return profile_response(dict(job['result'], job_id=job_id))
+    if job['state'] == 'superseded':
+        return jsonify({
+            "status": "superseded",
+            "message": "已有更新的分析请求",
+            "job_id": job_id,
+            "superseded_by": job['superseded_by']
+        })
+    return jsonify({"status": job['state'], "job_id": job_id})
+
+def profile_response(result):
+    """返回分析结果，带有缓存键时设置ETag，浏览器再次请求时可直接使用本地副本"""
+    response = jsonify(result)
+    if result.get('profile_key'):
+        response.set_etag(result['profile_key'])
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def run_full_analysis(videos_path):
+    """完整分析数据文件，在分析任务线程中运行，结果写入画像缓存
+
+    爬取时数据文件仍在增长，因此只读取一次，缓存键和分析都基于这次读到的内容
+    """
+    with open(videos_path, 'rb') as f:
+        data = f.read()
+    profile_key = profile_cache.make_key(profile_cache.content_hash(data), analysis_version(word_vectors))
+    videos = parse_videos(data, videos_path)
+    if not videos:
+        return {
+            "status": "error",
+            "message": "数据文件为空，请重新爬取数据"
+        }
+    # 创建分析器实例时传入已加载的词向量模型和视频
+    analyzer = BilibiliAnalyzer(None, status_queue=status_queue, word_vectors=word_vectors, cache=analysis_cache,
+                                store=crawl_store, videos=videos)
+    profile = analyzer.generate_user_profile()
+    warmup.mark('first_analysis')
+    profile_cache.put(profile_key, profile)
+    return {
+        "status": "success",
+        "data": profile,
+        "profile_key": profile_key
+    }
+
 @app.route('/analyze')
 def analyze():
-    """分析数据的路由"""
-    global word_vectors
+    """分析数据的路由，分析在后台任务中运行，默认等待结果返回"""
     try:
         # 检查数据文件是否存在
-        if not os.path.exists('bilibili_videos.json'):
+        videos_path = latest_videos_path()
+        if not os.path.exists(videos_path):
             return jsonify({
                 "status": "error",
                 "message": "未找到数据文件，请先爬取数据"
             })
 
         # 检查词向量模型是否已加载
-        if word_vectors is None:
-            if model_loading_error:
-                return jsonify({
-                    "status": "error",
-                    "message": f"词向量模型加载失败: {model_loading_error}"
-                })
-            return jsonify({
-                "status": "error",
-                "message": "词向量模型正在加载中，请稍后再试"
-            })
+        error = model_error_response()
+        if error is not None:
+            return error
 
-        # 读取数据文件
-        with open('bilibili_videos.json', 'r', encoding='utf-8') as f:
-            videos = json.load(f)
-            
-        if not videos:
-            return jsonify({
-                "status": "error",
-                "message": "数据文件为空，请重新爬取数据"
+        # 数据内容和分析配置都未变化时直接返回缓存的画像
+        profile_key = profile_cache.make_key(profile_cache.dataset_hash(videos_path), analysis_version(word_vectors))
+        if profile_key in request.if_none_match and profile_key in profile_cache:
+            response = Response(status=304)
+            response.set_etag(profile_key)
+            return response
+        profile = profile_cache.get(profile_key)
+        if profile is not None:
+            return profile_response({
+                "status": "success",
+                "data": profile,
+                "profile_key": profile_key,
+                "cached": True
             })
 
-        # 创建分析器实例时传入已加载的词向量模型
-        analyzer = BilibiliAnalyzer(status_queue=status_queue, word_vectors=word_vectors)
-        profile = analyzer.generate_user_profile()
-        return jsonify({
-            "status": "success",
-            "data": profile
-        })
+        job_id = analysis_jobs.submit('full', profile_key, lambda: run_full_analysis(videos_path))
+        return job_response(job_id, default_wait=None)
     except Exception as e:
         return jsonify({
             "status": "error",
             "message": f"分析数据时出错: {str(e)}"
         })
 
+@app.route('/analysis_jobs/<job_id>')
+def analysis_job(job_id):
+    """查询分析任务的状态和结果，可用 wait 参数等待任务结束"""
+    return job_response(job_id, default_wait=0)
+
 # 添加新的路由来保存分析结果
 @app.route('/save_analysis', methods=['POST'])
 def save_analysis():
-    """保存分析结果"""
+    """保存分析结果，请求体带有 profile_key 时直接从画像缓存中读取，无需上传完整结果"""
     try:
         data = request.json
+        if isinstance(data, dict) and 'profile_key' in data:
+            data = profile_cache.get(data['profile_key'])
+            if data is None:
+                return jsonify({
+                    "status": "error",
+                    "message": "缓存中没有对应的分析结果"
+                })
         # 将分析结果添加到消息历史
-        message_history.append({
+        event_broker.publish_many([{
             "type": "analysis_result",
             "data": data
-        })
-        save_messages()
+        }])
         return jsonify({"status": "success"})
     except Exception as e:
         return jsonify({
@@ -216,68 +448,169 @@ def save_analysis():
             "message": str(e)
         })
 
+def run_current_analysis(aggregator):
+    """分析当前已爬取的数据，在分析任务线程中运行"""
+    # 爬取过程中直接读取增量聚合器的结果，无需重新读取和分析数据文件
+    if aggregator is not None:
+        if aggregator.analyzer is None:
+            aggregator.attach_analyzer(create_live_analyzer())
+        # 分类在聚合器的后台线程中进行，等已收到的视频分类完再生成画像
+        aggregator.wait_idle(timeout=60)
+        profile = aggregator.profile()
+        if profile is not None:
+            warmup.mark('first_analysis')
+            return {
+                "status": "success",
+                "data": profile,
+                "video_count": aggregator.video_count,
+                "failed_count": aggregator.failed_count
+            }
+
+    # 读取当前数据文件
+    try:
+        videos_path = latest_videos_path()
+        videos = read_videos(videos_path)
+    except FileNotFoundError:
+        # 文件不存在时返回等待状态而不是错误
+        return {
+            "status": "waiting",
+            "message": "等待数据收集..."
+        }
+    except json.JSONDecodeError:
+        # JSON解析错误时返回等待状态
+        return {
+            "status": "waiting",
+            "message": "数据文件正在写入中..."
+        }
+    if not videos:
+        return {
+            "status": "waiting",
+            "message": "等待数据收集..."
+        }
+    # 创建分析器实例并分析刚读到的数据，不再重新读取文件
+    analyzer = BilibiliAnalyzer(None, status_queue=status_queue, word_vectors=word_vectors, cache=analysis_cache,
+                                store=crawl_store, videos=videos)
+    profile = analyzer.generate_user_profile()
+    warmup.mark('first_analysis')
+    return {
+        "status": "success",
+        "data": profile,
+        "video_count": len(videos)
+    }
+
 # 添加新的路由用于实时分析
 @app.route('/analyze_current')
 def analyze_current():
-    """分析当前已爬取的数据"""
-    global word_vectors
+    """分析当前已爬取的数据；新的请求会取消尚未开始的旧请求，相同数据的并发请求共用一次计算"""
     try:
         # 检查词向量模型是否已加载
-        if word_vectors is None:
-            if model_loading_error:
-                return jsonify({
-                    "status": "error",
-                    "message": f"词向量模型加载失败: {model_loading_error}"
-                })
-            return jsonify({
-                "status": "error",
-                "message": "词向量模型正在加载中，请稍后再试"
-            })
+        error = model_error_response()
+        if error is not None:
+            return error
 
-        # 读取当前数据文件
-        try:
-            with open('bilibili_videos.json', 'r', encoding='utf-8') as f:
-                videos = json.load(f)
-                
-            if videos:
-                # 创建分析器实例并分析当前数据
-                analyzer = BilibiliAnalyzer(status_queue=status_queue, word_vectors=word_vectors)
-                profile = analyzer.generate_user_profile()
-                return jsonify({
-                    "status": "success",
-                    "data": profile,
-                    "video_count": len(videos)
-                })
-            else:
-                return jsonify({
-                    "status": "waiting",
-                    "message": "等待数据收集..."
-                })
-        except FileNotFoundError:
-            # 文件不存在时返回等待状态而不是错误
-            return jsonify({
-                "status": "waiting",
-                "message": "等待数据收集..."
-            })
-        except json.JSONDecodeError:
-            # JSON解析错误时返回等待状态
-            return jsonify({
-                "status": "waiting",
-                "message": "数据文件正在写入中..."
-            })
-            
+        aggregator = profile_aggregator
+        if aggregator is not None:
+            snapshot = (id(aggregator), aggregator.video_count + aggregator.pending_count)
+        else:
+            snapshot = file_snapshot(latest_videos_path())
+        job_id = analysis_jobs.submit('current', snapshot, lambda: run_current_analysis(aggregator))
+        return job_response(job_id, default_wait=60)
     except Exception as e:
         return jsonify({
             "status": "error",
             "message": f"分析数据时出错: {str(e)}"
         })
 
+def window_args(prefix=''):
+    """读取时间段参数 <prefix>start / <prefix>end，支持Unix时间戳和ISO日期"""
+    return parse_time(request.args.get(f'{prefix}start')), parse_time(request.args.get(f'{prefix}end'))
+
+def run_window_profile(start, end, account):
+    """由爬取历史生成某个时间段/账号的画像，在分析任务线程中运行"""
+    analyzer = BilibiliAnalyzer(json_file=None, status_queue=status_queue, word_vectors=word_vectors, cache=analysis_cache)
+    profile = analyzer.generate_window_profile(crawl_store, start, end, account)
+    if profile is None:
+        return {
+            "status": "error",
+            "message": "该时间段内没有爬取记录"
+        }
+    return {
+        "status": "success",
+        "data": profile,
+        "video_count": crawl_store.video_count(start, end, account)
+    }
+
+def run_drift(window_a, window_b, account):
+    """比较两个时间段的类别分布，在分析任务线程中运行"""
+    analyzer = BilibiliAnalyzer(json_file=None, word_vectors=word_vectors, cache=analysis_cache)
+    counts = []
+    for start, end in (window_a, window_b):
+        analyzer.analyze_store_window(crawl_store, start, end, account)
+        counts.append(crawl_store.category_counts(analyzer.version, start, end, account))
+    return {
+        "status": "success",
+        "data": category_drift(*counts)
+    }
+
+@app.route('/sessions')
+def list_sessions():
+    """列出爬取历史中的爬取记录，可按 account 筛选"""
+    try:
+        return jsonify({
+            "status": "success",
+            "sessions": crawl_store.sessions(request.args.get('account'), request.args.get('limit', 50, type=int)),
+            "accounts": crawl_store.accounts()
+        })
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"读取爬取历史出错: {str(e)}"
+        })
+
+@app.route('/profile_window')
+def profile_window():
+    """按时间段和账号生成画像：?start=2024-05-01&end=2024-06-01&account=default，参数均可省略"""
+    try:
+        error = model_error_response()
+        if error is not None:
+            return error
+        start, end = window_args()
+        account = request.args.get('account')
+        snapshot = (start, end, account, crawl_store.revision())
+        job_id = analysis_jobs.submit(f'window:{start}:{end}:{account}', snapshot,
+                                      lambda: run_window_profile(start, end, account))
+        return job_response(job_id, default_wait=None)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"生成时间段画像时出错: {str(e)}"
+        })
+
+@app.route('/drift')
+def drift():
+    """比较两个时间段的类别分布：?a_start=&a_end=&b_start=&b_end=&account=，返回各类别占比变化、总变差距离和JS散度"""
+    try:
+        error = model_error_response()
+        if error is not None:
+            return error
+        window_a, window_b = window_args('a_'), window_args('b_')
+        account = request.args.get('account')
+        snapshot = (window_a, window_b, account, crawl_store.revision())
+        job_id = analysis_jobs.submit(f'drift:{window_a}:{window_b}:{account}', snapshot,
+                                      lambda: run_drift(window_a, window_b, account))
+        return job_response(job_id, default_wait=None)
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": f"比较画像变化时出错: {str(e)}"
+        })
+
 # 添加路由来访问 JSON 文件
 @app.route('/bilibili_videos.json')
 def get_videos_json():
     """提供视频数据 JSON 文件的访问"""
     try:
-        return send_file('bilibili_videos.json', mimetype='application/json')
+        return send_file(VIDEOS_JSON, mimetype='application/json')
     except Exception as e:
         return jsonify({
             "status": "error",
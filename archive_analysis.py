@@ -0,0 +1,130 @@
+import argparse
+import json
+import os
+import sys
+import time
+from bilibili_analyzer import DEFAULT_CHUNK_SIZE
+from crawl_output import iter_jsonl, open_text
+from profile_aggregator import ProfileAggregator
+from video_table import VideoTable
+
+# 可以流式读取的归档文件
+ARCHIVE_SUFFIXES = ('.jsonl', '.jsonl.gz', '.json', '.json.gz')
+
+
+def find_archives(paths):
+    """展开目录，返回按文件名排序的归档文件列表"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, name) for name in names if name.endswith(ARCHIVE_SUFFIXES))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            print(f"跳过不存在的路径: {path}")
+    return sorted(files)
+
+
+def iter_records(path):
+    """逐条读取一个归档文件；JSON 数组格式无法流式解析，只适合较小的旧快照"""
+    with open_text(path) as f:
+        is_array = f.read(64).lstrip().startswith('[')
+    if is_array:
+        with open_text(path) as f:
+            yield from json.load(f)
+    else:
+        yield from iter_jsonl(path)
+
+
+def iter_chunks(records, chunk_size):
+    """把记录流切成固定大小的块"""
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def analyze_archives(paths, analyzer, chunk_size=DEFAULT_CHUNK_SIZE, report_every=50000):
+    """流式分析归档文件，返回 (聚合结果 ProfileAggregator, 吞吐量统计)
+
+    记录由生成器逐条读出，每攒够 chunk_size 条就构建一个 VideoTable 分析并并入聚合结果，
+    处理完的块随即释放，峰值内存只取决于块大小（播放量分位数见 video_table.PlayCounts）。
+    与爬取时的实时画像使用同一个聚合器。
+    """
+    aggregate = ProfileAggregator(buckets=analyzer.play_buckets)
+    files = find_archives(paths)
+    start = time.perf_counter()
+    input_bytes = 0
+    next_report = report_every
+    for path in files:
+        input_bytes += os.path.getsize(path)
+        for chunk in iter_chunks(iter_records(path), chunk_size):
+            table = VideoTable.from_videos(chunk)
+            results, hits = analyzer.analyze_batch(chunk, chunk_size)
+            aggregate.add_results(table, results, hits)
+            if aggregate.video_count >= next_report:
+                elapsed = time.perf_counter() - start
+                print(f"已分析 {aggregate.video_count} 个视频，{aggregate.video_count / elapsed:.0f} 个/秒")
+                next_report += report_every
+    elapsed = time.perf_counter() - start
+    stats = {
+        'files': len(files),
+        'videos': aggregate.video_count,
+        'cache_hits': aggregate.cache_hits,
+        'input_mb': round(input_bytes / 1024 / 1024, 1),
+        'seconds': round(elapsed, 3),
+        'videos_per_sec': round(aggregate.video_count / elapsed, 1) if elapsed else 0.0
+    }
+    return aggregate, stats
+
+
+def peak_memory_mb():
+    """当前进程的峰值常驻内存，不支持的平台返回None"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为KB，macOS 上为字节
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+if __name__ == "__main__":
+    from analysis_cache import AnalysisCache
+    from bilibili_analyzer import BilibiliAnalyzer
+    from vector_store import DEFAULT_VEC_FILE, load_word_vectors
+
+    parser = argparse.ArgumentParser(description="流式分析历史爬取归档（.jsonl / .jsonl.gz），内存占用与视频数无关")
+    parser.add_argument("paths", nargs="+", help="归档文件或目录")
+    parser.add_argument("--vectors", default=os.environ.get('BILI_WORD_VECTORS', DEFAULT_VEC_FILE),
+                        help="词向量文件、共享目录或类别词典")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块分析的视频数")
+    parser.add_argument("--extractor", default='textrank', help="关键词提取方式")
+    parser.add_argument("--workers", type=int, default=None, help="关键词提取进程数")
+    parser.add_argument("--cache", default=None, help="单视频分析结果缓存的数据库路径，默认不使用缓存")
+    parser.add_argument("--output", default=None, help="把画像写入该JSON文件")
+    args = parser.parse_args()
+
+    analyzer = BilibiliAnalyzer(None, word_vectors=load_word_vectors(args.vectors),
+                                cache=AnalysisCache(args.cache) if args.cache else None,
+                                keyword_extractor=args.extractor, keyword_workers=args.workers)
+    aggregate, stats = analyze_archives(args.paths, analyzer, args.chunk_size)
+    profile = aggregate.profile()
+
+    print("\n=== 归档分析 ===")
+    print(f"文件数: {stats['files']}，视频数: {stats['videos']}，缓存命中: {stats['cache_hits']}")
+    print(f"输入 {stats['input_mb']} MB，耗时 {stats['seconds']} 秒，{stats['videos_per_sec']} 个视频/秒")
+    print(f"峰值内存: {peak_memory_mb()} MB")
+    if profile:
+        print(profile['用户画像描述'])
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(profile, f, ensure_ascii=False, indent=2)
+            print(f"画像已保存到 {args.output}")
+    else:
+        print("没有可分析的视频")
@@ -1,92 +1,222 @@
 import json
+import hashlib
 from collections import Counter
-import jieba
-import jieba.analyse
 import numpy as np
-from gensim.models import KeyedVectors
+from keyword_extraction import extract_keywords, extract_batch
+from vector_store import load_word_vectors, model_fingerprint
+from category_lexicon import CategoryLexicon
+from topic_matcher import TopicMatcher
+from crawl_output import video_key
+from video_table import PLAY_COUNT_BUCKETS, PLAY_COUNT_PERCENTILES, VideoTable, play_stats
 from collections import defaultdict
 
+# 定义类别关键词
+CATEGORY_KEYWORDS = {
+    '技术': {
+        'core': ['编程', '开发', '技术', '代码', '软件', '工程', '计算机', '程序', '教程'],
+        'related': [
+            'python', 'java', 'c++', 'javascript', 'golang', 'rust', 'php', 'sql',
+            '前端', '后端', '全栈', '移动开发', 'web开发', '桌面开发', '游戏开发',
+            '人工智能', '机器学习', '深度学习', '数据分析', '云计算', '大数据', '区块链',
+            '数据库', '服务器', '运维', '架构', '网络', '安全', '测试', '运维',
+            'vue', 'react', 'spring', 'django', 'flask', 'docker', 'kubernetes',
+            '算法', '数据结构', '设计模式', '编程思想', '源码分析',
+            'git', 'linux', '部署', '调优', '重构', '项目管理'
+        ]
+    },
+    '游戏': {
+        'core': ['游戏', '通关', '攻略', '测评', '实况', '解说', '主机', '手游'],
+        'related': [
+            'pc游戏', '主机游戏', '手机游戏', 'ps5', 'xbox', 'switch', 'steam',
+            'mmorpg', 'fps', 'moba', '卡牌游戏', '策略游戏', '动作游戏', '冒险游戏',
+            '原神', '星穹铁道', '王者荣耀', '英雄联盟', 'csgo', 'minecraft', '塞尔达',
+            '开荒', '副本', 'pvp', 'pve', '氪金', '抽卡', '肝', '练度',
+            '剧情', '角色', '装备', '技能', '关卡', '成就', '任务', '挑战',
+            '电竞', '赛事', '主播', '联机', '单机', '氪金', '测试服'
+        ]
+    },
+    '数码': {
+        'core': ['数码', '科技', '手机', '电脑', '智能', '硬件', '评测'],
+        'related': [
+            '苹果', '华为', '小米', 'oppo', 'vivo', '三星', '荣耀', 'realme',
+            'cpu', '显卡', '主板', '内存', '固态', '机箱', '电源', '散热',
+            '键盘', '鼠标', '耳机', '音响', '显示器', '摄像头', '麦克风',
+            '智能手表', '平板', '可穿戴', '智能家居', '路由器', '充电器',
+            'ios', '安卓', 'windows', 'macos', '鸿蒙', '系统更新',
+            '评测', '开箱', '上手', '体验', '对比', '跑分', '续航'
+        ]
+    },
+    '影视': {
+        'core': ['电影', '电视剧', '视频', '剧情', '解说', '影视', '动漫'],
+        'related': [
+            '动作片', '喜剧片', '科幻片', '恐怖片', '纪录片', '动画片', '剧情片',
+            '导演', '演员', '编剧', '制片', '摄影', '剪辑', '特效', '配音',
+            '番剧', '动画', '漫画改编', '声优', '热血', '治愈', '后宫',
+            '剪辑', '特效', '调色', '分镜', '转场', '字幕', '混音',
+            '预告片', '花絮', '幕后', '采访', '首映', '票房', '收视率'
+        ]
+    },
+    '生活': {
+        'core': ['vlog', '日常', '美食', '旅游', '生活'],
+        'related': [
+            '探店', '测评', '开箱', '美妆', '穿搭', '护肤', '健身', 
+            '运动', '美甲', '发型', '化妆', '护理', '美容', '减肥', 
+            '瘦身', '健康', '养生', '美体', '美发', '护发'
+        ]
+    },
+    '知识': {
+        'core': ['科普', '历史', '知识', '学习', '教育'],
+        'related': [
+            '考古', '医学', '物理', '化学', '科学', '地理', '生物', 
+            '天文', '数学', '文学', '哲学', '心理', '考研', '课程', 
+            '讲座', '公开课', '学术', '研究', '实验'
+        ]
+    },
+    '娱乐': {
+        'core': ['搞笑', '鬼畜', '娱乐', '音乐'],
+        'related': [
+            '整活', '沙雕', '梗', '舞蹈', '唱歌', '乐器', '说唱', 
+            '饶舌', '演奏', '综艺', '明星', '艺人', '网红', '主播', 
+            '直播', '热点', '八卦'
+        ]
+    }
+}
+
+# 定义话题关键词映射
+TOPIC_KEYWORDS = {
+    'AI与人工智能': [
+        'ai', '人工智能', 'gpt', '大模型', '机器学习', '深度学习', 'chatgpt',
+        '神经网络', '自然语言处理', '计算机视觉', '语音识别', '强化学习',
+        'stable diffusion', 'midjourney', 'dall-e', '人工智能应用'
+    ],
+    '编程开发': [
+        'python', 'java', '编程', '代码', '开发', '程序', '算法', '前端', '后端',
+        '全栈', '框架', 'web开发', '移动开发', '游戏开发', '数据库', 'api',
+        '开源项目', '代码review', '程序设计', '软件工程'
+    ],
+    '游戏': [
+        '游戏', '原神', 'minecraft', '我的世界', '联机', '手游', '攻略', '通关',
+        '主机游戏', '端游', '网游', '单机', '开荒', 'mmorpg', 'fps', 'moba',
+        '赛事', '电竞', '主播', '实况'
+    ],
+    '数码科技': ['手机', '电脑', '数码', '硬件', 'iphone', '华为', '小米', '苹果'],
+    '教育学习': ['教程', '学习', '考试', '考研', '讲解', '知识', '入门', '教学'],
+    '生活日常': ['生活', '日常', 'vlog', '美食', '旅游', '开箱', '测评'],
+    '影视动漫': ['电影', '视频', '动画', '番剧', '解说', '剧情', '动漫'],
+    '网络文化': ['梗', '鬼畜', '整活', '搞笑', '网红', '直播', '热点']
+}
+
+# 话题关键词编译成的多模式匹配自动机，进程内只构建一次
+_topic_matcher = None
+
+
+def get_topic_matcher():
+    """返回默认话题关键词的匹配器"""
+    global _topic_matcher
+    if _topic_matcher is None:
+        _topic_matcher = TopicMatcher(TOPIC_KEYWORDS)
+    return _topic_matcher
+
+# 核心词相似度权重与分类阈值
+CORE_WEIGHT = 1.5
+CATEGORY_THRESHOLD = 0.3
+# 批量分类时每块处理的视频数，限制大批量数据的内存占用
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def build_profile(content_categories, popular_topics, popularity_stats, up_distribution):
+    """由各项统计结果组装用户画像
+
+    content_categories 为 {类别: 数量}，popular_topics 为按数量降序的 [(话题, 数量)]，
+    up_distribution 为UP主的 Counter
+    """
+    # 将字典转换为Counter对象
+    categories_counter = Counter(content_categories)
+
+    profile = {
+        '内容偏好': dict(content_categories),
+        '热门话题': dict(popular_topics[:5]),  # 只展示前5个主要话题
+        '视频热度分析': popularity_stats
+    }
+
+    # 使用Counter对象的most_common方法
+    main_interests = [cat for cat, _ in categories_counter.most_common(3)]
+    top_topics = [topic for topic, _ in popular_topics[:3]]  # 获取前三个主要话题
+
+    # 计算主要兴趣的占比
+    total_videos = sum(content_categories.values())
+    main_interest_percentage = (content_categories[main_interests[0]] / total_videos * 100) if total_videos > 0 else 0
+
+    description = f"""
+根据分析，该用户主要关注以下领域：
+{', '.join(main_interests)}
+
+用户特点：
+内容偏好：{main_interests[0]}类内容最多，占比{main_interest_percentage:.1f}%
+热门话题：最常出现的关键词为 {', '.join(top_topics)}
+
+推荐策略：
+建议推送更多{main_interests[0]}相关的优质内容
+可以关注{[up for up, _ in up_distribution.most_common(10)]}等UP主的更新
+"""
+    profile['用户画像描述'] = description
+    return profile
+
+
+def analysis_version(word_vectors, topic_policy='first', keyword_extractor='textrank'):
+    """分析结果的版本指纹：关键词表、打分参数和词向量模型任一变化都会改变"""
+    config = {
+        "categories": CATEGORY_KEYWORDS,
+        "topics": TOPIC_KEYWORDS,
+        "topic_policy": topic_policy,
+        "core_weight": CORE_WEIGHT,
+        "threshold": CATEGORY_THRESHOLD,
+        "extractor": keyword_extractor,
+        # 分词使用加入了类别/话题关键词的jieba词典
+        "segmenter": "jieba+keywords"
+    }
+    raw = json.dumps(config, ensure_ascii=False, sort_keys=True) + model_fingerprint(word_vectors)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
 class BilibiliAnalyzer:
-    def __init__(self, json_file='bilibili_videos.json', status_queue=None, word_vectors=None):
-        self.videos = self._load_json(json_file)
+    def __init__(self, json_file='bilibili_videos.json', status_queue=None, word_vectors=None, cache=None, topic_policy='first',
+                 keyword_extractor='textrank', keyword_workers=None, play_buckets=PLAY_COUNT_BUCKETS, store=None,
+                 videos=None):
+        # json_file 为None时不加载数据文件，用于逐个分析视频的场景；videos 为已读入的视频列表，给出时不再读取文件
+        if videos is not None:
+            self.videos = VideoTable.from_videos(videos)
+        else:
+            self.videos = self._load_json(json_file) if json_file else VideoTable.from_videos([])
         self.status_queue = status_queue
+        # 单个视频分析结果的缓存（AnalysisCache），为None时不使用缓存
+        self.cache = cache
+        # 爬取历史库（CrawlStore），已入库的视频按BV号直接取用之前的分析结果
+        self.store = store
+        # 只保存汇总后的统计，单视频结果按块处理后即丢弃（已写入缓存/爬取库的可再次取用）
+        self._result_summary = None
+        # 播放量分布的区间，可用 video_table.make_buckets 生成
+        self.play_buckets = play_buckets
         
-        # 定义类别关键词
-        self.category_keywords = {
-            '技术': {
-                'core': ['编程', '开发', '技术', '代码', '软件', '工程', '计算机', '程序', '教程'],
-                'related': [
-                    'python', 'java', 'c++', 'javascript', 'golang', 'rust', 'php', 'sql',
-                    '前端', '后端', '全栈', '移动开发', 'web开发', '桌面开发', '游戏开发',
-                    '人工智能', '机器学习', '深度学习', '数据分析', '云计算', '大数据', '区块链',
-                    '数据库', '服务器', '运维', '架构', '网络', '安全', '测试', '运维',
-                    'vue', 'react', 'spring', 'django', 'flask', 'docker', 'kubernetes',
-                    '算法', '数据结构', '设计模式', '编程思想', '源码分析',
-                    'git', 'linux', '部署', '调优', '重构', '项目管理'
-                ]
-            },
-            '游戏': {
-                'core': ['游戏', '通关', '攻略', '测评', '实况', '解说', '主机', '手游'],
-                'related': [
-                    'pc游戏', '主机游戏', '手机游戏', 'ps5', 'xbox', 'switch', 'steam',
-                    'mmorpg', 'fps', 'moba', '卡牌游戏', '策略游戏', '动作游戏', '冒险游戏',
-                    '原神', '星穹铁道', '王者荣耀', '英雄联盟', 'csgo', 'minecraft', '塞尔达',
-                    '开荒', '副本', 'pvp', 'pve', '氪金', '抽卡', '肝', '练度',
-                    '剧情', '角色', '装备', '技能', '关卡', '成就', '任务', '挑战',
-                    '电竞', '赛事', '主播', '联机', '单机', '氪金', '测试服'
-                ]
-            },
-            '数码': {
-                'core': ['数码', '科技', '手机', '电脑', '智能', '硬件', '评测'],
-                'related': [
-                    '苹果', '华为', '小米', 'oppo', 'vivo', '三星', '荣耀', 'realme',
-                    'cpu', '显卡', '主板', '内存', '固态', '机箱', '电源', '散热',
-                    '键盘', '鼠标', '耳机', '音响', '显示器', '摄像头', '麦克风',
-                    '智能手表', '平板', '可穿戴', '智能家居', '路由器', '充电器',
-                    'ios', '安卓', 'windows', 'macos', '鸿蒙', '系统更新',
-                    '评测', '开箱', '上手', '体验', '对比', '跑分', '续航'
-                ]
-            },
-            '影视': {
-                'core': ['电影', '电视剧', '视频', '剧情', '解说', '影视', '动漫'],
-                'related': [
-                    '动作片', '喜剧片', '科幻片', '恐怖片', '纪录片', '动画片', '剧情片',
-                    '导演', '演员', '编剧', '制片', '摄影', '剪辑', '特效', '配音',
-                    '番剧', '动画', '漫画改编', '声优', '热血', '治愈', '后宫',
-                    '剪辑', '特效', '调色', '分镜', '转场', '字幕', '混音',
-                    '预告片', '花絮', '幕后', '采访', '首映', '票房', '收视率'
-                ]
-            },
-            '生活': {
-                'core': ['vlog', '日常', '美食', '旅游', '生活'],
-                'related': [
-                    '探店', '测评', '开箱', '美妆', '穿搭', '护肤', '健身', 
-                    '运动', '美甲', '发型', '化妆', '护理', '美容', '减肥', 
-                    '瘦身', '健康', '养生', '美体', '美发', '护发'
-                ]
-            },
-            '知识': {
-                'core': ['科普', '历史', '知识', '学习', '教育'],
-                'related': [
-                    '考古', '医学', '物理', '化学', '科学', '地理', '生物', 
-                    '天文', '数学', '文学', '哲学', '心理', '考研', '课程', 
-                    '讲座', '公开课', '学术', '研究', '实验'
-                ]
-            },
-            '娱乐': {
-                'core': ['搞笑', '鬼畜', '娱乐', '音乐'],
-                'related': [
-                    '整活', '沙雕', '梗', '舞蹈', '唱歌', '乐器', '说唱', 
-                    '饶舌', '演奏', '综艺', '明星', '艺人', '网红', '主播', 
-                    '直播', '热点', '八卦'
-                ]
-            }
-        }
+        self.category_keywords = CATEGORY_KEYWORDS
+        self.topic_keywords = TOPIC_KEYWORDS
+        self.topic_matcher = get_topic_matcher()
+        # 主话题判定策略：first / most / weighted / priority，见 TopicMatcher.primary_topic
+        self.topic_policy = topic_policy
+        # 关键词提取方式（textrank / tfidf / segment）和并行提取的进程数，见 keyword_extraction
+        self.keyword_extractor = keyword_extractor
+        self.keyword_workers = keyword_workers
         
         # 使用传入的词向量模型或加载新模型
         try:
             self._send_status({"type": "analyze_progress", "data": {"message": "正在准备词向量模型...", "progress": 10}})
-            self.word_vectors = word_vectors if word_vectors is not None else KeyedVectors.load_word2vec_format('wiki.zh.vec')
+            self.word_vectors = word_vectors if word_vectors is not None else load_word_vectors()
+            # 传入编译好的类别词典时进入词典模式，直接查表得到相似度，不使用词向量
+            self.lexicon = self.word_vectors if isinstance(self.word_vectors, CategoryLexicon) else None
+            if self.lexicon is not None:
+                self._load_lexicon()
+            else:
+                self._build_category_matrices()
+            self.version = analysis_version(self.word_vectors, self.topic_policy, self.keyword_extractor)
             self._send_status({"type": "analyze_progress", "data": {"message": "词向量模型准备完成", "progress": 20}})
         except Exception as e:
             self._send_status({"type": "analyze_progress", "data": {"message": f"词向量模型准备失败: {str(e)}", "progress": 0}})
@@ -101,166 +231,317 @@ class BilibiliAnalyzer:
             print(f"分析进度: {message['data']['message']} ({message['data']['progress']}%)")
 
     def _load_json(self, file_path):
-        """加载JSON文件"""
+        """加载视频数据文件为列式视频表，支持 JSON 数组和 JSON Lines 格式"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            return VideoTable.load(file_path)
         except Exception as e:
             print(f"加载JSON文件失败: {e}")
-            return []
+            return VideoTable.from_videos([])
 
     def extract_keywords(self, text, topK=5):
-        """使用TextRank算法提取关键词"""
-        return jieba.analyse.textrank(text, topK=topK)
+        """提取关键词，默认使用TextRank算法"""
+        return extract_keywords(text, self.keyword_extractor, topK)
+
+    def extract_keywords_batch(self, texts, topK=5):
+        """批量提取关键词，标题较多时分配到多个进程并行处理"""
+        return extract_batch(texts, self.keyword_extractor, topK, self.keyword_workers)
+
+    def _unit_vectors(self, words):
+        """取出词向量并做L2归一化，返回 (在词表中的词, 归一化矩阵)"""
+        if hasattr(self.word_vectors, 'get_vectors'):
+            # 共享词向量支持批量查询，每个词只查找一次
+            words, matrix = self.word_vectors.get_vectors(words)
+        else:
+            words = [word for word in words if word in self.word_vectors]
+            matrix = np.vstack([self.word_vectors[word] for word in words]).astype(np.float32) if words else None
+        if not words:
+            return words, np.zeros((0, self.word_vectors.vector_size), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return words, matrix / norms
+
+    def _build_category_matrices(self):
+        """预先计算每个类别核心词/相关词的归一化矩阵，并拼接成一个大矩阵"""
+        self.categories = list(self.category_keywords.keys())
+        blocks = []
+        # 每个非空分段对应 (类别下标, 是否核心词)
+        self._segments = []
+        self._segment_starts = []
+        self._has_core = np.zeros(len(self.categories), dtype=bool)
+        self._has_related = np.zeros(len(self.categories), dtype=bool)
+        offset = 0
+        for index, category in enumerate(self.categories):
+            for is_core, kind in [(True, 'core'), (False, 'related')]:
+                # 去重不影响最大值，只减少计算量
+                _, matrix = self._unit_vectors(dict.fromkeys(self.category_keywords[category][kind]))
+                if len(matrix) == 0:
+                    continue
+                blocks.append(matrix)
+                self._segments.append((index, is_core))
+                self._segment_starts.append(offset)
+                offset += len(matrix)
+                if is_core:
+                    self._has_core[index] = True
+                else:
+                    self._has_related[index] = True
+        if blocks:
+            self._category_matrix = np.vstack(blocks)
+        else:
+            self._category_matrix = np.zeros((0, self.word_vectors.vector_size), dtype=np.float32)
+        self._segment_starts = np.array(self._segment_starts, dtype=np.intp)
+        self._segment_categories = np.array([index for index, _ in self._segments], dtype=np.intp)
+        self._segment_is_core = np.array([is_core for _, is_core in self._segments], dtype=bool)
+
+    def _load_lexicon(self):
+        """词典模式下从词典的元信息中取得类别及各类别是否有核心词/相关词"""
+        self.lexicon.check_keywords(self.category_keywords)
+        self.categories = list(self.lexicon.categories)
+        self._has_core = self.lexicon.has_core
+        self._has_related = self.lexicon.has_related
+
+    def keyword_maxima(self, words):
+        """一批词与各类别核心词、相关词的最大相似度，返回 (可用的词, 核心词矩阵, 相关词矩阵)
+
+        词向量模式下实时计算，词典模式下直接查表。
+        """
+        if self.lexicon is not None:
+            return self.lexicon.lookup(words)
+        found, unit_matrix = self._unit_vectors(words)
+        core_max, related_max = self._keyword_maxima(unit_matrix)
+        return found, core_max, related_max
+
+    def _keyword_maxima(self, unit_matrix):
+        """一次矩阵乘法得到每个关键词与各类别核心词、相关词的最大相似度
+
+        返回两个 (关键词数, 类别数) 的矩阵，类别没有可用词时对应列为0
+        """
+        core_max = np.zeros((len(unit_matrix), len(self.categories)), dtype=np.float32)
+        related_max = np.zeros_like(core_max)
+        if len(unit_matrix) == 0 or len(self._segments) == 0:
+            return core_max, related_max
+        sims = unit_matrix @ self._category_matrix.T
+        segment_max = np.maximum.reduceat(sims, self._segment_starts, axis=1)
+        core_max[:, self._segment_categories[self._segment_is_core]] = segment_max[:, self._segment_is_core]
+        related_max[:, self._segment_categories[~self._segment_is_core]] = segment_max[:, ~self._segment_is_core]
+        return core_max, related_max
+
+    def _combine_scores(self, core_sum, related_sum, keyword_count):
+        """按原有规则合并得分：核心词最大相似度×1.5 与相关词最大相似度一起取平均"""
+        parts = self._has_core.astype(np.float32) + self._has_related.astype(np.float32)
+        total = core_sum * CORE_WEIGHT * self._has_core + related_sum * self._has_related
+        count = np.asarray(keyword_count, dtype=np.float32)[..., None] * parts
+        return np.divide(total, count, out=np.zeros_like(total, dtype=np.float32), where=count > 0)
+
+    def score_categories(self, keywords):
+        """计算关键词与所有类别的相似度得分"""
+        found, core_max, related_max = self.keyword_maxima(keywords)
+        scores = self._combine_scores(core_max.sum(axis=0), related_max.sum(axis=0), len(found))
+        return {category: float(score) for category, score in zip(self.categories, scores)}
 
     def calculate_similarity(self, keywords, category):
         """计算关键词与类别的相似度"""
-        similarities = []
-        
-        # 计算与核心词的相似度
-        for keyword in keywords:
-            if keyword in self.word_vectors:
-                core_sims = [
-                    self.word_vectors.similarity(keyword, core_word)
-                    for core_word in self.category_keywords[category]['core']
-                    if core_word in self.word_vectors
-                ]
-                if core_sims:
-                    similarities.append(max(core_sims) * 1.5)  # 核心词相似度权重更高
-                    
-        # 计算与相关词的相似度
-        for keyword in keywords:
-            if keyword in self.word_vectors:
-                related_sims = [
-                    self.word_vectors.similarity(keyword, related_word)
-                    for related_word in self.category_keywords[category]['related']
-                    if related_word in self.word_vectors
-                ]
-                if related_sims:
-                    similarities.append(max(related_sims))
-                    
-        return np.mean(similarities) if similarities else 0
-
-    def analyze_content_categories(self):
-        """使用语义分析的方式分析视频内容类别"""
-        self._send_status({"type": "analyze_progress", "data": {"message": "正在分析内容类别...", "progress": 30}})
-        video_categories = defaultdict(int)
-        uncategorized = []
-        
-        for video in self.videos:
-            # 合并标题和UP主名称以提供更多上下文
-            text = f"{video['title']} {video['up_name']}"
-            
-            # 提取关键词
-            keywords = self.extract_keywords(text)
-            print(keywords)
-            # 计算每个类别的相似度得分
-            category_scores = {
-                category: self.calculate_similarity(keywords, category)
-                for category in self.category_keywords.keys()
-            }
-            
-            # 找出得分最高的类别
-            max_score = max(category_scores.values())
-            if max_score > 0.3:  # 设置阈值，避免强行分类
-                best_category = max(category_scores.items(), key=lambda x: x[1])[0]
-                video_categories[best_category] += 1
+        return self.score_categories(keywords)[category]
+
+    def classify_videos(self, videos=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """整批分类视频，按块返回 (视频, 关键词, 得分矩阵, 最佳类别下标)
+
+        每块内先提取全部标题的关键词，构造一个填充/掩码后的关键词下标矩阵，
+        再用几次NumPy运算完成所有视频与所有类别的打分。最佳类别下标为-1表示低于阈值。
+        """
+        videos = self.videos if videos is None else videos
+        for start in range(0, len(videos), chunk_size):
+            chunk = videos[start:start + chunk_size]
+            # 1. 提取关键词（合并标题和UP主名称以提供更多上下文）
+            keywords = self.extract_keywords_batch(f"{video['title']} {video['up_name']}" for video in chunk)
+
+            # 2. 块内去重后的词表（每个词只与类别矩阵相乘或查表一次），以及 (视频数, 最大关键词数) 的下标矩阵和掩码
+            vocab, core_max, related_max = self.keyword_maxima(dict.fromkeys(kw for kws in keywords for kw in kws))
+            word_index = {word: i for i, word in enumerate(vocab)}
+            rows = [[word_index[kw] for kw in kws if kw in word_index] for kws in keywords]
+            width = max((len(row) for row in rows), default=0)
+            index = np.zeros((len(rows), width), dtype=np.intp)
+            mask = np.zeros((len(rows), width), dtype=bool)
+            for i, row in enumerate(rows):
+                index[i, :len(row)] = row
+                mask[i, :len(row)] = True
+
+            # 3. 按视频收集每个词的最大相似度，求和并合并得分
+            if width and len(vocab):
+                core_sum = (core_max[index] * mask[..., None]).sum(axis=1)
+                related_sum = (related_max[index] * mask[..., None]).sum(axis=1)
             else:
-                video_categories['其他'] += 1
-                uncategorized.append({
-                    'title': video['title'],
-                    'keywords': keywords,
-                    'scores': category_scores
+                core_sum = np.zeros((len(rows), len(self.categories)), dtype=np.float32)
+                related_sum = np.zeros_like(core_sum)
+            scores = self._combine_scores(core_sum, related_sum, mask.sum(axis=1))
+
+            best = scores.argmax(axis=1) if len(self.categories) else np.full(len(rows), -1)
+            if len(self.categories):
+                best[scores.max(axis=1) <= CATEGORY_THRESHOLD] = -1  # 设置阈值，避免强行分类
+            yield chunk, keywords, scores, best
+
+    def match_topic(self, title):
+        """判断标题属于哪个话题，没有匹配时返回None"""
+        return self.topic_matcher.primary_topic(title, self.topic_policy)  # 每个视频只归类到一个主话题
+
+    def match_topics(self, title):
+        """返回标题命中的所有话题及其命中位置和次数"""
+        return self.topic_matcher.match(title)
+
+    def _analyze_chunk(self, videos, chunk_size):
+        """计算一批视频的关键词、各类别得分、所属类别和话题"""
+        results = []
+        for chunk, keywords, scores, best in self.classify_videos(videos, chunk_size):
+            for video, kws, row, category in zip(chunk, keywords, scores, best):
+                results.append({
+                    'keywords': kws,
+                    'scores': dict(zip(self.categories, row.tolist())),
+                    'category': self.categories[category] if category >= 0 else '其他',
+                    'topic': self.match_topic(video['title'])
                 })
-                
+        return results
+
+    def analyze_video(self, video):
+        """分析单个视频，优先使用缓存"""
+        if self.cache is None:
+            return self._analyze_chunk([video], 1)[0]
+        key = self.cache.make_key(video['title'], video['up_name'], self.version)
+        cached = self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        record = self._analyze_chunk([video], 1)[0]
+        self.cache.put_many({key: record}, self.version)
+        return record
+
+    def analyze_batch(self, videos, chunk_size=DEFAULT_CHUNK_SIZE):
+        """分析一批视频，返回 (与输入一一对应的结果, 缓存命中数)
+
+        设置了爬取历史库时，布隆过滤器认为见过的视频先按BV号读取库中的结果，
+        从未入库的视频不查库；其余视频再查标题缓存，都没有命中的才计算。
+        """
+        if self.store is None:
+            return self._analyze_cached(videos, chunk_size)
+        keys = [video_key(video) for video in videos]
+        maybe_seen = self.store.seen_filter.contains_many(keys)
+        stored = self.store.analysis_for([key for key, seen in zip(keys, maybe_seen) if seen], self.version)
+        missing = [i for i, key in enumerate(keys) if key not in stored]
+        computed, hits = self._analyze_cached([videos[i] for i in missing], chunk_size)
+        # 只为已入库的视频保存结果
+        self.store.save_analysis(self.version, {keys[i]: record for i, record in zip(missing, computed) if maybe_seen[i]})
+        results = [stored.get(key) for key in keys]
+        for i, record in zip(missing, computed):
+            results[i] = record
+        return results, hits + len(videos) - len(missing)
+
+    def _analyze_cached(self, videos, chunk_size=DEFAULT_CHUNK_SIZE):
+        """分析一批视频，已在标题缓存中的视频不再重复计算"""
+        if self.cache is None:
+            return self._analyze_chunk(videos, chunk_size), 0
+        keys = [self.cache.make_key(video['title'], video['up_name'], self.version) for video in videos]
+        cached = self.cache.get_many(keys)
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        computed = self._analyze_chunk([videos[i] for i in missing], chunk_size)
+        new_records = {keys[i]: record for i, record in zip(missing, computed)}
+        self.cache.put_many(new_records, self.version)
+        cached.update(new_records)
+        return [cached[key] for key in keys], len(videos) - len(missing)
+
+    def iter_results(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """按块分析 self.videos，依次返回 (块的起始下标, 该块的单视频结果)
+
+        每块的结果交给调用方汇总后即可释放，内存占用只与块大小有关。
+        """
+        hits = 0
+        for start in range(0, len(self.videos), chunk_size):
+            chunk_results, chunk_hits = self.analyze_batch(self.videos[start:start + chunk_size], chunk_size)
+            hits += chunk_hits
+            yield start, chunk_results
+        if self.cache is not None:
+            print(f"分析缓存命中: {hits}/{len(self.videos)}")
+
+    def analyze_videos(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """返回与 self.videos 一一对应的单视频分析结果，全部结果同时在内存中，只在需要逐视频结果时使用"""
+        return [result for _, results in self.iter_results(chunk_size) for result in results]
+
+    def summarize_results(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """逐块分析并汇总，同时统计类别数量、话题数量和未分类的示例视频"""
+        if self._result_summary is None:
+            category_counts = defaultdict(int)
+            topic_counts = defaultdict(int)
+            uncategorized = []
+            for start, results in self.iter_results(chunk_size):
+                for index, result in enumerate(results, start):
+                    category_counts[result['category']] += 1
+                    if result['topic']:
+                        topic_counts[result['topic']] += 1
+                    if result['category'] == '其他' and len(uncategorized) < 5:
+                        uncategorized.append({'title': self.videos.titles[index], **result})
+            self._result_summary = (dict(category_counts), dict(topic_counts), uncategorized)
+        return self._result_summary
+
+    def analyze_content_categories(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """使用语义分析的方式分析视频内容类别；需要逐视频的得分时使用 iter_results"""
+        self._send_status({"type": "analyze_progress", "data": {"message": "正在分析内容类别...", "progress": 30}})
+        video_categories, _, uncategorized = self.summarize_results(chunk_size)
+
         # 打印未分类视频的信息以供分析
         if uncategorized:
             print("\n未能准确分类的视频:")
-            for video in uncategorized[:5]:  # 只显示前5个作为示例
+            for video in uncategorized:  # 只显示前5个作为示例
                 print(f"\n标题: {video['title']}")
                 print(f"提取的关键词: {', '.join(video['keywords'])}")
                 print("各类别得分:", {k: f"{v:.3f}" for k, v in video['scores'].items()})
-                
+
         self._send_status({"type": "analyze_progress", "data": {"message": "内容类别分析完成", "progress": 50}})
         return dict(video_categories)
 
     def analyze_up_distribution(self):
         """分析UP主分布"""
         self._send_status({"type": "analyze_progress", "data": {"message": "正在分析UP主分布...", "progress": 60}})
-        up_names = [video['up_name'] for video in self.videos if video['up_name'] and video['up_name'] != '未知']
-        up_counts = Counter(up_names)
+        up_counts = self.videos.up_counts()
         self._send_status({"type": "analyze_progress", "data": {"message": "UP主分布分析完成", "progress": 70}})
         return up_counts
 
     def analyze_popular_topics(self):
         """分析热门话题"""
         self._send_status({"type": "analyze_progress", "data": {"message": "正在分析热门话题...", "progress": 80}})
-        # 定义话题关键词映射
-        topic_keywords = {
-            'AI与人工智能': [
-                'ai', '人工智能', 'gpt', '大模型', '机器学习', '深度学习', 'chatgpt',
-                '神经网络', '自然语言处理', '计算机视觉', '语音识别', '强化学习',
-                'stable diffusion', 'midjourney', 'dall-e', '人工智能应用'
-            ],
-            '编程开发': [
-                'python', 'java', '编程', '代码', '开发', '程序', '算法', '前端', '后端',
-                '全栈', '框架', 'web开发', '移动开发', '游戏开发', '数据库', 'api',
-                '开源项目', '代码review', '程序设计', '软件工程'
-            ],
-            '游戏': [
-                '游戏', '原神', 'minecraft', '我的世界', '联机', '手游', '攻略', '通关',
-                '主机游戏', '端游', '网游', '单机', '开荒', 'mmorpg', 'fps', 'moba',
-                '赛事', '电竞', '主播', '实况'
-            ],
-            '数码科技': ['手机', '电脑', '数码', '硬件', 'iphone', '华为', '小米', '苹果'],
-            '教育学习': ['教程', '学习', '考试', '考研', '讲解', '知识', '入门', '教学'],
-            '生活日常': ['生活', '日常', 'vlog', '美食', '旅游', '开箱', '测评'],
-            '影视动漫': ['电影', '视频', '动画', '番剧', '解说', '剧情', '动漫'],
-            '网络文化': ['梗', '鬼畜', '整活', '搞笑', '网红', '直播', '热点']
-        }
-        
-        topic_counts = defaultdict(int)
-        
-        for video in self.videos:
-            title = video['title'].lower()
-            # 对每个标题，判断属于哪个话题
-            for topic, keywords in topic_keywords.items():
-                if any(keyword in title for keyword in keywords):
-                    topic_counts[topic] += 1
-                    break  # 每个视频只归类到一个主话题
-        
+        _, topic_counts, _ = self.summarize_results()
+
         # 按出现次数排序
         sorted_topics = sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)
         self._send_status({"type": "analyze_progress", "data": {"message": "热门话题分析完成", "progress": 90}})
         return sorted_topics
 
     def analyze_video_popularity(self):
-        """分析视频热度分布"""
-        def convert_play_count(count):
-            if isinstance(count, str):
-                if '万' in count:
-                    return float(count.replace('万', '')) * 10000
-                try:
-                    return float(count)
-                except:
-                    return 0
-            return 0
-
-        play_counts = [convert_play_count(video['play_count']) for video in self.videos if video['play_count'] != '未知']
-        if play_counts:
-            avg_plays = sum(play_counts) / len(play_counts)
-            max_plays = max(play_counts)
-            return {
-                '平均播放量': avg_plays,
-                '最高播放量': int(max_plays),
-                '播放量分布': {
-                    '10万+': sum(1 for x in play_counts if x >= 100000),
-                    '1万-10万': sum(1 for x in play_counts if 10000 <= x < 100000),
-                    '1千-1万': sum(1 for x in play_counts if 1000 <= x < 10000),
-                    '1千以下': sum(1 for x in play_counts if x < 1000)
-                }
-            }
-        return None
+        """分析视频热度分布：播放量在加载时已解析为数组，统计全部向量化计算"""
+        return self.videos.play_stats(self.play_buckets, PLAY_COUNT_PERCENTILES)
+
+    def analyze_store_window(self, store, start=None, end=None, account=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """分析爬取库中某个时间段/账号下还没有当前版本结果的视频，返回新分析的视频数"""
+        analyzed = 0
+        while True:
+            pending = store.unanalyzed(self.version, start, end, account, limit=chunk_size)
+            if not pending:
+                return analyzed
+            results, _ = self._analyze_cached(pending, chunk_size)
+            store.save_analysis(self.version, {video['bvid']: result for video, result in zip(pending, results)})
+            analyzed += len(pending)
+
+    def generate_window_profile(self, store, start=None, end=None, account=None):
+        """由爬取库中某个时间段/账号的视频生成用户画像，没有视频时返回None
+
+        只分析新出现的视频，各项统计由库中的索引聚合查询得到，无需重新读取数据文件。
+        """
+        self._send_status({"type": "analyze_progress", "data": {"message": "正在分析时间段内的新视频...", "progress": 30}})
+        self.analyze_store_window(store, start, end, account)
+        content_categories = store.category_counts(self.version, start, end, account)
+        if not content_categories:
+            return None
+        popular_topics = store.topic_counts(self.version, start, end, account)
+        popularity_stats = play_stats(store.play_counts(start, end, account), self.play_buckets, PLAY_COUNT_PERCENTILES)
+        up_distribution = Counter(store.up_counts(start, end, account))
+        profile = build_profile(content_categories, popular_topics, popularity_stats, up_distribution)
+        self._send_status({"type": "analyze_progress", "data": {"message": "用户画像生成完成", "progress": 100}})
+        return profile
 
     def generate_user_profile(self):
         """生成用户画像"""
@@ -271,36 +552,7 @@ class BilibiliAnalyzer:
             popularity_stats = self.analyze_video_popularity()
             up_distribution = self.analyze_up_distribution()
 
-            # 将字典转换为Counter对象
-            categories_counter = Counter(content_categories)
-            
-            profile = {
-                '内容偏好': dict(content_categories),
-                '热门话题': dict(popular_topics[:5]),  # 只展示前5个主要话题
-                '视频热度分析': popularity_stats
-            }
-
-            # 使用Counter对象的most_common方法
-            main_interests = [cat for cat, _ in categories_counter.most_common(3)]
-            top_topics = [topic for topic, _ in popular_topics[:3]]  # 获取前三个主要话题
-
-            # 计算主要兴趣的占比
-            total_videos = sum(content_categories.values())
-            main_interest_percentage = (content_categories[main_interests[0]] / total_videos * 100) if total_videos > 0 else 0
-
-            description = f"""
-根据分析，该用户主要关注以下领域：
-{', '.join(main_interests)}
-
-用户特点：
-内容偏好：{main_interests[0]}类内容最多，占比{main_interest_percentage:.1f}%
-热门话题：最常出现的关键词为 {', '.join(top_topics)}
-
-推荐策略：
-建议推送更多{main_interests[0]}相关的优质内容
-可以关注{[up for up, _ in up_distribution.most_common(10)]}等UP主的更新
-"""
-            profile['用户画像描述'] = description
+            profile = build_profile(content_categories, popular_topics, popularity_stats, up_distribution)
 
             self._send_status({"type": "analyze_progress", "data": {"message": "用户画像生成完成", "progress": 100}})
             return profile
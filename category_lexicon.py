@@ -0,0 +1,164 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import numpy as np
+from shared_vectors import word_hash
+
+LEXICON_FORMAT = 'category_lexicon'
+META_FILE = 'meta.json'
+# 每批计算的词数，控制编译时的内存占用
+COMPILE_BATCH = 20000
+# float16 存储相似度（取值在[-1, 1]）时得分的最大绝对误差
+FLOAT16_TOLERANCE = 5e-4
+
+
+def keywords_signature(category_keywords):
+    """类别关键词表的指纹，关键词变化后需要重新编译"""
+    raw = json.dumps(category_keywords, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def is_lexicon_dir(path):
+    """判断路径是否为编译好的类别词典目录"""
+    try:
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f).get('format') == LEXICON_FORMAT
+    except (OSError, ValueError):
+        return False
+
+
+def compile_lexicon(word_vectors, output, words=None, dtype='float32'):
+    """离线计算词表中每个词与各类别核心词/相关词的最大余弦相似度
+
+    结果按词的64位哈希排序后存为数组，分析时二分查找即可得到与词向量模式相同的得分，
+    无需再加载词向量模型。words 为None时编译词向量的全部词表。
+    float32 与词向量模式的得分一致；float16 体积减半，但得分误差约为 FLOAT16_TOLERANCE，
+    可用 --check 对比类别判定。
+    """
+    from bilibili_analyzer import BilibiliAnalyzer, CATEGORY_KEYWORDS
+    from vector_store import model_fingerprint
+
+    start = time.time()
+    analyzer = BilibiliAnalyzer(None, word_vectors=word_vectors)
+    words = list(word_vectors.index_to_key) if words is None else list(dict.fromkeys(words))
+    found_words, core_blocks, related_blocks = [], [], []
+    for begin in range(0, len(words), COMPILE_BATCH):
+        found, core_max, related_max = analyzer.keyword_maxima(words[begin:begin + COMPILE_BATCH])
+        found_words.extend(found)
+        core_blocks.append(core_max.astype(dtype))
+        related_blocks.append(related_max.astype(dtype))
+        print(f"已编译 {min(begin + COMPILE_BATCH, len(words))}/{len(words)} 个词")
+
+    hashes = np.array([word_hash(str(word)) for word in found_words], dtype=np.uint64)
+    order = np.argsort(hashes, kind='stable')
+    empty = np.zeros((0, len(analyzer.categories)), dtype=dtype)
+    core = (np.vstack(core_blocks) if core_blocks else empty)[order]
+    related = (np.vstack(related_blocks) if related_blocks else empty)[order]
+
+    tmp_dir = f"{output}.tmp{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    np.save(os.path.join(tmp_dir, 'hashes.npy'), hashes[order])
+    np.save(os.path.join(tmp_dir, 'core.npy'), core)
+    np.save(os.path.join(tmp_dir, 'related.npy'), related)
+    with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump({
+            "format": LEXICON_FORMAT,
+            "categories": analyzer.categories,
+            "has_core": analyzer._has_core.tolist(),
+            "has_related": analyzer._has_related.tolist(),
+            "keywords_signature": keywords_signature(CATEGORY_KEYWORDS),
+            "model_fingerprint": model_fingerprint(word_vectors),
+            "word_count": len(found_words),
+            "dtype": dtype,
+            "created_at": int(time.time())
+        }, f, ensure_ascii=False, indent=2)
+    if os.path.isdir(output):
+        for name in os.listdir(output):
+            os.remove(os.path.join(output, name))
+        os.rmdir(output)
+    os.replace(tmp_dir, output)
+    size_mb = sum(os.path.getsize(os.path.join(output, name)) for name in os.listdir(output)) / 1024 / 1024
+    print(f"类别词典编译完成 ({output})，{len(found_words)} 词，{size_mb:.1f} MB，耗时 {time.time() - start:.1f} 秒")
+    return output
+
+
+class CategoryLexicon:
+    """预先计算好的 词 -> 各类别核心词/相关词最大相似度 查找表
+
+    数组以只读内存映射方式打开，只有查到的行才会被读入内存。
+    传给 BilibiliAnalyzer 的 word_vectors 参数即进入词典模式，不需要词向量模型。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self._hashes = np.load(os.path.join(path, 'hashes.npy'), mmap_mode='r')
+        self._core = np.load(os.path.join(path, 'core.npy'), mmap_mode='r')
+        self._related = np.load(os.path.join(path, 'related.npy'), mmap_mode='r')
+        self.categories = self.meta['categories']
+        self.has_core = np.array(self.meta['has_core'], dtype=bool)
+        self.has_related = np.array(self.meta['has_related'], dtype=bool)
+        # 作为分析结果版本指纹的一部分（见 vector_store.model_fingerprint）
+        self._bili_fingerprint = f"lexicon-{self.meta['model_fingerprint']}-{self.meta['dtype']}"
+
+    def __len__(self):
+        return len(self._hashes)
+
+    @property
+    def nbytes(self):
+        """哈希及相似度数组占用的字节数"""
+        return self._hashes.nbytes + self._core.nbytes + self._related.nbytes
+
+    def check_keywords(self, category_keywords):
+        """确认词典是用当前的类别关键词编译的"""
+        if self.meta['keywords_signature'] != keywords_signature(category_keywords):
+            raise Exception(f"类别词典 {self.path} 与当前类别关键词不一致，请重新编译")
+
+    def lookup(self, words):
+        """查询一批词，返回 (词典中存在的词, 核心词最大相似度矩阵, 相关词最大相似度矩阵)"""
+        words = list(words)
+        if not words or not len(self._hashes):
+            empty = np.zeros((0, len(self.categories)), dtype=np.float32)
+            return [], empty, empty.copy()
+        # 只保存词的64位哈希而不保存原词，百万级词表上的冲突概率可以忽略
+        values = np.array([word_hash(word) for word in words], dtype=np.uint64)
+        positions = np.searchsorted(self._hashes, values)
+        positions[positions >= len(self._hashes)] = 0
+        valid = self._hashes[positions] == values
+        rows = positions[valid]
+        found = [word for word, ok in zip(words, valid) if ok]
+        return (found, np.asarray(self._core[rows], dtype=np.float32),
+                np.asarray(self._related[rows], dtype=np.float32))
+
+
+if __name__ == "__main__":
+    from vector_store import DEFAULT_VEC_FILE, load_word_vectors
+
+    parser = argparse.ArgumentParser(description="离线编译类别相似度词典，分析时无需加载词向量模型")
+    parser.add_argument("source", nargs="?", default=DEFAULT_VEC_FILE, help="词向量文件(.vec、.kv 或共享目录)")
+    parser.add_argument("--output", default=None, help="输出目录，默认为 <源文件名>.lexicon")
+    parser.add_argument("--vocab", default=None, help="只编译该文件中的词（每行一个），默认编译全部词表")
+    parser.add_argument("--dtype", choices=('float16', 'float32'), default='float32')
+    parser.add_argument("--check", nargs="*", default=None, metavar="DATA",
+                        help="编译后与词向量模式对比类别判定，可指定已爬取的视频数据文件")
+    parser.add_argument("--count", type=int, default=2000, help="--check 最多对比的视频数")
+    args = parser.parse_args()
+
+    vocab = None
+    if args.vocab:
+        with open(args.vocab, 'r', encoding='utf-8') as f:
+            vocab = [line.split()[0] for line in f if line.strip()]
+    output = args.output or f"{os.path.splitext(args.source.rstrip(os.sep))[0]}.lexicon"
+    videos = None
+    if args.check is not None:
+        from quantized_vectors import _sample_videos, accuracy_report, print_report
+
+        # 编译前先读取对比数据，没有数据文件时不必等编译完才报错
+        videos = _sample_videos(args.check or ['bilibili_videos.jsonl', 'bilibili_videos.json'], args.count)
+    word_vectors = load_word_vectors(args.source)
+    compile_lexicon(word_vectors, output, vocab, args.dtype)
+    if videos is not None:
+        print_report(accuracy_report(word_vectors, CategoryLexicon(output), videos))
@@ -0,0 +1,92 @@
+import os
+from crawl_output import VIDEOS_JSON, VIDEOS_JSONL, VideoWriter, video_key, write_json_atomic
+
+
+class CrawlerBase:
+    """与浏览器无关的爬取状态、状态消息和输出逻辑
+
+    浏览器爬取（BilibiliSpider）和接口爬取（BilibiliFeedSpider）两种后端共用，
+    本模块不依赖selenium，接口爬取模式无需安装或导入浏览器相关的依赖。
+    """
+
+    def _init_crawl_state(self, num, status_queue, aggregator, output_format, snapshot_every, output_dir=None,
+                          crawl_session=None):
+        """初始化与浏览器无关的爬取状态，供其他爬取后端复用
+
+        output_dir 为输出目录（多账号爬取时每个账号一个目录），默认为当前目录；
+        crawl_session 为爬取历史库中的本次爬取（crawl_store.CrawlSession），由调用方负责关闭
+        """
+        self.status_queue = status_queue
+        self.num = num
+        # 增量画像聚合器（ProfileAggregator），每接受一个视频就推送进去
+        self.aggregator = aggregator
+        self.crawl_session = crawl_session
+        # 输出格式：jsonl 逐条追加并定期生成 JSON 快照；json 每批卡片原子重写一次 JSON 数组
+        self.output_format = output_format
+        self.snapshot_every = snapshot_every
+        self._last_snapshot = 0
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.jsonl_path = os.path.join(output_dir, VIDEOS_JSONL) if output_dir else VIDEOS_JSONL
+        self.json_path = os.path.join(output_dir, VIDEOS_JSON) if output_dir else VIDEOS_JSON
+
+    def send_status(self, message):
+        """发送状态消息"""
+        if self.status_queue:
+            self.status_queue.put(message)
+        print(message if isinstance(message, str) else message.get('data', ''))
+
+    def _open_writer(self):
+        """JSON Lines 模式下打开追加写入器"""
+        return VideoWriter(self.jsonl_path, self.json_path) if self.output_format == 'jsonl' else None
+
+    def _finish_output(self, videos_info, writer):
+        """最后一次保存，生成完整的 JSON 数组快照"""
+        try:
+            if writer:
+                writer.close()
+            write_json_atomic(self.json_path, videos_info[:self.num])
+
+            self.send_status({"type": "message", "data": f"爬取完成！成功收集{len(videos_info)}个有效视频"})
+            if self.crawl_session:
+                self.crawl_session.flush()
+                self.send_status({"type": "message", "data": f"其中新视频{self.crawl_session.new_count}个，"
+                                                             f"此前爬取过的{self.crawl_session.seen_count}个"})
+            self.send_status({"type": "message", "data": f"数据已保存到 {self.json_path}"})
+        except Exception as e:
+            self.send_status({"type": "message", "data": f"保存数据时出错: {str(e)}"})
+
+    def _accept_video(self, video_info, videos_info, processed_ids, writer):
+        """记录一个有效视频：追加写入、推送给聚合器并发送进度"""
+        videos_info.append(video_info)
+        processed_ids.add(video_key(video_info))
+        if writer:
+            writer.append(video_info)
+        if self.crawl_session:
+            self.crawl_session.add(video_info)
+        if self.aggregator:
+            self.aggregator.add(video_info)
+
+        # 发送进度更新
+        self.send_status({
+            "type": "progress",
+            "data": {
+                "title": video_info["title"],
+                "up_name": video_info["up_name"],
+                "current": len(videos_info),
+                "total": self.num,
+                "percentage": round(len(videos_info) / self.num * 100, 1)
+            }
+        })
+
+    def _save_progress(self, videos_info, writer):
+        """保存中间结果：JSON Lines 模式下定期刷盘并生成快照，JSON 模式下原子重写整个文件"""
+        if self.crawl_session:
+            self.crawl_session.flush()
+        if writer:
+            writer.flush()
+            if len(videos_info) - self._last_snapshot >= self.snapshot_every:
+                writer.snapshot(videos_info)
+                self._last_snapshot = len(videos_info)
+        else:
+            write_json_atomic(self.json_path, videos_info)
@@ -0,0 +1,220 @@
+import hashlib
+import multiprocessing
+import os
+import queue
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from crawl_store import DEFAULT_STORE_PATH, CrawlSession, CrawlStore
+
+# 多账号爬取的输出根目录，每个账号一个子目录
+JOBS_ROOT = 'crawl_jobs'
+# 任务结束后的状态
+FINAL_STATES = ('done', 'error')
+# 估算的单个爬取进程内存占用（MB）
+WORKER_MEMORY_MB = {
+    'browser': 600,
+    'http': 120
+}
+
+
+def account_dir(account, root=JOBS_ROOT):
+    """账号的输出目录（同时存放该账号的Cookie和浏览器用户目录）
+
+    替换特殊字符后不同账号可能同名（如 a.b 与 a_b），目录名后附加原账号名的短哈希加以区分
+    """
+    name = re.sub(r'[^\w\-]', '_', account)
+    digest = hashlib.sha1(account.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(root, f"{name}-{digest}")
+
+
+def _available_memory_mb():
+    """当前可用内存（MB），无法获取时返回None"""
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES') // 1024 // 1024
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_max_workers(backend='browser'):
+    """根据本机CPU核数和可用内存计算并发爬取进程数，可用环境变量 BILI_MAX_CRAWL_WORKERS 覆盖"""
+    configured = os.environ.get('BILI_MAX_CRAWL_WORKERS')
+    if configured:
+        return max(1, int(configured))
+    workers = os.cpu_count() or 1
+    memory = _available_memory_mb()
+    if memory is not None:
+        workers = min(workers, memory // WORKER_MEMORY_MB.get(backend, WORKER_MEMORY_MB['browser']))
+    return max(1, workers)
+
+
+def run_crawl_job(spec, status_queue):
+    """在子进程中运行一个账号的爬取任务，返回最终状态（done / error）"""
+    def send(message):
+        status_queue.put(message)
+
+    directory = spec['output_dir']
+    cookie_file = spec.get('cookie_file') or os.path.join(directory, 'bilibili_cookies.json')
+    send({"type": "job_state", "data": "running"})
+    # 每个子进程使用自己的数据库连接，爬取结果同时写入爬取历史库
+    store = CrawlStore(spec.get('store_path', DEFAULT_STORE_PATH))
+    session = CrawlSession(store, spec['account'], spec.get('backend'))
+    status = 'error'
+    try:
+        if spec.get('backend') == 'http':
+            from BilibiliFeedSpider import BilibiliFeed
+            spider = BilibiliFeed(spec['num'], status_queue=status_queue, cookie_file=cookie_file, output_dir=directory,
+                                  crawl_session=session)
+            try:
+                spider.bilibili()
+            finally:
+                spider.teardown_method(None)
+        else:
+            from BilibiliSpider import Bilibili
+            from driver_pool import DriverPool
+            pool = DriverPool(size=1, profile_root=os.path.join(directory, 'chrome_profiles'), cookie_file=cookie_file)
+            try:
+                with pool.lease() as driver:
+                    spider = Bilibili(spec['num'], status_queue=status_queue, driver=driver,
+                                      output_dir=directory, cookie_file=cookie_file, crawl_session=session)
+                    spider.bilibili()
+            finally:
+                pool.close()
+        status = 'done'
+        send("爬虫运行完成！")
+        send({"type": "job_state", "data": "done"})
+    except Exception as e:
+        send(f"爬虫出错: {str(e)}")
+        send({"type": "job_state", "data": "error"})
+    finally:
+        session.close(status)
+        store.close()
+    return status
+
+
+class CrawlOrchestrator:
+    """多账号并行爬取调度器
+
+    每个账号的爬虫运行在独立的子进程中，输出写入各自的目录，
+    进度消息通过每个任务独立的队列传回主进程。
+    浏览器和HTTP两种爬取方式各用一个进程池，并发数按各自的内存占用计算；
+    任务的最终状态在子进程结束时由回调写入，不依赖客户端轮询。
+    """
+
+    def __init__(self, max_workers=None, root=JOBS_ROOT, store_path=DEFAULT_STORE_PATH):
+        # 指定 max_workers 时所有爬取方式都使用该并发数
+        self.max_workers = max_workers
+        self.root = root
+        self.store_path = store_path
+        self._manager = multiprocessing.Manager()
+        self._executors = {}
+        self._lock = threading.Lock()
+        self.jobs = {}
+
+    def workers_for(self, backend):
+        """某种爬取方式的并发进程数"""
+        return self.max_workers or default_max_workers(backend)
+
+    def _executor_for(self, backend):
+        with self._lock:
+            executor = self._executors.get(backend)
+            if executor is None:
+                executor = ProcessPoolExecutor(max_workers=self.workers_for(backend))
+                self._executors[backend] = executor
+            return executor
+
+    def submit(self, account, num=100, backend='browser', cookie_file=None):
+        """提交一个账号的爬取任务，返回任务ID"""
+        with self._lock:
+            for job in self.jobs.values():
+                if job['account'] == account and job['state'] in ('pending', 'running'):
+                    raise Exception(f"账号 {account} 已有正在进行的爬取任务")
+            job_id = uuid.uuid4().hex[:12]
+            spec = {
+                'job_id': job_id,
+                'account': account,
+                'num': num,
+                'backend': backend,
+                'cookie_file': cookie_file,
+                'output_dir': account_dir(account, self.root),
+                'store_path': self.store_path
+            }
+            channel = self._manager.Queue()
+            self.jobs[job_id] = {
+                'account': account,
+                'spec': spec,
+                'queue': channel,
+                'state': 'pending',
+                'submitted_at': time.time(),
+                'messages': []
+            }
+        future = self._executor_for(backend).submit(run_crawl_job, spec, channel)
+        self.jobs[job_id]['future'] = future
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return job_id
+
+    def _on_done(self, job_id, future):
+        """子进程结束时写入最终状态"""
+        with self._lock:
+            job = self.jobs[job_id]
+            if future.exception() is not None:
+                job['state'] = 'error'
+                job['messages'].append(f"爬虫进程异常退出: {future.exception()}")
+            else:
+                job['state'] = future.result()
+
+    def poll(self, job_id):
+        """取出任务的新消息并更新状态"""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            messages = []
+            while True:
+                try:
+                    message = job['queue'].get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(message, dict) and message.get('type') == 'job_state':
+                    # 已结束的任务状态由 _on_done 写入，队列中滞留的旧状态不能覆盖它
+                    if job['state'] not in FINAL_STATES:
+                        job['state'] = message['data']
+                    continue
+                messages.append(message)
+            pending, job['messages'] = job['messages'], []
+            return {
+                'job_id': job_id,
+                'account': job['account'],
+                'state': job['state'],
+                'output_dir': job['spec']['output_dir'],
+                'messages': pending + messages
+            }
+
+    def list_jobs(self):
+        """所有任务的概况"""
+        with self._lock:
+            return [
+                {
+                    'job_id': job_id,
+                    'account': job['account'],
+                    'state': job['state'],
+                    'backend': job['spec']['backend'],
+                    'submitted_at': job['submitted_at'],
+                    'output_dir': job['spec']['output_dir']
+                }
+                for job_id, job in self.jobs.items()
+            ]
+
+    def shutdown(self, wait=True):
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
+        self._manager.shutdown()
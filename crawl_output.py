@@ -0,0 +1,140 @@
+import gzip
+import json
+import os
+import re
+
+# 爬取结果文件：JSON Lines 为追加写入的主文件，JSON 数组为兼容旧格式的快照
+VIDEOS_JSONL = 'bilibili_videos.jsonl'
+VIDEOS_JSON = 'bilibili_videos.json'
+# 登录后导出的Cookie文件
+COOKIE_FILE = 'bilibili_cookies.json'
+# 视频链接中的BV号
+BVID_PATTERN = re.compile(r'BV[0-9A-Za-z]{10}')
+
+
+def parse_bvid(link):
+    """从视频链接中解析BV号，不是普通视频链接时返回None"""
+    match = BVID_PATTERN.search(link or '')
+    return match.group(0) if match else None
+
+
+def video_key(video):
+    """视频的唯一标识：优先使用BV号，番剧等没有BV号的条目使用链接，都没有时使用标题"""
+    return video.get('bvid') or parse_bvid(video.get('link')) or video.get('link') or video.get('title')
+
+
+def write_json_atomic(path, data):
+    """先写临时文件再原子替换，读取方不会看到写了一半的文件"""
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def open_text(path):
+    """以文本方式打开数据文件，.gz 结尾的归档自动解压"""
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def _iter_lines(lines):
+    """逐条解析 JSON Lines，忽略末尾尚未写完的一行和无法解析的行"""
+    for line in lines:
+        if not line.endswith('\n'):
+            # 写入方还没写完这一行
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError:
+            print(f"跳过无法解析的记录: {line[:50]}")
+
+
+def iter_jsonl(path):
+    """逐条读取 JSON Lines 文件，忽略末尾尚未写完的一行和无法解析的行"""
+    with open_text(path) as f:
+        yield from _iter_lines(f)
+
+
+def read_videos(path):
+    """读取视频数据，同时支持 JSON 数组和 JSON Lines 两种格式"""
+    with open_text(path) as f:
+        head = f.read(64).lstrip()
+        if head.startswith('['):
+            f.seek(0)
+            return json.load(f)
+    return list(iter_jsonl(path))
+
+
+def parse_videos(data, path=''):
+    """解析已读入内存的数据文件内容（bytes），格式与 read_videos 相同"""
+    if path.endswith('.gz'):
+        data = gzip.decompress(data)
+    text = data.decode('utf-8')
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return list(_iter_lines(text.splitlines(keepends=True)))
+
+
+def latest_videos_path():
+    """返回最新的视频数据文件：优先使用追加写入的 JSON Lines 文件"""
+    if os.path.exists(VIDEOS_JSONL):
+        return VIDEOS_JSONL
+    return VIDEOS_JSON
+
+
+class VideoWriter:
+    """爬取结果的追加写入器
+
+    每个视频追加一行 JSON，按批次 flush/fsync，整体写入代价为 O(n)；
+    需要数组格式时调用 snapshot() 以原子替换的方式生成 JSON 快照。
+    """
+
+    def __init__(self, jsonl_path=VIDEOS_JSONL, snapshot_path=VIDEOS_JSON, flush_every=20, fsync=True, append=False):
+        self.jsonl_path = jsonl_path
+        self.snapshot_path = snapshot_path
+        self.flush_every = flush_every
+        self.fsync = fsync
+        self.count = 0
+        self._unflushed = 0
+        self._file = open(jsonl_path, 'a' if append else 'w', encoding='utf-8')
+
+    def append(self, video):
+        """追加一条视频记录"""
+        self._file.write(json.dumps(video, ensure_ascii=False) + '\n')
+        self.count += 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """将缓冲区写入磁盘"""
+        if self._file.closed:
+            return
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._unflushed = 0
+
+    def snapshot(self, videos=None):
+        """生成 JSON 数组格式的快照；未传入 videos 时从 JSON Lines 文件读取"""
+        self.flush()
+        if videos is None:
+            videos = list(iter_jsonl(self.jsonl_path))
+        write_json_atomic(self.snapshot_path, videos)
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
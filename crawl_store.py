@@ -0,0 +1,464 @@
+import argparse
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from crawl_output import video_key
+from seen_filter import BloomFilter
+from video_table import UNKNOWN, convert_play_count
+
+# SQLite 单条语句的参数个数有限，批量写入时分批进行
+_WRITE_BATCH = 500
+# 默认的爬取库路径，可用环境变量 BILI_CRAWL_STORE 覆盖
+DEFAULT_STORE_PATH = os.environ.get('BILI_CRAWL_STORE', 'crawl_store.db')
+# 单账号爬取时使用的账号名
+DEFAULT_ACCOUNT = 'default'
+
+
+def parse_time(value):
+    """解析时间参数：Unix时间戳或 ISO 格式日期（如 2024-05-01、2024-05-01T08:00），空值返回None"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+def category_drift(counts_a, counts_b):
+    """比较两个时间段的类别分布
+
+    返回每个类别在两段中的占比及变化，以及整体的总变差距离和JS散度（以2为底，取值0到1）。
+    """
+    total_a, total_b = sum(counts_a.values()), sum(counts_b.values())
+    categories = sorted(set(counts_a) | set(counts_b), key=lambda c: -(counts_a.get(c, 0) + counts_b.get(c, 0)))
+    shares = {}
+    for category in categories:
+        share_a = counts_a.get(category, 0) / total_a if total_a else 0.0
+        share_b = counts_b.get(category, 0) / total_b if total_b else 0.0
+        shares[category] = {
+            'a': round(share_a, 4),
+            'b': round(share_b, 4),
+            'change': round(share_b - share_a, 4)
+        }
+
+    def kl(p, q):
+        return sum(x * math.log2(x / y) for x, y in zip(p, q) if x > 0)
+
+    p = [counts_a.get(c, 0) / total_a if total_a else 0.0 for c in categories]
+    q = [counts_b.get(c, 0) / total_b if total_b else 0.0 for c in categories]
+    m = [(x + y) / 2 for x, y in zip(p, q)]
+    comparable = bool(total_a and total_b)
+    return {
+        'videos_a': total_a,
+        'videos_b': total_b,
+        'categories': shares,
+        'total_variation': round(sum(abs(x - y) for x, y in zip(p, q)) / 2, 4) if comparable else None,
+        'js_divergence': round((kl(p, m) + kl(q, m)) / 2, 4) if comparable else None
+    }
+
+
+class CrawlStore:
+    """保存全部爬取历史的SQLite数据库（WAL模式）
+
+    sessions 记录每次爬取，videos 以BV号为主键保存视频信息，
+    sightings 记录每次爬取推荐了哪些视频（同一视频在不同时间被推荐会有多条），
+    video_analysis 保存各分析版本下每个视频的类别和话题。
+    时间、账号、UP主和类别都有索引，任意时间段或账号的画像可以直接用聚合查询得到。
+    已入库的视频主键同时加入 <db_path>.seen 布隆过滤器，判断是否见过时先查过滤器，
+    只有过滤器认为可能见过的才回到 videos 表精确确认。
+    """
+
+    def __init__(self, db_path=DEFAULT_STORE_PATH, seen_path=None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # 多账号爬取时多个子进程同时写入，等待写锁而不是立即报错
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    account TEXT NOT NULL,
+                    backend TEXT,
+                    started_at REAL NOT NULL,
+                    finished_at REAL,
+                    video_count INTEGER NOT NULL DEFAULT 0,
+                    new_count INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")}
+            if 'new_count' not in columns:
+                self._conn.execute("ALTER TABLE sessions ADD COLUMN new_count INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS videos (
+                    bvid TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    link TEXT,
+                    up_name TEXT,
+                    up_link TEXT,
+                    thumbnail TEXT,
+                    play_count TEXT,
+                    plays REAL,
+                    first_seen REAL NOT NULL,
+                    last_seen REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS sightings (
+                    session_id INTEGER NOT NULL,
+                    bvid TEXT NOT NULL,
+                    account TEXT NOT NULL,
+                    seen_at REAL NOT NULL,
+                    position INTEGER,
+                    PRIMARY KEY (session_id, bvid)
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS video_analysis (
+                    bvid TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    topic TEXT,
+                    keywords TEXT,
+                    scores TEXT,
+                    analyzed_at REAL NOT NULL,
+                    PRIMARY KEY (bvid, version)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_account ON sessions (account, started_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_time ON sessions (started_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sightings_time ON sightings (seen_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sightings_account ON sightings (account, seen_at)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sightings_bvid ON sightings (bvid)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_videos_up ON videos (up_name)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analysis_category ON video_analysis (version, category)")
+            self._conn.commit()
+        self.seen_filter = BloomFilter(seen_path or f"{db_path}.seen")
+        # 过滤器中的键数与 videos 表的行数不一致时（文件丢失、首次启用，或进程在提交数据库后、
+        # 写入过滤器前崩溃），由 videos 表重建，否则这些视频以后每次都会被误算为新视频
+        with self._lock:
+            video_count = self._conn.execute("SELECT COUNT(*) FROM videos").fetchone()[0]
+        if self.seen_filter.count != video_count:
+            self._rebuild_seen_filter()
+
+    def _rebuild_seen_filter(self):
+        """由 videos 表重建布隆过滤器"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT bvid FROM videos")
+            self.seen_filter.rebuild(row[0] for row in cursor)
+
+    def previously_seen(self, keys):
+        """返回 keys 中此前已入库的视频主键集合"""
+        keys = [key for key in dict.fromkeys(keys) if key]
+        candidates = [key for key, maybe in zip(keys, self.seen_filter.contains_many(keys)) if maybe]
+        seen = set()
+        with self._lock:
+            for start in range(0, len(candidates), _WRITE_BATCH):
+                batch = candidates[start:start + _WRITE_BATCH]
+                seen.update(row[0] for row in self._conn.execute(
+                    f"SELECT bvid FROM videos WHERE bvid IN ({','.join('?' * len(batch))})", batch
+                ))
+        return seen
+
+    # ---- 写入 ----
+
+    def start_session(self, account=DEFAULT_ACCOUNT, backend=None, started_at=None):
+        """开始一次爬取，返回会话ID"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO sessions (account, backend, started_at, status) VALUES (?, ?, ?, 'running')",
+                (account, backend, started_at or time.time())
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def add_videos(self, session_id, videos, seen_at=None):
+        """写入一批视频及其在本次爬取中的出现记录，返回 (新增的出现记录数, 其中首次入库的视频数)"""
+        if not videos:
+            return 0, 0
+        seen_at = seen_at or time.time()
+        added = 0
+        new_keys = []
+        with self._lock:
+            account, offset = self._conn.execute(
+                "SELECT account, video_count FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            video_rows = []
+            sighting_rows = []
+            for position, video in enumerate(videos, start=offset):
+                key = video_key(video)
+                if not key:
+                    continue
+                play_count = video.get('play_count') or UNKNOWN
+                plays = None if play_count == UNKNOWN else convert_play_count(play_count)
+                video_rows.append((key, video.get('title') or '', video.get('link'), video.get('up_name'),
+                                   video.get('up_link'), video.get('thumbnail'), str(play_count), plays,
+                                   seen_at, seen_at))
+                sighting_rows.append((session_id, key, account, seen_at, position))
+            # 先只插入库中没有的视频，实际插入的才是新视频；判断与插入在同一个写事务中，
+            # 多个爬取进程同时写入同一个视频时只有一个会把它算作新视频
+            existing_rows = []
+            for row in video_rows:
+                cursor = self._conn.execute("""
+                    INSERT INTO videos (bvid, title, link, up_name, up_link, thumbnail, play_count, plays, first_seen, last_seen)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(bvid) DO NOTHING
+                """, row)
+                if cursor.rowcount:
+                    new_keys.append(row[0])
+                else:
+                    existing_rows.append(row)
+            for start in range(0, len(existing_rows), _WRITE_BATCH):
+                self._conn.executemany("""
+                    UPDATE videos SET title = ?, up_name = ?, play_count = ?, plays = ?, last_seen = MAX(last_seen, ?)
+                    WHERE bvid = ?
+                """, [(row[1], row[3], row[6], row[7], row[9], row[0]) for row in existing_rows[start:start + _WRITE_BATCH]])
+            for row in sighting_rows:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO sightings (session_id, bvid, account, seen_at, position) VALUES (?, ?, ?, ?, ?)",
+                    row
+                )
+                added += cursor.rowcount
+            self._conn.execute("UPDATE sessions SET video_count = video_count + ?, new_count = new_count + ? WHERE id = ?",
+                               (added, len(new_keys), session_id))
+            self._conn.commit()
+        # 提交之后再加入过滤器（随即刷新到磁盘），过滤器中的键一定已经在库中；
+        # 两步之间崩溃时键数与行数不一致，下次打开时重建
+        self.seen_filter.add_many(new_keys)
+        return added, len(new_keys)
+
+    def finish_session(self, session_id, status='done'):
+        with self._lock:
+            self._conn.execute("UPDATE sessions SET finished_at = ?, status = ? WHERE id = ?",
+                               (time.time(), status, session_id))
+            self._conn.commit()
+
+    def import_videos(self, videos, account=DEFAULT_ACCOUNT, seen_at=None, backend='import'):
+        """把已有的爬取结果作为一次已完成的爬取导入，返回会话ID"""
+        seen_at = seen_at or time.time()
+        session_id = self.start_session(account, backend, started_at=seen_at)
+        self.add_videos(session_id, list(videos), seen_at=seen_at)
+        self.finish_session(session_id)
+        return session_id
+
+    def analysis_for(self, keys, version):
+        """按视频主键读取已保存的分析结果，返回 {主键: 结果}"""
+        keys = [key for key in dict.fromkeys(keys) if key]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), _WRITE_BATCH):
+                batch = keys[start:start + _WRITE_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT bvid, category, topic, keywords, scores FROM video_analysis "
+                    f"WHERE version = ? AND bvid IN ({','.join('?' * len(batch))})",
+                    [version] + batch
+                ).fetchall()
+                for key, category, topic, keywords, scores in rows:
+                    found[key] = {
+                        "keywords": json.loads(keywords),
+                        "scores": json.loads(scores),
+                        "category": category,
+                        "topic": topic
+                    }
+        return found
+
+    def save_analysis(self, version, records):
+        """保存 {视频主键: 分析结果}"""
+        if not records:
+            return
+        now = time.time()
+        rows = [
+            (key, version, record['category'], record['topic'],
+             json.dumps(record['keywords'], ensure_ascii=False), json.dumps(record['scores'], ensure_ascii=False), now)
+            for key, record in records.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO video_analysis (bvid, version, category, topic, keywords, scores, analyzed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+
+    # ---- 查询 ----
+
+    @staticmethod
+    def _window(start=None, end=None, account=None):
+        """时间段和账号的筛选条件，作用于 sightings 表（别名 s）"""
+        clauses, params = [], []
+        if account:
+            clauses.append("s.account = ?")
+            params.append(account)
+        if start is not None:
+            clauses.append("s.seen_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("s.seen_at < ?")
+            params.append(end)
+        return (" AND ".join(clauses) or "1"), params
+
+    def revision(self):
+        """数据的修订号，有新的爬取记录写入后随之变化"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(rowid), 0) FROM sightings").fetchone()[0]
+
+    def sessions(self, account=None, limit=50):
+        """最近的爬取记录"""
+        query = "SELECT id, account, backend, started_at, finished_at, video_count, new_count, status FROM sessions"
+        params = []
+        if account:
+            query += " WHERE account = ?"
+            params.append(account)
+        query += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        keys = ('id', 'account', 'backend', 'started_at', 'finished_at', 'video_count', 'new_count', 'status')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def accounts(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT account FROM sessions ORDER BY account")]
+
+    def unanalyzed(self, version, start=None, end=None, account=None, limit=None):
+        """时间段内还没有该版本分析结果的视频"""
+        where, params = self._window(start, end, account)
+        query = f"""
+            SELECT DISTINCT v.bvid, v.title, v.up_name FROM sightings s
+            JOIN videos v ON v.bvid = s.bvid
+            LEFT JOIN video_analysis a ON a.bvid = s.bvid AND a.version = ?
+            WHERE a.bvid IS NULL AND {where}
+        """
+        params = [version] + params
+        if limit:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [{'bvid': bvid, 'title': title, 'up_name': up_name or UNKNOWN} for bvid, title, up_name in rows]
+
+    def video_count(self, start=None, end=None, account=None):
+        """时间段内被推荐的视频次数"""
+        where, params = self._window(start, end, account)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM sightings s WHERE {where}", params).fetchone()[0]
+
+    def category_counts(self, version, start=None, end=None, account=None):
+        """时间段内各类别的视频数（按推荐次数计）"""
+        where, params = self._window(start, end, account)
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT a.category, COUNT(*) FROM sightings s
+                JOIN video_analysis a ON a.bvid = s.bvid AND a.version = ?
+                WHERE {where} GROUP BY a.category
+            """, [version] + params).fetchall()
+        return dict(rows)
+
+    def topic_counts(self, version, start=None, end=None, account=None):
+        """时间段内各话题的视频数，按数量降序"""
+        where, params = self._window(start, end, account)
+        with self._lock:
+            return self._conn.execute(f"""
+                SELECT a.topic, COUNT(*) AS n FROM sightings s
+                JOIN video_analysis a ON a.bvid = s.bvid AND a.version = ?
+                WHERE a.topic IS NOT NULL AND {where} GROUP BY a.topic ORDER BY n DESC
+            """, [version] + params).fetchall()
+
+    def up_counts(self, start=None, end=None, account=None):
+        """时间段内各UP主的视频数，未知UP主不计入"""
+        where, params = self._window(start, end, account)
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT v.up_name, COUNT(*) FROM sightings s
+                JOIN videos v ON v.bvid = s.bvid
+                WHERE v.up_name IS NOT NULL AND v.up_name NOT IN ('', ?) AND {where} GROUP BY v.up_name
+            """, [UNKNOWN] + params).fetchall()
+        return dict(rows)
+
+    def play_counts(self, start=None, end=None, account=None):
+        """时间段内已知播放量的数组"""
+        where, params = self._window(start, end, account)
+        with self._lock:
+            rows = self._conn.execute(f"""
+                SELECT v.plays FROM sightings s
+                JOIN videos v ON v.bvid = s.bvid
+                WHERE v.plays IS NOT NULL AND {where}
+            """, params).fetchall()
+        return np.fromiter((row[0] for row in rows), dtype=np.float64, count=len(rows))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+        self.seen_filter.flush()
+
+
+class CrawlSession:
+    """一次爬取在库中的记录
+
+    爬虫每接受一个视频调用 add()，视频先缓存在内存中，
+    每 flush_every 个或调用 flush() 时批量写入，结束时调用 close()。
+    new_count / seen_count 为已写入的视频中首次出现和此前爬取过（任意账号）的数量。
+    """
+
+    def __init__(self, store, account=DEFAULT_ACCOUNT, backend=None, flush_every=20):
+        self.store = store
+        self.account = account
+        self.session_id = store.start_session(account, backend)
+        self.flush_every = flush_every
+        self.new_count = 0
+        self.seen_count = 0
+        self._pending = []
+
+    def add(self, video):
+        self._pending.append(video)
+        if len(self._pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        pending, self._pending = self._pending, []
+        added, new = self.store.add_videos(self.session_id, pending)
+        self.new_count += new
+        self.seen_count += added - new
+
+    def close(self, status='done'):
+        self.flush()
+        self.store.finish_session(self.session_id, status)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="爬取历史数据库工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="把已有的爬取结果文件导入数据库，每个文件记为一次爬取")
+    import_parser.add_argument("paths", nargs="+", help="视频数据文件或目录（.json / .jsonl / .jsonl.gz）")
+    import_parser.add_argument("--account", default=DEFAULT_ACCOUNT, help="账号名")
+    import_parser.add_argument("--db", default=DEFAULT_STORE_PATH)
+
+    sessions_parser = subparsers.add_parser("sessions", help="列出最近的爬取记录")
+    sessions_parser.add_argument("--account", default=None)
+    sessions_parser.add_argument("--limit", type=int, default=20)
+    sessions_parser.add_argument("--db", default=DEFAULT_STORE_PATH)
+
+    args = parser.parse_args()
+    store = CrawlStore(args.db)
+    if args.command == "import":
+        from archive_analysis import find_archives, iter_records
+
+        for path in find_archives(args.paths):
+            # 以文件的修改时间作为这次爬取的时间
+            session_id = store.import_videos(iter_records(path), args.account, seen_at=os.path.getmtime(path))
+            print(f"已导入 {path} -> 爬取记录 {session_id}")
+    elif args.command == "sessions":
+        for session in store.sessions(args.account, args.limit):
+            started = datetime.fromtimestamp(session['started_at']).strftime('%Y-%m-%d %H:%M')
+            print(f"{session['id']:>5}  {started}  {session['account']:<12} {session['backend'] or '':<8} "
+                  f"{session['status']:<8} {session['video_count']} 个视频，其中新视频 {session['new_count']} 个")
+    store.close()
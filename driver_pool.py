@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from crawl_output import COOKIE_FILE
+
+HOME_URL = 'https://www.bilibili.com/'
+# add_cookie 只接受这些字段
+_COOKIE_FIELDS = ('name', 'value', 'domain', 'path', 'secure', 'httpOnly', 'expiry')
+
+
+class DriverPool:
+    """常驻的无头浏览器池
+
+    浏览器在多次爬取之间保持运行，每个槽位使用独立的Chrome用户目录以保留登录状态，
+    新建浏览器时还会恢复上次导出的Cookie。借出前会做健康检查，失效的会话自动重建。
+    """
+
+    def __init__(self, size=1, profile_root='chrome_profiles', cookie_file=COOKIE_FILE, headless=True):
+        self.size = size
+        self.profile_root = profile_root
+        self.cookie_file = cookie_file
+        self.headless = headless
+        self._idle = []
+        self._slots = {}
+        self._free_slots = list(range(size))
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def _create(self, slot):
+        """新建一个浏览器并恢复登录Cookie"""
+        # 首次创建浏览器时才导入selenium，加快服务启动
+        from selenium import webdriver
+
+        start = time.time()
+        chrome_options = webdriver.ChromeOptions()
+        if self.headless:
+            chrome_options.add_argument('--headless')
+        chrome_options.add_argument(f"--user-data-dir={os.path.abspath(os.path.join(self.profile_root, f'slot_{slot}'))}")
+        driver = webdriver.Chrome(options=chrome_options)
+        self._restore_cookies(driver)
+        print(f"浏览器 {slot} 启动完成，耗时 {time.time() - start:.1f} 秒")
+        return driver
+
+    def _restore_cookies(self, driver):
+        if not self.cookie_file or not os.path.exists(self.cookie_file):
+            return
+        try:
+            with open(self.cookie_file, 'r', encoding='utf-8') as f:
+                cookies = json.load(f)
+            # 必须先打开对应域名的页面才能写入Cookie
+            driver.get(HOME_URL)
+            for cookie in cookies:
+                cookie = {key: cookie[key] for key in _COOKIE_FIELDS if key in cookie}
+                if 'expiry' in cookie:
+                    cookie['expiry'] = int(cookie['expiry'])
+                try:
+                    driver.add_cookie(cookie)
+                except Exception as e:
+                    print(f"恢复Cookie {cookie.get('name')} 失败: {str(e)}")
+        except Exception as e:
+            print(f"恢复Cookie失败: {str(e)}")
+
+    def save_cookies(self, driver):
+        """导出浏览器当前的Cookie"""
+        try:
+            cookies = driver.get_cookies()
+            if not cookies:
+                return
+            # 多个工作进程、同一进程池的多个浏览器都可能同时导出，临时文件名按进程和线程区分
+            tmp_path = f"{self.cookie_file}.tmp{os.getpid()}-{threading.get_ident()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(cookies, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.cookie_file)
+        except Exception as e:
+            print(f"保存Cookie失败: {str(e)}")
+
+    @staticmethod
+    def is_healthy(driver):
+        """检查浏览器会话是否仍然可用"""
+        try:
+            return driver.execute_script("return 1") == 1
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def acquire(self, timeout=None):
+        """借出一个健康的浏览器，池满时等待归还"""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise Exception("浏览器池已关闭")
+                if self._idle:
+                    driver = self._idle.pop()
+                    break
+                if self._free_slots:
+                    driver = None
+                    slot = self._free_slots.pop()
+                    break
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("等待空闲浏览器超时")
+                self._condition.wait(remaining)
+
+        if driver is not None:
+            if self.is_healthy(driver):
+                return driver
+            print("浏览器会话已失效，重新创建")
+            with self._condition:
+                slot = self._slots.pop(id(driver))
+            self._quit(driver)
+
+        try:
+            driver = self._create(slot)
+        except Exception:
+            with self._condition:
+                self._free_slots.append(slot)
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._slots[id(driver)] = slot
+        return driver
+
+    def release(self, driver):
+        """归还浏览器，同时导出最新的登录Cookie"""
+        healthy = self.is_healthy(driver)
+        if healthy:
+            self.save_cookies(driver)
+        with self._condition:
+            if healthy and not self._closed:
+                self._idle.append(driver)
+            else:
+                self._free_slots.append(self._slots.pop(id(driver)))
+                self._quit(driver)
+            self._condition.notify()
+
+    @contextmanager
+    def lease(self, timeout=None):
+        driver = self.acquire(timeout)
+        try:
+            yield driver
+        finally:
+            self.release(driver)
+
+    def warm(self, count=None):
+        """预先启动浏览器，使首次爬取无需等待冷启动"""
+        drivers = []
+        try:
+            for _ in range(min(count or self.size, self.size)):
+                drivers.append(self.acquire(timeout=0))
+        except TimeoutError:
+            pass
+        except Exception as e:
+            print(f"预热浏览器失败: {str(e)}")
+        for driver in drivers:
+            # 预先打开首页，借出后可直接检测登录状态
+            try:
+                driver.get(HOME_URL)
+            except Exception:
+                pass
+            self.release(driver)
+
+    def close(self):
+        """关闭池中所有空闲浏览器"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._quit(driver)
@@ -0,0 +1,134 @@
+import json
+import queue
+import threading
+from collections import deque
+
+# SSE 事件类型：字典消息使用其 type 字段，纯文本消息归为 message
+EVENT_TYPES = ('progress', 'analyze_progress', 'qr_code', 'message', 'analysis_result')
+# 没有新消息时发送心跳注释的间隔（秒），避免代理断开空闲连接
+HEARTBEAT_INTERVAL = 15
+# 从 history 补发时每次读取的条数
+HISTORY_PAGE = 500
+
+
+def event_type(message):
+    """消息对应的SSE事件类型"""
+    if isinstance(message, dict) and message.get('type') in EVENT_TYPES:
+        return message['type']
+    return 'message'
+
+
+def format_event(seq, message):
+    """按SSE协议格式化一条事件"""
+    data = json.dumps(message, ensure_ascii=False)
+    return f"id: {seq}\nevent: {event_type(message)}\ndata: {data}\n\n"
+
+
+class EventBroker:
+    """状态消息广播器
+
+    后台线程从 status_queue 取出消息并分配递增序号，在内存中保留最近的一部分，
+    SSE客户端按序号读取新消息，断线后可用 Last-Event-ID 续传。
+    续传的序号早于内存中最旧的消息时（断线太久或服务重启），从 history（MessageLog）补发。
+    """
+
+    def __init__(self, source_queue, max_events=2000, on_events=None, start_seq=0, history=None):
+        self.source_queue = source_queue
+        # 收到一批新消息后的回调，参数为 [(序号, 消息)]
+        self.on_events = on_events
+        self.history = history
+        self._events = deque(maxlen=max_events)
+        # 从持久化日志的最后序号继续编号，服务重启后客户端仍可续传
+        self._seq = start_seq
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._pump, daemon=True)
+        self._thread.start()
+
+    @property
+    def last_id(self):
+        return self._seq
+
+    def _pump(self):
+        while True:
+            batch = [self.source_queue.get()]
+            # 一次取出队列中已有的全部消息，合并为一批处理
+            while True:
+                try:
+                    batch.append(self.source_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.publish_many(batch)
+
+    def publish_many(self, messages):
+        """为消息分配序号并通知所有等待的客户端"""
+        with self._condition:
+            events = []
+            for message in messages:
+                self._seq += 1
+                events.append((self._seq, message))
+            self._events.extend(events)
+            self._condition.notify_all()
+        if self.on_events:
+            try:
+                self.on_events(events)
+            except Exception as e:
+                print(f"处理状态消息出错: {e}")
+        return events
+
+    def _floor(self):
+        """内存中最旧消息的序号，更早的消息只能从 history 读取"""
+        return self._events[0][0] if self._events else self._seq + 1
+
+    def events_after(self, last_id, limit=HISTORY_PAGE):
+        """返回序号大于 last_id 的消息
+
+        内存中已没有的部分从 history 分页读取，一次最多 limit 条，调用方继续按最后的序号读取即可。
+        history 中也已被清理的消息无法补发，直接跳到之后的消息。
+        """
+        with self._condition:
+            floor = self._floor()
+            recent = [(seq, message) for seq, message in self._events if seq > last_id]
+        if self.history is None:
+            return recent
+        cursor, older = last_id, []
+        while cursor + 1 < floor:
+            page = self.history.read_page(cursor, limit)
+            older = [(seq, message) for seq, message in page['events'] if seq < floor]
+            cursor = page['last_seq'] if page['has_more'] else floor - 1
+            if older:
+                break
+        return older if cursor + 1 < floor else older + recent
+
+    def wait(self, last_id, timeout):
+        """等待出现序号大于 last_id 的消息，超时返回False"""
+        with self._condition:
+            return self._condition.wait_for(lambda: self._seq > last_id, timeout)
+
+    def stream(self, last_id=None):
+        """SSE事件生成器；last_id 为None时只推送之后的新消息"""
+        if last_id is None:
+            last_id = self._seq
+        # 服务端重启后序号会重新计数，客户端的序号比当前大时从头推送
+        if last_id > self._seq:
+            last_id = 0
+        yield "retry: 2000\n\n"
+        while True:
+            if not self.wait(last_id, HEARTBEAT_INTERVAL):
+                yield ": heartbeat\n\n"
+                continue
+            events = self.events_after(last_id)
+            if not events:
+                # 错过的消息已无处可取，游标跳过这段空缺，否则 wait 会立即返回而空转
+                with self._condition:
+                    last_id = max(last_id, self._floor() - 1)
+                continue
+            for seq, message in events:
+                yield format_event(seq, message)
+                last_id = seq
+
+    def clear(self):
+        """清空内存中的消息和 history，序号继续递增，已连接的客户端不受影响"""
+        with self._condition:
+            self._events.clear()
+            if self.history is not None:
+                self.history.clear()
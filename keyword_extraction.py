@@ -0,0 +1,245 @@
+import argparse
+import hashlib
+import os
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+import jieba
+import jieba.analyse
+import jieba.posseg
+
+# 可选的关键词提取方式：textrank 效果最好但最慢，tfidf 和 segment（分词+停用词过滤）更快
+EXTRACTORS = ('textrank', 'tfidf', 'segment')
+# 少于这么多条标题时直接在当前进程中提取，进程间传输的开销不值得
+PARALLEL_MIN_TITLES = 500
+
+STOPWORDS = set("""
+的 了 和 是 在 我 有 就 不 人 都 一 一个 上 也 很 到 说 要 去 你 会 着 没有 看 好 自己 这 那 这个 那个
+什么 怎么 为什么 如何 这样 那样 还是 就是 可以 不是 我们 你们 他们 她们 它们 一下 一些 一种 一起
+因为 所以 但是 而且 如果 虽然 或者 以及 然后 还有 只是 真的 居然 竟然 终于 已经 最后 之后 之前
+吗 呢 吧 啊 哦 呀 嘛 哈 哈哈 哈哈哈 啦 么 与 及 把 被 给 让 对 从 向 比 为 以 于 又 再 才 更 最 太
+第一 第二 第三 这些 那些 这么 那么 多少 几个 有点 没 别 能 能够 需要 应该 可能 一定 其实 今天 明天
+""".split())
+
+# 合并后的词典和jieba生成的前缀词典缓存都保存在此目录，重启后直接加载
+JIEBA_CACHE_DIR = os.environ.get('BILI_JIEBA_CACHE', 'jieba_cache')
+# 类别/话题关键词在用户词典中的词频和词性，词频足够高才能保证分词时不被拆开
+USER_WORD_FREQ = 1000
+USER_WORD_TAG = 'n'
+
+_pool = None
+_pool_workers = None
+# 分析任务的多个线程可能同时创建、替换进程池或向其提交任务
+_pool_lock = threading.Lock()
+_jieba_ready = False
+# 预热线程和分析线程可能同时调用 prepare_jieba
+_jieba_lock = threading.Lock()
+
+
+def custom_words():
+    """类别和话题关键词中需要加入jieba词典的中文词"""
+    from bilibili_analyzer import CATEGORY_KEYWORDS, TOPIC_KEYWORDS
+
+    words = [word for info in CATEGORY_KEYWORDS.values() for word in info['core'] + info['related']]
+    words += [word for keywords in TOPIC_KEYWORDS.values() for word in keywords]
+    return sorted({word for word in words
+                   if not word.isascii() and not any(ch.isspace() for ch in word)})
+
+
+def build_dictionary(cache_dir=JIEBA_CACHE_DIR, words=None):
+    """把jieba自带的主词典和关键词用户词典合并为一个文件，内容不变时复用已生成的文件
+
+    总是以jieba包内的默认词典为基础，而不是当前使用的词典，否则会把已合并的词典再合并一次。
+    """
+    words = custom_words() if words is None else words
+    main_dict = jieba.get_module_res(jieba.DEFAULT_DICT_NAME)
+    try:
+        main_bytes = main_dict.read()
+    finally:
+        main_dict.close()
+    digest = hashlib.sha1(main_bytes)
+    digest.update('\n'.join(words).encode('utf-8'))
+    path = os.path.join(cache_dir, f"dict_{digest.hexdigest()[:12]}.txt")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    known = {line.split(b' ', 1)[0].decode('utf-8') for line in main_bytes.splitlines() if line}
+    extra = [f"{word} {USER_WORD_FREQ} {USER_WORD_TAG}" for word in words if word not in known]
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, 'wb') as f:
+        f.write(main_bytes.rstrip(b'\n') + b'\n')
+        if extra:
+            f.write(('\n'.join(extra) + '\n').encode('utf-8'))
+    os.replace(tmp_path, path)
+    return path
+
+
+def prepare_jieba(cache_dir=JIEBA_CACHE_DIR):
+    """加载带关键词用户词典的jieba词典
+
+    jieba会把构建好的前缀词典序列化到 cache_dir，之后的进程直接读取缓存，无需重新构建。
+    jieba.posseg 在导入时就按默认词典加载了词性表，切换词典后要重新加载，
+    否则新词被标为 x，TextRank 按词性过滤时会把它们丢掉。
+    """
+    global _jieba_ready
+    if _jieba_ready:
+        return
+    with _jieba_lock:
+        if _jieba_ready:
+            return
+        try:
+            path = build_dictionary(cache_dir)
+            jieba.dt.tmp_dir = cache_dir
+            if jieba.dt.dictionary != os.path.abspath(path):
+                jieba.set_dictionary(path)
+            jieba.initialize()
+        except Exception as e:
+            print(f"生成jieba词典缓存失败，使用默认词典: {e}")
+            jieba.dt.dictionary, jieba.dt.initialized = jieba.DEFAULT_DICT, False
+            jieba.initialize()
+        jieba.posseg.dt.load_word_tag(jieba.dt.get_dict_file())
+        _jieba_ready = True
+
+
+def default_workers():
+    """默认的关键词提取进程数，可用环境变量 BILI_KEYWORD_WORKERS 覆盖"""
+    configured = os.environ.get('BILI_KEYWORD_WORKERS')
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+def segment_keywords(text, topK=5):
+    """分词后去掉停用词、单字和非文字符号，按出现顺序取前 topK 个"""
+    keywords = []
+    for word in jieba.lcut(text):
+        word = word.strip()
+        if len(word) < 2 or word in STOPWORDS or not any(ch.isalnum() for ch in word):
+            continue
+        if word not in keywords:
+            keywords.append(word)
+            if len(keywords) >= topK:
+                break
+    return keywords
+
+
+def extract_keywords(text, method='textrank', topK=5):
+    """提取单条文本的关键词"""
+    prepare_jieba()
+    if method == 'textrank':
+        return jieba.analyse.textrank(text, topK=topK)
+    if method == 'tfidf':
+        return jieba.analyse.extract_tags(text, topK=topK)
+    if method == 'segment':
+        return segment_keywords(text, topK)
+    raise ValueError(f"未知的关键词提取方式: {method}")
+
+
+def _init_worker():
+    # 每个工作进程只加载一次jieba词典
+    prepare_jieba()
+
+
+def _extract_chunk(args):
+    texts, method, topK = args
+    return [extract_keywords(text, method, topK) for text in texts]
+
+
+def _get_pool(workers):
+    """复用同一个进程池，避免每批都重新启动进程和加载词典；调用方需持有 _pool_lock"""
+    global _pool, _pool_workers
+    if _pool is None or _pool_workers != workers:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        _pool_workers = workers
+    return _pool
+
+
+def shutdown_pool():
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool, _pool_workers = None, None
+
+
+def extract_batch(texts, method='textrank', topK=5, workers=None):
+    """批量提取关键词，结果与输入顺序一一对应
+
+    标题较多且 workers 大于1时分块交给进程池并行处理。
+    """
+    if method not in EXTRACTORS:
+        raise ValueError(f"未知的关键词提取方式: {method}")
+    texts = list(texts)
+    prepare_jieba()
+    workers = workers or default_workers()
+    if workers <= 1 or len(texts) < PARALLEL_MIN_TITLES:
+        return _extract_chunk((texts, method, topK))
+
+    # 每个进程分到几块，兼顾负载均衡和传输次数
+    chunk_size = max(50, len(texts) // (workers * 4) + 1)
+    chunks = [(texts[i:i + chunk_size], method, topK) for i in range(0, len(texts), chunk_size)]
+    # map 在锁内提交全部任务，之后其他线程替换进程池时已提交的任务仍会执行完
+    with _pool_lock:
+        parts = _get_pool(workers).map(_extract_chunk, chunks)
+    results = []
+    for part in parts:
+        results.extend(part)
+    return results
+
+
+def sample_titles(paths, count):
+    """读取基准测试用的标题，没有数据文件时用类别关键词随机拼出标题"""
+    from crawl_output import read_videos
+
+    titles = []
+    for path in paths:
+        if os.path.exists(path):
+            titles.extend(f"{video['title']} {video.get('up_name', '')}" for video in read_videos(path))
+    if not titles:
+        from bilibili_analyzer import CATEGORY_KEYWORDS
+        words = [word for info in CATEGORY_KEYWORDS.values() for word in info['core'] + info['related']]
+        rng = random.Random(0)
+        titles = [''.join(rng.sample(words, 3)) + rng.choice(['的一天', '教程', '合集', '实况', '']) for _ in range(count)]
+    while len(titles) < count:
+        titles.extend(titles[:count - len(titles)])
+    return titles[:count]
+
+
+def benchmark(titles, methods=EXTRACTORS, worker_counts=(1,), topK=5):
+    """测量各提取方式在不同进程数下的吞吐量（标题/秒）"""
+    prepare_jieba()
+    results = []
+    for method in methods:
+        for workers in worker_counts:
+            if workers > 1:
+                # 预先启动进程池，计时不包含进程启动和词典加载
+                extract_batch(titles[:PARALLEL_MIN_TITLES], method, topK, workers)
+            start = time.perf_counter()
+            extract_batch(titles, method, topK, workers)
+            elapsed = time.perf_counter() - start
+            results.append({
+                'method': method,
+                'workers': workers,
+                'titles': len(titles),
+                'seconds': round(elapsed, 3),
+                'titles_per_sec': round(len(titles) / elapsed, 1)
+            })
+            print(f"{method:<9} 进程数 {workers:<3} {len(titles)} 条标题 {elapsed:.2f} 秒  {len(titles) / elapsed:.0f} 条/秒")
+    shutdown_pool()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="关键词提取吞吐量基准测试")
+    parser.add_argument("--data", nargs="*", default=['bilibili_videos.jsonl', 'bilibili_videos.json'], help="已爬取的视频数据文件")
+    parser.add_argument("--count", type=int, default=5000, help="测试的标题条数")
+    parser.add_argument("--methods", nargs="*", default=list(EXTRACTORS), choices=EXTRACTORS, help="提取方式")
+    parser.add_argument("--workers", nargs="*", type=int, default=None, help="进程数，默认测试1和CPU核数")
+    args = parser.parse_args()
+
+    worker_counts = args.workers or sorted({1, default_workers()})
+    benchmark(sample_titles(args.data, args.count), args.methods, worker_counts)
@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from event_stream import event_type
+
+# 序列化后超过该长度（字节）的消息单独存为文件，如二维码图片和完整的分析结果
+BLOB_THRESHOLD = 4096
+# 每追加这么多条消息执行一次保留策略
+PRUNE_EVERY = 200
+
+
+class MessageLog:
+    """追加写入的状态消息日志
+
+    每条消息以序号为主键写入SQLite，序号与SSE事件ID一致，可按序号分页读取。
+    较大的消息内容按内容哈希存放在 blob_dir 中，日志里只保存引用。
+    按条数、时间和文件总大小清理旧消息，长期运行时占用的空间保持有界。
+    """
+
+    def __init__(self, db_path='message_log.db', blob_dir='message_blobs', max_messages=5000,
+                 max_age_days=30, max_blob_bytes=200 * 1024 * 1024, blob_threshold=BLOB_THRESHOLD):
+        self.db_path = db_path
+        self.blob_dir = blob_dir
+        self.max_messages = max_messages
+        self.max_age_days = max_age_days
+        self.max_blob_bytes = max_blob_bytes
+        self.blob_threshold = blob_threshold
+        self._appended = 0
+        self._lock = threading.Lock()
+        os.makedirs(blob_dir, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    seq INTEGER PRIMARY KEY,
+                    type TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    data TEXT,
+                    blob TEXT
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    digest TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_type ON messages (type, seq)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_blob ON messages (blob)")
+            self._conn.commit()
+
+    @property
+    def last_seq(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(MAX(seq), 0) FROM messages").fetchone()[0]
+
+    def _blob_path(self, digest):
+        return os.path.join(self.blob_dir, digest + '.json')
+
+    def _write_blob(self, payload, now):
+        """按内容哈希保存大消息，相同内容只存一份"""
+        digest = hashlib.sha1(payload.encode('utf-8')).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.tmp{os.getpid()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        self._conn.execute("INSERT OR IGNORE INTO blobs (digest, size, created_at) VALUES (?, ?, ?)",
+                           (digest, len(payload.encode('utf-8')), now))
+        return digest
+
+    def read_blob(self, digest):
+        """读取单独存放的消息内容，文件已被清理时返回None"""
+        try:
+            with open(self._blob_path(digest), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def append_many(self, events):
+        """追加 [(序号, 消息)]，序号由 EventBroker 分配"""
+        if not events:
+            return
+        now = time.time()
+        with self._lock:
+            rows = []
+            for seq, message in events:
+                payload = json.dumps(message, ensure_ascii=False)
+                if len(payload) > self.blob_threshold:
+                    rows.append((seq, event_type(message), now, None, self._write_blob(payload, now)))
+                else:
+                    rows.append((seq, event_type(message), now, payload, None))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO messages (seq, type, created_at, data, blob) VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self._appended += len(rows)
+            need_prune = self._appended >= PRUNE_EVERY
+        if need_prune:
+            self.prune()
+
+    def _load(self, rows, inline=True):
+        """把查询结果还原为 [(序号, 消息)]；inline 为False时大消息只返回引用"""
+        result = []
+        for seq, data, blob in rows:
+            if blob is None:
+                message = json.loads(data)
+            elif inline:
+                message = self.read_blob(blob)
+                if message is None:
+                    continue
+            else:
+                message = {"$blob": blob}
+            result.append((seq, message))
+        return result
+
+    def read_page(self, after=0, limit=100, inline=True):
+        """按序号分页读取 after 之后的消息
+
+        文件已被清理的大消息会被跳过，因此 last_seq 和 has_more 按实际读到的行计算，
+        下一页从 last_seq 继续读取。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, data, blob FROM messages WHERE seq > ? ORDER BY seq LIMIT ?",
+                (after, limit)
+            ).fetchall()
+        return {
+            'events': self._load(rows, inline),
+            'last_seq': rows[-1][0] if rows else after,
+            'has_more': len(rows) == limit
+        }
+
+    def read(self, after=0, limit=100, inline=True):
+        """按序号分页读取 after 之后的消息"""
+        return self.read_page(after, limit, inline)['events']
+
+    def tail(self, limit=200, skip_types=()):
+        """最近的 limit 条消息，按序号升序返回"""
+        sql = "SELECT seq, data, blob FROM messages"
+        if skip_types:
+            sql += f" WHERE type NOT IN ({','.join('?' * len(skip_types))})"
+        sql += " ORDER BY seq DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*skip_types, limit)).fetchall()
+        return self._load(reversed(rows))
+
+    def latest(self, message_type):
+        """某一类型的最新一条消息，没有时返回None"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, data, blob FROM messages WHERE type = ? ORDER BY seq DESC LIMIT 1",
+                (message_type,)
+            ).fetchall()
+        loaded = self._load(rows)
+        return loaded[0] if loaded else None
+
+    def prune(self):
+        """按条数、保存时间和文件总大小清理旧消息，并删除不再被引用的文件"""
+        with self._lock:
+            self._appended = 0
+            cutoff = time.time() - self.max_age_days * 86400
+            self._conn.execute("DELETE FROM messages WHERE created_at < ?", (cutoff,))
+            self._conn.execute(
+                "DELETE FROM messages WHERE seq <= "
+                "(SELECT seq FROM messages ORDER BY seq DESC LIMIT 1 OFFSET ?)",
+                (self.max_messages,)
+            )
+            # 文件总大小超限时，从最旧的开始删除，引用它们的消息一并删除
+            total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+            if total > self.max_blob_bytes:
+                for digest, size in self._conn.execute(
+                        "SELECT digest, size FROM blobs ORDER BY created_at").fetchall():
+                    if total <= self.max_blob_bytes:
+                        break
+                    self._conn.execute("DELETE FROM messages WHERE blob = ?", (digest,))
+                    total -= size
+            orphans = [row[0] for row in self._conn.execute(
+                "SELECT digest FROM blobs WHERE digest NOT IN "
+                "(SELECT blob FROM messages WHERE blob IS NOT NULL)").fetchall()]
+            self._conn.executemany("DELETE FROM blobs WHERE digest = ?", [(digest,) for digest in orphans])
+            self._conn.commit()
+            # 在锁内删除文件：否则在此期间追加的相同内容的消息会因文件仍存在而跳过写入，随后文件被删掉
+            for digest in orphans:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+        return len(orphans)
+
+    def import_legacy(self, path='message_history.json', start_seq=0):
+        """导入旧版 message_history.json 中的消息，导入后将原文件改名保留，返回最后的序号"""
+        if not os.path.exists(path):
+            return start_seq
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                messages = json.load(f)
+        except Exception as e:
+            print(f"读取旧版历史消息出错: {e}")
+            return start_seq
+        events = [(start_seq + i + 1, message) for i, message in enumerate(messages)]
+        self.append_many(events)
+        os.replace(path, path + '.migrated')
+        print(f"已导入 {len(events)} 条旧版历史消息")
+        return start_seq + len(events)
+
+    def clear(self):
+        """清空所有消息和文件"""
+        with self._lock:
+            digests = [row[0] for row in self._conn.execute("SELECT digest FROM blobs").fetchall()]
+            self._conn.execute("DELETE FROM messages")
+            self._conn.execute("DELETE FROM blobs")
+            self._conn.commit()
+            for digest in digests:
+                try:
+                    os.remove(self._blob_path(digest))
+                except OSError:
+                    pass
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,174 @@
+import json
+import os
+import tempfile
+import threading
+from collections import Counter
+from bilibili_analyzer import build_profile
+from video_table import EXACT_PLAY_LIMIT, PLAY_COUNT_BUCKETS, PlayCounts, VideoTable
+
+# 内存中最多暂存的待分类视频数，超出时整批写入临时文件
+MAX_PENDING = 5000
+# 后台线程每批分类的最大视频数
+CLASSIFY_BATCH = 200
+
+
+class ProfileAggregator:
+    """增量用户画像聚合器
+
+    只维护类别、话题、UP主和播放量的计数器，随时可以在常数时间内生成
+    与 BilibiliAnalyzer.generate_user_profile 相同结构的画像。
+    爬虫每接受一个视频就调用 add()，视频进入待分类队列后立即返回，不占用爬取线程；
+    后台线程按批取出，用分析器的 analyze_batch 一次完成关键词提取、打分和结果缓存写入。
+    分析器（词向量模型）就绪前收到的视频暂存起来，超过 max_pending 条时写入临时文件，
+    调用 attach_analyzer() 后补算。
+    分类出错的批次不会并入画像，计入 failed_count 并通过 status_queue 报告。
+    归档分析等已经得到分析结果的场景直接调用 add_results()，多个聚合器可以用 merge() 合并。
+    """
+
+    def __init__(self, analyzer=None, buckets=PLAY_COUNT_BUCKETS, max_pending=MAX_PENDING,
+                 batch_size=CLASSIFY_BATCH, exact_limit=EXACT_PLAY_LIMIT, status_queue=None):
+        self.analyzer = analyzer
+        self.status_queue = status_queue
+        self.buckets = buckets
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self._lock = threading.Condition()
+        self._pending = []
+        # 溢出到临时文件的视频：文件对象、下一条的读取位置和剩余条数
+        self._spill = None
+        self._spill_pos = 0
+        self._spilled = 0
+        self._in_flight = 0
+        self._worker = None
+        self.video_count = 0
+        self.cache_hits = 0
+        # 分类出错而未能并入画像的视频数
+        self.failed_count = 0
+        self.category_counts = Counter()
+        self.topic_counts = Counter()
+        self.up_counts = Counter()
+        self.play = PlayCounts(buckets, exact_limit)
+
+    def attach_analyzer(self, analyzer):
+        """设置分析器并在后台补算模型就绪前暂存的视频"""
+        with self._lock:
+            self.analyzer = analyzer
+            self._ensure_worker()
+
+    def add(self, video):
+        """加入一个新爬取的视频，分类在后台线程中进行"""
+        with self._lock:
+            self._pending.append(video)
+            if len(self._pending) >= self.max_pending:
+                self._spill_pending()
+            self._ensure_worker()
+
+    def add_results(self, table, results, cache_hits=0):
+        """并入一批视频（VideoTable）及其分析结果"""
+        up_counts = table.up_counts()
+        known = table.known_play_counts()
+        with self._lock:
+            self.video_count += len(table)
+            self.cache_hits += cache_hits
+            for result in results:
+                self.category_counts[result['category']] += 1
+                if result['topic']:
+                    self.topic_counts[result['topic']] += 1
+            self.up_counts.update(up_counts)
+            self.play.add(known)
+
+    def merge(self, other):
+        """合并另一个聚合器已并入的结果"""
+        with self._lock:
+            self.video_count += other.video_count
+            self.cache_hits += other.cache_hits
+            self.failed_count += other.failed_count
+            self.category_counts.update(other.category_counts)
+            self.topic_counts.update(other.topic_counts)
+            self.up_counts.update(other.up_counts)
+            self.play.merge(other.play)
+        return self
+
+    def _spill_pending(self):
+        if self._spill is None:
+            self._spill = tempfile.TemporaryFile('w+', encoding='utf-8')
+            self._spill_pos = 0
+        self._spill.seek(0, os.SEEK_END)
+        for video in self._pending:
+            self._spill.write(json.dumps(video, ensure_ascii=False) + '\n')
+        self._spilled += len(self._pending)
+        self._pending = []
+
+    def _take_batch(self):
+        """取出下一批待分类的视频，先取较早溢出到文件中的"""
+        if self._spilled:
+            self._spill.seek(self._spill_pos)
+            batch = []
+            while self._spilled and len(batch) < self.batch_size:
+                batch.append(json.loads(self._spill.readline()))
+                self._spilled -= 1
+            self._spill_pos = self._spill.tell()
+            if not self._spilled:
+                self._spill.close()
+                self._spill = None
+            return batch
+        batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+        return batch
+
+    def _ensure_worker(self):
+        if self.analyzer is not None and self._worker is None and (self._pending or self._spilled):
+            self._worker = threading.Thread(target=self._drain, daemon=True)
+            self._worker.start()
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                batch = self._take_batch()
+                if not batch:
+                    self._worker = None
+                    self._lock.notify_all()
+                    return
+                self._in_flight = len(batch)
+                analyzer = self.analyzer
+            try:
+                results, hits = analyzer.analyze_batch(batch, self.batch_size)
+                self.add_results(VideoTable.from_videos(batch), results, hits)
+            except Exception as e:
+                with self._lock:
+                    self.failed_count += len(batch)
+                message = f"增量画像分类出错，{len(batch)} 个视频未计入画像: {e}"
+                print(message)
+                if self.status_queue:
+                    self.status_queue.put({"type": "message", "data": message})
+            finally:
+                with self._lock:
+                    self._in_flight = 0
+                    self._lock.notify_all()
+
+    @property
+    def pending_count(self):
+        """已加入但尚未并入画像的视频数"""
+        with self._lock:
+            return len(self._pending) + self._spilled + self._in_flight
+
+    def wait_idle(self, timeout=None):
+        """等待已加入的视频全部分类完成，超时或尚无分析器时返回False"""
+        with self._lock:
+            if self.analyzer is None:
+                return not (self._pending or self._spilled)
+            return self._lock.wait_for(lambda: not (self._pending or self._spilled or self._in_flight), timeout)
+
+    def popularity_stats(self):
+        """与 analyze_video_popularity 相同结构的播放量统计"""
+        with self._lock:
+            return self.play.stats()
+
+    def profile(self):
+        """生成当前的用户画像，尚无已分类的视频时返回None；分类出错未计入的视频数见 '分类失败视频数'"""
+        with self._lock:
+            if not self.category_counts:
+                return None
+            popular_topics = sorted(self.topic_counts.items(), key=lambda x: x[1], reverse=True)
+            profile = build_profile(dict(self.category_counts), popular_topics, self.play.stats(), self.up_counts)
+            profile['分类失败视频数'] = self.failed_count
+            return profile
@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import threading
+
+from crawl_output import write_json_atomic
+
+
+class ProfileCache:
+    """按内容寻址的用户画像缓存
+
+    键由数据文件内容的哈希和分析配置/词向量模型的版本指纹组成，
+    数据或配置不变时直接返回之前的画像。每个画像存为一个JSON文件，
+    总大小超过 max_bytes 时删除最久未使用的文件。
+    """
+
+    def __init__(self, cache_dir='profile_cache', max_bytes=50 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # 数据文件哈希的缓存：路径 -> (大小, 修改时间, 哈希)，文件未变化时无需重新计算
+        self._dataset_hashes = {}
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def dataset_hash(self, path):
+        """数据文件内容的哈希"""
+        stat = os.stat(path)
+        cached = self._dataset_hashes.get(path)
+        if cached and cached[:2] == (stat.st_size, stat.st_mtime_ns):
+            return cached[2]
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        value = digest.hexdigest()
+        self._dataset_hashes[path] = (stat.st_size, stat.st_mtime_ns, value)
+        return value
+
+    @staticmethod
+    def content_hash(data):
+        """已读入内存的数据文件内容的哈希，与 dataset_hash 的结果一致"""
+        return hashlib.sha1(data).hexdigest()
+
+    @staticmethod
+    def make_key(dataset_hash, version):
+        """缓存键，同时用作HTTP的ETag"""
+        return hashlib.sha1(f"{dataset_hash}:{version}".encode('utf-8')).hexdigest()[:32]
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def __contains__(self, key):
+        return key.isalnum() and os.path.exists(self._path(key))
+
+    def get(self, key):
+        """读取缓存的画像，未命中时返回None"""
+        if not key.isalnum():
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                profile = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        # 更新修改时间，淘汰时按最近使用时间排序
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return profile
+
+    def put(self, key, profile):
+        """保存画像并按总大小淘汰旧文件"""
+        with self._lock:
+            write_json_atomic(self._path(key), profile)
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.json'):
+                    try:
+                        os.remove(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        pass
@@ -0,0 +1,147 @@
+import argparse
+import os
+import time
+import numpy as np
+from shared_vectors import SharedVectors, export_shared
+
+# 支持的量化格式：float16 直接截断精度，int8 为每行一个缩放系数的对称量化
+QUANT_DTYPES = ('float16', 'int8')
+
+
+def quantize(matrix, dtype='int8'):
+    """量化向量矩阵，返回 (量化矩阵, 每行缩放系数)；float16 不需要缩放系数"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype == 'float16':
+        return matrix.astype(np.float16), None
+    if dtype == 'int8':
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.rint(matrix / scales[:, None]).clip(-127, 127).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"不支持的量化格式: {dtype}")
+
+
+def export_quantized(word_vectors, output, dtype='int8'):
+    """导出量化后的共享词向量目录"""
+    vectors, scales = quantize(word_vectors.vectors, dtype)
+    extra = {'scales': scales} if scales is not None else None
+    return export_shared(word_vectors, output, vectors=vectors, extra_arrays=extra)
+
+
+class QuantizedVectors(SharedVectors):
+    """量化存储的只读映射词向量
+
+    接口与 SharedVectors 相同，取出的行在使用时才反量化为float32，
+    矩阵占用的内存和读取带宽为float32的1/2（float16）或约1/4（int8）。
+    打分仍在反量化后的float32矩阵上进行，只减少内存，计算速度与float32相同。
+    """
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.dtype = self.meta['dtype']
+        scales_path = os.path.join(path, 'scales.npy')
+        self._scales = np.load(scales_path, mmap_mode='r') if os.path.exists(scales_path) else None
+
+    def _matrix(self, rows):
+        matrix = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self._scales is not None:
+            matrix *= np.asarray(self._scales[rows], dtype=np.float32)[:, None]
+        return matrix
+
+    @property
+    def nbytes(self):
+        """向量矩阵及缩放系数占用的字节数"""
+        return self.vectors.nbytes + (self._scales.nbytes if self._scales is not None else 0)
+
+
+def _sample_videos(paths, count, allow_synthetic=False):
+    """读取用于对比的视频；没有数据文件时报错，allow_synthetic 为True时改用随机拼出的标题"""
+    from crawl_output import read_videos
+    from keyword_extraction import sample_titles
+
+    videos = []
+    for path in paths:
+        if os.path.exists(path):
+            videos.extend(read_videos(path))
+    if not videos:
+        if not allow_synthetic:
+            raise FileNotFoundError(f"未找到已爬取的视频数据 ({', '.join(paths)})，请用 --data 指定，"
+                                    f"或加 --synthetic 使用随机拼出的标题")
+        print("警告: 没有已爬取的视频数据，改用随机拼出的标题，结果不代表真实数据上的精度")
+        videos = [{'title': title, 'up_name': ''} for title in sample_titles([], count)]
+    return videos[:count]
+
+
+def accuracy_report(reference, quantized, videos):
+    """比较量化词向量与float32词向量在同一批视频上的类别判定和得分"""
+    from bilibili_analyzer import BilibiliAnalyzer
+    from keyword_extraction import prepare_jieba
+
+    # 先加载jieba词典，计时只包含分类本身
+    prepare_jieba()
+    results = {}
+    for name, word_vectors in (('reference', reference), ('quantized', quantized)):
+        analyzer = BilibiliAnalyzer(None, word_vectors=word_vectors, keyword_workers=1)
+        start = time.perf_counter()
+        best = []
+        scores = []
+        for _, _, chunk_scores, chunk_best in analyzer.classify_videos(videos):
+            best.append(chunk_best)
+            scores.append(chunk_scores)
+        results[name] = {
+            'best': np.concatenate(best) if best else np.zeros(0, dtype=np.intp),
+            'scores': np.vstack(scores) if scores else np.zeros((0, 0), dtype=np.float32),
+            'seconds': time.perf_counter() - start
+        }
+
+    reference_best, quantized_best = results['reference']['best'], results['quantized']['best']
+    diff = np.abs(results['reference']['scores'] - results['quantized']['scores'])
+    reference_bytes = np.asarray(reference.vectors).nbytes
+    quantized_bytes = quantized.nbytes if hasattr(quantized, 'nbytes') else np.asarray(quantized.vectors).nbytes
+    return {
+        'videos': len(videos),
+        'agreement': float((reference_best == quantized_best).mean()) if len(videos) else 1.0,
+        'changed': int((reference_best != quantized_best).sum()),
+        'score_mean_abs_diff': float(diff.mean()) if diff.size else 0.0,
+        'score_max_abs_diff': float(diff.max()) if diff.size else 0.0,
+        'reference_mb': round(reference_bytes / 1024 / 1024, 1),
+        'quantized_mb': round(quantized_bytes / 1024 / 1024, 1),
+        'reference_seconds': round(results['reference']['seconds'], 3),
+        'quantized_seconds': round(results['quantized']['seconds'], 3)
+    }
+
+
+def print_report(report):
+    print("\n=== 量化词向量精度报告 ===")
+    print(f"视频数: {report['videos']}")
+    print(f"类别判定一致率: {report['agreement'] * 100:.2f}% (变化 {report['changed']} 个)")
+    print(f"得分平均绝对误差: {report['score_mean_abs_diff']:.5f}，最大误差: {report['score_max_abs_diff']:.5f}")
+    print(f"矩阵大小: {report['reference_mb']} MB -> {report['quantized_mb']} MB")
+    print(f"分类耗时: {report['reference_seconds']} 秒 -> {report['quantized_seconds']} 秒")
+
+
+if __name__ == "__main__":
+    from vector_store import DEFAULT_VEC_FILE, load_word_vectors
+
+    parser = argparse.ArgumentParser(description="量化词向量工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="导出量化后的共享词向量目录")
+    export_parser.add_argument("source", nargs="?", default=DEFAULT_VEC_FILE, help="词向量文件(.vec、.kv 或共享目录)")
+    export_parser.add_argument("--dtype", choices=QUANT_DTYPES, default='int8')
+    export_parser.add_argument("--output", default=None, help="输出目录，默认为 <源文件名>.<dtype>")
+
+    report_parser = subparsers.add_parser("report", help="对比量化前后的类别判定")
+    report_parser.add_argument("quantized", help="量化后的共享词向量目录")
+    report_parser.add_argument("--source", default=DEFAULT_VEC_FILE, help="作为基准的float32词向量")
+    report_parser.add_argument("--data", nargs="*", default=['bilibili_videos.jsonl', 'bilibili_videos.json'], help="已爬取的视频数据文件")
+    report_parser.add_argument("--count", type=int, default=2000, help="最多对比的视频数")
+    report_parser.add_argument("--synthetic", action="store_true", help="没有数据文件时使用随机拼出的标题")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        output = args.output or f"{os.path.splitext(args.source.rstrip(os.sep))[0]}.{args.dtype}"
+        export_quantized(load_word_vectors(args.source), output, args.dtype)
+    elif args.command == "report":
+        videos = _sample_videos(args.data, args.count, args.synthetic)
+        print_report(accuracy_report(load_word_vectors(args.source), QuantizedVectors(args.quantized), videos))
@@ -0,0 +1,192 @@
+import hashlib
+import math
+import os
+import struct
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 上只在进程内加锁
+    fcntl = None
+
+# 文件头：魔数、位数、哈希函数个数、设计容量、目标误判率、已加入的数量
+_HEADER = struct.Struct('<8sQIQdQ')
+_MAGIC = b'BILIBLM1'
+HEADER_SIZE = 64
+# 默认按2000万个视频、0.1%误判率设计，位数组约34MB
+DEFAULT_CAPACITY = 20_000_000
+DEFAULT_ERROR_RATE = 0.001
+
+
+def bloom_size(capacity, error_rate):
+    """给定容量和误判率时的 (位数, 哈希函数个数)"""
+    bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+def _key_hashes(keys):
+    """每个键的两个64位哈希，用于双重哈希生成k个位置"""
+    digests = b''.join(hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest() for key in keys)
+    pairs = np.frombuffer(digests, dtype='<u8').reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1] | np.uint64(1)
+
+
+class BloomFilter:
+    """保存在文件中的布隆过滤器
+
+    位数组以内存映射方式打开，多个进程共享同一份页缓存；占用的内存由设计容量决定，
+    与已加入的键的数量无关。超过设计容量后误判率会升高，但不会漏判。
+    每次加入后立即刷新到磁盘；文件头中的 count 记录累计加入的键数，
+    调用方可与自己的记录数比较，不一致时（如进程在写入前崩溃）用 rebuild() 重建。
+    重建写入临时文件后原子替换，其他进程查询时不会看到清空了一半的位数组。
+    """
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.path = path
+        # 写入时加文件锁的文件，重建时不会被替换
+        self.lock_path = f"{path}.lock"
+        self._lock = threading.Lock()
+        if not os.path.exists(path):
+            self._create(path, capacity, error_rate)
+        self._open()
+
+    def _open(self):
+        """映射当前的过滤器文件，记下其inode以便发现被其他进程重建替换"""
+        with open(self.path, 'rb') as f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            magic, bits, hashes, capacity, error_rate, _ = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} 不是布隆过滤器文件")
+        self.bits = bits
+        self.hashes = hashes
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._array = np.memmap(self.path, dtype=np.uint8, mode='r+', offset=HEADER_SIZE, shape=(bits // 8,))
+        self._header = np.memmap(self.path, dtype=np.uint8, mode='r+', shape=(HEADER_SIZE,))
+
+    def _reopen_if_replaced(self):
+        try:
+            replaced = os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return
+        if replaced:
+            self._open()
+
+    @staticmethod
+    def _create(path, capacity, error_rate):
+        """创建空的过滤器文件"""
+        bits, hashes = bloom_size(capacity, error_rate)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, bits, hashes, capacity, error_rate, 0).ljust(HEADER_SIZE, b'\0'))
+            # 稀疏文件，未写入的部分不占磁盘
+            f.truncate(HEADER_SIZE + bits // 8)
+        os.replace(tmp_path, path)
+
+    @property
+    def count(self):
+        """累计加入的键的数量（同一个键重复加入会重复计数）"""
+        self._reopen_if_replaced()
+        return _HEADER.unpack(self._header[:_HEADER.size].tobytes())[5]
+
+    def _set_count(self, count):
+        header = list(_HEADER.unpack(self._header[:_HEADER.size].tobytes()))
+        header[5] = count
+        self._header[:_HEADER.size] = np.frombuffer(_HEADER.pack(*header), dtype=np.uint8)
+
+    @contextmanager
+    def _locked(self):
+        """进程内加锁，并用文件锁与同时写入的其他爬取进程串行化，避免同一字节的置位互相覆盖
+
+        取得锁后如果文件已被其他进程重建替换，先重新映射，保证写入的是当前的文件
+        """
+        with self._lock, open(self.lock_path, 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._reopen_if_replaced()
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _positions(self, keys):
+        h1, h2 = _key_hashes(keys)
+        steps = np.arange(self.hashes, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.bits)
+
+    def contains_many(self, keys):
+        """批量判断，返回布尔数组；False 表示一定没有加入过"""
+        keys = list(keys)
+        if not keys:
+            return np.zeros(0, dtype=bool)
+        self._reopen_if_replaced()
+        positions = self._positions(keys)
+        masks = np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+        return ((self._array[positions >> np.uint64(3)] & masks) != 0).all(axis=1)
+
+    def __contains__(self, key):
+        return bool(self.contains_many([key])[0])
+
+    def _set_bits(self, keys, array=None):
+        array = self._array if array is None else array
+        positions = self._positions(keys)
+        masks = np.left_shift(1, (positions & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+        np.bitwise_or.at(array, (positions >> np.uint64(3)).ravel(), masks.ravel())
+
+    def add_many(self, keys):
+        """批量加入并刷新到磁盘，返回加入的键的数量"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+        with self._locked():
+            self._set_bits(keys)
+            self._set_count(self.count + len(keys))
+            self.flush()
+        return len(keys)
+
+    def add(self, key):
+        self.add_many([key])
+
+    def rebuild(self, keys, batch_size=10000):
+        """用 keys（可以是生成器，每个键只应出现一次）重建过滤器，返回加入的键的数量
+
+        新的位数组写入临时文件后原子替换，重建期间其他进程仍查询旧文件
+        """
+        with self._locked():
+            tmp_path = f"{self.path}.rebuild{os.getpid()}"
+            self._create(tmp_path, self.capacity, self.error_rate)
+            array = np.memmap(tmp_path, dtype=np.uint8, mode='r+', offset=HEADER_SIZE, shape=(self.bits // 8,))
+            total = 0
+            batch = []
+            for key in keys:
+                batch.append(key)
+                if len(batch) >= batch_size:
+                    self._set_bits(batch, array)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                self._set_bits(batch, array)
+                total += len(batch)
+            array.flush()
+            del array
+            with open(tmp_path, 'r+b') as f:
+                f.write(_HEADER.pack(_MAGIC, self.bits, self.hashes, self.capacity, self.error_rate, total))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self._open()
+        return total
+
+    def flush(self):
+        self._array.flush()
+        self._header.flush()
+
+    @property
+    def nbytes(self):
+        return HEADER_SIZE + self.bits // 8
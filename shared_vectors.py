@@ -0,0 +1,191 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+# 共享词向量目录中的文件：向量矩阵、词表字节串及其偏移、按哈希排序的查找索引
+META_FILE = 'meta.json'
+ARRAY_FILES = ('vectors', 'offsets', 'hashes', 'rows')
+KEYS_FILE = 'keys.bin'
+
+
+def word_hash(word):
+    """词的64位哈希，导出和查找时使用同一算法"""
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def is_shared_dir(path):
+    """判断路径是否为导出的共享词向量目录"""
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, META_FILE))
+
+
+def open_shared(path):
+    """打开共享词向量目录，量化格式返回 QuantizedVectors"""
+    with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+        dtype = json.load(f).get('dtype', 'float32')
+    if dtype != 'float32':
+        from quantized_vectors import QuantizedVectors
+        return QuantizedVectors(path)
+    return SharedVectors(path)
+
+
+def export_shared(word_vectors, output, vectors=None, extra_arrays=None, meta=None):
+    """把词向量导出为全部可内存映射的数组
+
+    gensim 的 KeyedVectors 即使以 mmap 方式加载，每个进程仍要反序列化一份词表字典；
+    导出后词表和查找索引也是只读映射的数组，多进程加载时内存基本不随进程数增长。
+    vectors/extra_arrays/meta 用于写入量化后的矩阵及其附加数组。
+    """
+    start = time.time()
+    tmp_dir = f"{output}.tmp{os.getpid()}"
+    os.makedirs(tmp_dir, exist_ok=True)
+    keys = [str(key) for key in word_vectors.index_to_key]
+    encoded = [key.encode('utf-8') for key in keys]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(key) for key in encoded], out=offsets[1:])
+    hashes = np.array([word_hash(key) for key in keys], dtype=np.uint64)
+    rows = np.argsort(hashes, kind='stable')
+
+    if vectors is None:
+        vectors = np.asarray(word_vectors.vectors, dtype=np.float32)
+    np.save(os.path.join(tmp_dir, 'vectors.npy'), vectors)
+    for name, array in (extra_arrays or {}).items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    np.save(os.path.join(tmp_dir, 'offsets.npy'), offsets)
+    np.save(os.path.join(tmp_dir, 'hashes.npy'), hashes[rows])
+    np.save(os.path.join(tmp_dir, 'rows.npy'), rows.astype(np.int64))
+    with open(os.path.join(tmp_dir, KEYS_FILE), 'wb') as f:
+        f.write(b''.join(encoded))
+    with open(os.path.join(tmp_dir, META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(dict({
+            "vocab_size": len(keys),
+            "vector_size": word_vectors.vector_size,
+            "dtype": str(vectors.dtype),
+            "created_at": int(time.time())
+        }, **(meta or {})), f, ensure_ascii=False, indent=2)
+
+    if os.path.isdir(output):
+        for name in os.listdir(output):
+            os.remove(os.path.join(output, name))
+        os.rmdir(output)
+    os.replace(tmp_dir, output)
+    print(f"共享词向量导出完成 ({output})，{len(keys)} 词，耗时 {time.time() - start:.1f} 秒")
+    return output
+
+
+class _KeyList:
+    """按下标从映射的字节串中解码词，接口与 index_to_key 列表一致"""
+
+    def __init__(self, keys, offsets):
+        self._keys = keys
+        self._offsets = offsets
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return bytes(self._keys[start:end]).decode('utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class SharedVectors:
+    """只读映射的词向量
+
+    提供分析器用到的 `in`、`[]`、vector_size、index_to_key 接口，
+    所有数组都以 mmap_mode='r' 打开，同一台机器上的所有进程共享同一份页缓存。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in ARRAY_FILES}
+        self.vectors = arrays['vectors']
+        self._offsets = arrays['offsets']
+        self._hashes = arrays['hashes']
+        self._rows = arrays['rows']
+        self._keys = np.memmap(os.path.join(path, KEYS_FILE), dtype=np.uint8, mode='r') \
+            if self._offsets[-1] > 0 else np.zeros(0, dtype=np.uint8)
+        self.index_to_key = _KeyList(self._keys, self._offsets)
+        self.vector_size = self.vectors.shape[1]
+
+    def __len__(self):
+        return len(self.index_to_key)
+
+    def get_index(self, word, default=-1):
+        """词在矩阵中的行号，不存在时返回 default"""
+        value = np.uint64(word_hash(word))
+        position = int(np.searchsorted(self._hashes, value))
+        encoded = word.encode('utf-8')
+        # 哈希冲突时逐个比较原词
+        while position < len(self._hashes) and self._hashes[position] == value:
+            row = int(self._rows[position])
+            if bytes(self._keys[self._offsets[row]:self._offsets[row + 1]]) == encoded:
+                return row
+            position += 1
+        return default
+
+    def __contains__(self, word):
+        return self.get_index(word) >= 0
+
+    def _row(self, word):
+        row = self.get_index(word)
+        if row < 0:
+            raise KeyError(f"词 '{word}' 不在词表中")
+        return row
+
+    def _matrix(self, rows):
+        """取出若干行并转换为float32矩阵"""
+        return np.asarray(self.vectors[rows], dtype=np.float32)
+
+    def __getitem__(self, word):
+        return self._matrix(np.array([self._row(word)], dtype=np.int64))[0]
+
+    def lookup_rows(self, words):
+        """批量查找行号，返回 (在词表中的词, 行号数组)"""
+        found = []
+        rows = []
+        for word in words:
+            row = self.get_index(word)
+            if row >= 0:
+                found.append(word)
+                rows.append(row)
+        return found, np.array(rows, dtype=np.int64)
+
+    def get_vectors(self, words):
+        """批量查询，返回 (在词表中的词, 向量矩阵)，只做一次哈希查找"""
+        found, rows = self.lookup_rows(words)
+        return found, self._matrix(rows)
+
+    def similarity(self, word1, word2):
+        """两个词的余弦相似度"""
+        a, b = self._matrix(np.array([self._row(word1), self._row(word2)], dtype=np.int64))
+        denominator = np.linalg.norm(a) * np.linalg.norm(b)
+        return float(a @ b / denominator) if denominator else 0.0
+
+    def similarity_matrix(self, words, unit_matrix):
+        """批量打分：words 中每个词与已归一化矩阵各行的余弦相似度，返回 (在词表中的词, 相似度矩阵)"""
+        found, matrix = self.get_vectors(words)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return found, (matrix / norms) @ np.asarray(unit_matrix, dtype=np.float32).T
+
+
+if __name__ == "__main__":
+    from vector_store import DEFAULT_VEC_FILE, load_word_vectors
+
+    parser = argparse.ArgumentParser(description="导出可在多进程间共享的只读映射词向量")
+    parser.add_argument("source", nargs="?", default=DEFAULT_VEC_FILE, help="词向量文件(.vec 或 .kv)")
+    parser.add_argument("--output", default=None, help="输出目录，默认与源文件同名的 .shared 目录")
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.source)[0] + '.shared'
+    export_shared(load_word_vectors(args.source), output)
@@ -0,0 +1,21 @@
+import os
+import sys
+import pytest
+
+# 各模块都在仓库根目录下，直接按模块名导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def restore_jieba():
+    """测试结束后恢复全局jieba分词器的词典、缓存目录和 prepare_jieba 的状态"""
+    import jieba
+    import jieba.posseg
+    import keyword_extraction
+
+    saved = (jieba.dt.dictionary, jieba.dt.tmp_dir, keyword_extraction._jieba_ready)
+    yield
+    jieba.dt.dictionary, jieba.dt.tmp_dir, keyword_extraction._jieba_ready = saved
+    # 下次分词时按恢复的词典重新初始化，词性表也要随之重新加载
+    jieba.dt.initialized = False
+    jieba.posseg.dt.load_word_tag(jieba.dt.get_dict_file())
@@ -0,0 +1,46 @@
+import time
+import analysis_cache
+from analysis_cache import AnalysisCache
+
+
+def record(i):
+    return {'keywords': [f"词{i}"], 'scores': {'游戏': 0.5}, 'category': '游戏', 'topic': None}
+
+
+def test_prune_by_age_and_size(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.db')
+    cache = AnalysisCache(path, max_rows=10)
+    old = time.time() - 100 * 86400
+    monkeypatch.setattr(analysis_cache.time, 'time', lambda: old)
+    cache.put_many({'old': record(0)}, 'v1')
+    monkeypatch.undo()
+    cache.put_many({f"k{i}": record(i) for i in range(12)}, 'v1')
+    assert cache.prune() == 3
+    assert 'old' not in cache.get_many(['old'])
+    assert len(cache.get_many([f"k{i}" for i in range(12)])) == 10
+    cache.close()
+
+
+def test_pruned_on_open_and_after_writes(tmp_path, monkeypatch):
+    path = str(tmp_path / 'cache.db')
+    cache = AnalysisCache(path, max_rows=5)
+    monkeypatch.setattr(analysis_cache, 'PRUNE_EVERY', 4)
+    cache.put_many({f"a{i}": record(i) for i in range(3)}, 'v1')
+    cache.put_many({f"b{i}": record(i) for i in range(3)}, 'v2')
+    count = cache._conn.execute("SELECT COUNT(*) FROM video_analysis").fetchone()[0]
+    assert count == 5
+    cache.close()
+
+    monkeypatch.setattr(analysis_cache, 'PRUNE_EVERY', 5000)
+    cache = AnalysisCache(path, max_rows=2)
+    assert cache._conn.execute("SELECT COUNT(*) FROM video_analysis").fetchone()[0] == 2
+    cache.close()
+
+
+def test_prune_keep_version(tmp_path):
+    cache = AnalysisCache(str(tmp_path / 'cache.db'))
+    cache.put_many({'a': record(0), 'b': record(1)}, 'v1')
+    cache.put_many({'c': record(2)}, 'v2')
+    assert cache.prune(keep_version='v2') == 2
+    assert list(cache.get_many(['a', 'b', 'c'])) == ['c']
+    cache.close()
@@ -0,0 +1,114 @@
+import json
+import numpy as np
+import pytest
+from gensim.models import KeyedVectors
+from bilibili_analyzer import CATEGORY_KEYWORDS, CATEGORY_THRESHOLD, CORE_WEIGHT, BilibiliAnalyzer
+from video_table import VideoTable
+
+# 每个类别一个中心方向，类别词在中心附近，其余词随机分布，这样既有高于阈值也有低于阈值的得分
+DIM = 32
+EXTRA_WORDS = [f"词{i}" for i in range(40)]
+# 不在词表中的词，打分时应被忽略
+UNKNOWN_WORDS = ['不在词表一', '不在词表二']
+# 得分差距小于该值时视为平局，允许向量化实现与逐词实现的判定不同
+TIE_EPSILON = 1e-5
+
+
+@pytest.fixture(scope='module')
+def word_vectors():
+    rng = np.random.default_rng(0)
+    words, vectors = [], []
+    for category, info in CATEGORY_KEYWORDS.items():
+        center = rng.normal(size=DIM)
+        for word in dict.fromkeys(info['core'] + info['related']):
+            if word not in words:
+                words.append(word)
+                vectors.append(center + rng.normal(scale=0.8, size=DIM))
+    for word in EXTRA_WORDS:
+        words.append(word)
+        vectors.append(rng.normal(size=DIM))
+    kv = KeyedVectors(DIM)
+    kv.add_vectors(words, np.array(vectors, dtype=np.float32))
+    return kv
+
+
+@pytest.fixture(scope='module')
+def analyzer(word_vectors):
+    return BilibiliAnalyzer(json_file=None, word_vectors=word_vectors)
+
+
+def reference_similarity(word_vectors, keywords, category):
+    """向量化之前的逐词实现：每个关键词与核心词/相关词的最大相似度，核心词乘以权重后一起取平均"""
+    similarities = []
+    for kind, weight in (('core', CORE_WEIGHT), ('related', 1.0)):
+        for keyword in keywords:
+            if keyword in word_vectors:
+                sims = [word_vectors.similarity(keyword, word)
+                        for word in CATEGORY_KEYWORDS[category][kind] if word in word_vectors]
+                if sims:
+                    similarities.append(max(sims) * weight)
+    return np.mean(similarities) if similarities else 0
+
+
+def reference_category(scores):
+    best = max(scores.items(), key=lambda x: x[1])
+    return best[0] if best[1] > CATEGORY_THRESHOLD else '其他'
+
+
+def sample_keywords(word_vectors, count=300):
+    rng = np.random.default_rng(1)
+    vocab = list(word_vectors.index_to_key) + UNKNOWN_WORDS
+    return [list(rng.choice(vocab, size=rng.integers(0, 6), replace=False)) for _ in range(count)]
+
+
+def test_score_categories_matches_reference(analyzer, word_vectors):
+    for keywords in sample_keywords(word_vectors):
+        scores = analyzer.score_categories(keywords)
+        for category in CATEGORY_KEYWORDS:
+            assert scores[category] == pytest.approx(reference_similarity(word_vectors, keywords, category), abs=1e-5)
+
+
+def test_classify_videos_matches_reference(analyzer, word_vectors, monkeypatch):
+    keyword_lists = sample_keywords(word_vectors)
+    videos = [{'title': f"视频{i}", 'up_name': '未知'} for i in range(len(keyword_lists))]
+    # 跳过分词，直接给出每个视频的关键词
+    by_text = {f"{video['title']} {video['up_name']}": kws for video, kws in zip(videos, keyword_lists)}
+    monkeypatch.setattr(analyzer, 'extract_keywords_batch', lambda texts, topK=5: [by_text[text] for text in texts])
+    categories = []
+    for chunk, keywords, scores, best in analyzer.classify_videos(videos, chunk_size=64):
+        for kws, row, index in zip(keywords, scores, best):
+            reference = {category: reference_similarity(word_vectors, kws, category) for category in CATEGORY_KEYWORDS}
+            np.testing.assert_allclose(row, [reference[c] for c in analyzer.categories], atol=1e-5)
+            chosen = analyzer.categories[index] if index >= 0 else '其他'
+            categories.append(chosen)
+            # 只有前两名得分（或最高分与阈值）几乎相同时，浮点误差才可能改变判定
+            top = sorted(reference.values(), reverse=True)
+            if min(top[0] - top[1], abs(top[0] - CATEGORY_THRESHOLD)) > TIE_EPSILON:
+                assert chosen == reference_category(reference), (kws, reference)
+    assert len(categories) == len(videos)
+    assert set(categories) - {'其他'}
+
+
+def test_summary_streams_chunks(analyzer, word_vectors, monkeypatch):
+    keyword_lists = sample_keywords(word_vectors, 50)
+    videos = [{'title': f"视频{i}", 'up_name': '未知', 'play_count': i} for i in range(len(keyword_lists))]
+    by_text = {f"{video['title']} {video['up_name']}": kws for video, kws in zip(videos, keyword_lists)}
+    monkeypatch.setattr(analyzer, 'extract_keywords_batch', lambda texts, topK=5: [by_text[text] for text in texts])
+    monkeypatch.setattr(analyzer, 'videos', VideoTable.from_videos(videos))
+    monkeypatch.setattr(analyzer, '_result_summary', None)
+    expected = {}
+    for result in analyzer.analyze_videos(chunk_size=50):
+        expected[result['category']] = expected.get(result['category'], 0) + 1
+    categories, _, uncategorized = analyzer.summarize_results(chunk_size=7)
+    assert categories == expected
+    assert all(video['category'] == '其他' for video in uncategorized)
+
+
+def test_analyzer_accepts_loaded_videos(word_vectors, tmp_path):
+    videos = [{'title': f"视频{i}", 'up_name': 'UP', 'play_count': str(i * 100)} for i in range(5)]
+    path = tmp_path / 'videos.json'
+    path.write_text(json.dumps(videos, ensure_ascii=False), encoding='utf-8')
+    from_file = BilibiliAnalyzer(str(path), word_vectors=word_vectors)
+    from_list = BilibiliAnalyzer(None, word_vectors=word_vectors, videos=videos)
+    assert list(from_list.videos.titles) == list(from_file.videos.titles)
+    assert from_list.analyze_video_popularity() == from_file.analyze_video_popularity()
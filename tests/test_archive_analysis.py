@@ -0,0 +1,28 @@
+import gzip
+import json
+from archive_analysis import analyze_archives
+from profile_aggregator import ProfileAggregator
+from video_table import PLAY_COUNT_BUCKETS
+
+
+class FakeAnalyzer:
+    play_buckets = PLAY_COUNT_BUCKETS
+
+    def analyze_batch(self, videos, chunk_size):
+        return [{'category': f"类别{video['title'][-1]}", 'topic': None} for video in videos], 0
+
+
+def test_archive_profile_matches_live_aggregator(tmp_path):
+    videos = [{'title': f"视频{i}", 'up_name': f"UP{i % 4}", 'play_count': f"{i * 0.37:.1f}万"} for i in range(250)]
+    with gzip.open(tmp_path / 'a.jsonl.gz', 'wt', encoding='utf-8') as f:
+        f.writelines(json.dumps(video, ensure_ascii=False) + '\n' for video in videos[:100])
+    with open(tmp_path / 'b.jsonl', 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(video, ensure_ascii=False) + '\n' for video in videos[100:])
+
+    aggregate, stats = analyze_archives([str(tmp_path)], FakeAnalyzer(), chunk_size=32)
+    live = ProfileAggregator(FakeAnalyzer(), batch_size=50)
+    for video in videos:
+        live.add(video)
+    assert live.wait_idle(timeout=10)
+    assert stats['files'] == 2 and stats['videos'] == 250
+    assert aggregate.profile() == live.profile()
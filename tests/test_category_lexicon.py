@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+from bilibili_analyzer import BilibiliAnalyzer
+from category_lexicon import FLOAT16_TOLERANCE, CategoryLexicon, compile_lexicon
+from test_analyzer import sample_keywords, word_vectors  # noqa: F401
+
+
+def lexicon_scores(word_vectors, tmp_path, dtype):
+    output = str(tmp_path / f"test.{dtype}.lexicon")
+    compile_lexicon(word_vectors, output, dtype=dtype)
+    vector_analyzer = BilibiliAnalyzer(None, word_vectors=word_vectors)
+    lexicon_analyzer = BilibiliAnalyzer(None, word_vectors=CategoryLexicon(output))
+    assert lexicon_analyzer.categories == vector_analyzer.categories
+    keyword_lists = sample_keywords(word_vectors)
+    expected = np.array([[vector_analyzer.score_categories(kws)[c] for c in vector_analyzer.categories]
+                         for kws in keyword_lists])
+    actual = np.array([[lexicon_analyzer.score_categories(kws)[c] for c in lexicon_analyzer.categories]
+                       for kws in keyword_lists])
+    return expected, actual
+
+
+def test_float32_lexicon_matches_vectors(word_vectors, tmp_path):  # noqa: F811
+    expected, actual = lexicon_scores(word_vectors, tmp_path, 'float32')
+    np.testing.assert_allclose(actual, expected, atol=1e-6)
+
+
+def test_float16_lexicon_within_tolerance(word_vectors, tmp_path):  # noqa: F811
+    expected, actual = lexicon_scores(word_vectors, tmp_path, 'float16')
+    assert np.abs(actual - expected).max() <= FLOAT16_TOLERANCE
+    assert np.abs(actual - expected).max() > 0
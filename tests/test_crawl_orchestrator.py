@@ -0,0 +1,54 @@
+import os
+import time
+import crawl_orchestrator
+from crawl_orchestrator import CrawlOrchestrator
+
+
+def finished_job(spec, status_queue):
+    status_queue.put({"type": "job_state", "data": "running"})
+    return 'done'
+
+
+def wait_for_state(orchestrator, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        states = {job['job_id']: job['state'] for job in orchestrator.list_jobs()}
+        if states[job_id] in crawl_orchestrator.FINAL_STATES:
+            return states[job_id]
+        time.sleep(0.05)
+    return states[job_id]
+
+
+def test_final_state_without_polling(tmp_path, monkeypatch):
+    monkeypatch.setattr(crawl_orchestrator, 'run_crawl_job', finished_job)
+    orchestrator = CrawlOrchestrator(max_workers=1, root=str(tmp_path), store_path=str(tmp_path / 'store.db'))
+    try:
+        job_id = orchestrator.submit('甲', backend='http')
+        assert wait_for_state(orchestrator, job_id) == 'done'
+        # 滞留在队列中的 running 状态不会覆盖最终状态
+        assert orchestrator.poll(job_id)['state'] == 'done'
+        # 上一个任务已结束，同一账号可以再次提交
+        orchestrator.submit('甲', backend='http')
+    finally:
+        orchestrator.shutdown()
+
+
+def test_workers_sized_by_backend(tmp_path, monkeypatch):
+    monkeypatch.delenv('BILI_MAX_CRAWL_WORKERS', raising=False)
+    monkeypatch.setattr(crawl_orchestrator.os, 'cpu_count', lambda: 64)
+    monkeypatch.setattr(crawl_orchestrator, '_available_memory_mb', lambda: 2400)
+    orchestrator = CrawlOrchestrator(root=str(tmp_path))
+    try:
+        assert orchestrator.workers_for('browser') == 4
+        assert orchestrator.workers_for('http') == 20
+    finally:
+        orchestrator.shutdown()
+
+
+def test_account_dirs_do_not_collide(tmp_path):
+    from crawl_orchestrator import account_dir
+    accounts = ['a.b', 'a_b', 'a b', 'a/b', '账号']
+    dirs = [account_dir(account, str(tmp_path)) for account in accounts]
+    assert len(set(dirs)) == len(accounts)
+    assert all(os.path.dirname(path) == str(tmp_path) for path in dirs)
+    assert account_dir('a.b', str(tmp_path)) == dirs[0]
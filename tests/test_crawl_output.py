@@ -0,0 +1,19 @@
+import gzip
+import json
+from crawl_output import parse_videos, read_videos
+
+VIDEOS = [{'title': '视频一', 'up_name': 'UP'}, {'title': '视频二', 'up_name': 'UP'}]
+
+
+def test_parse_videos_matches_read_videos(tmp_path):
+    lines = ''.join(json.dumps(video, ensure_ascii=False) + '\n' for video in VIDEOS)
+    cases = {
+        'videos.json': json.dumps(VIDEOS, ensure_ascii=False).encode('utf-8'),
+        # 末尾尚未写完的一行被忽略
+        'videos.jsonl': (lines + '{"title": "写了一半').encode('utf-8'),
+        'videos.jsonl.gz': gzip.compress(lines.encode('utf-8')),
+    }
+    for name, data in cases.items():
+        path = tmp_path / name
+        path.write_bytes(data)
+        assert parse_videos(data, str(path)) == read_videos(str(path)) == VIDEOS
@@ -0,0 +1,78 @@
+import pytest
+from crawl_store import CrawlStore
+from seen_filter import BloomFilter
+
+
+def make_videos(start, count):
+    return [{'title': f"视频{i}", 'link': f"https://www.bilibili.com/video/BV1{i:09d}", 'play_count': '1.2万'}
+            for i in range(start, start + count)]
+
+
+def test_filter_is_flushed_after_each_batch(tmp_path):
+    store = CrawlStore(str(tmp_path / 'store.db'))
+    session_id = store.start_session()
+    store.add_videos(session_id, make_videos(0, 30))
+    # 不关闭库，另开一个过滤器读取磁盘上的文件
+    other = BloomFilter(str(tmp_path / 'store.db.seen'))
+    assert other.count == 30
+    assert other.contains_many([f"BV1{i:09d}" for i in range(30)]).all()
+    store.close()
+
+
+def test_filter_rebuilt_after_crash_between_commit_and_add(tmp_path, monkeypatch):
+    path = str(tmp_path / 'store.db')
+    store = CrawlStore(path)
+    session_id = store.start_session()
+    store.add_videos(session_id, make_videos(0, 10))
+
+    def crash(keys):
+        raise RuntimeError('进程在写入过滤器前退出')
+    monkeypatch.setattr(store.seen_filter, 'add_many', crash)
+    with pytest.raises(RuntimeError):
+        store.add_videos(session_id, make_videos(10, 10))
+    store.close()
+
+    reopened = CrawlStore(path)
+    assert reopened.seen_filter.count == 20
+    session_id = reopened.start_session()
+    added, new = reopened.add_videos(session_id, make_videos(5, 20))
+    assert (added, new) == (20, 5)
+    reopened.close()
+
+
+def test_rebuild_does_not_hide_keys_from_other_readers(tmp_path):
+    path = str(tmp_path / 'seen')
+    writer = BloomFilter(path, capacity=1000)
+    reader = BloomFilter(path)
+    keys = [f"BV{i}" for i in range(100)]
+    writer.add_many(keys)
+    checked = []
+
+    def keys_while_checking():
+        for key in keys:
+            # 重建过程中，另一个进程查询时仍能看到全部的键
+            checked.append(reader.contains_many(keys).all())
+            yield key
+
+    assert writer.rebuild(keys_while_checking(), batch_size=10) == 100
+    assert checked and all(checked)
+    # 重建后另一个实例的写入进入新文件
+    reader.add_many(['BVnew'])
+    assert 'BVnew' in writer and writer.count == 101
+
+
+def test_concurrent_stores_count_each_new_video_once(tmp_path, monkeypatch):
+    path = str(tmp_path / 'store.db')
+    first, second = CrawlStore(path), CrawlStore(path)
+    videos = make_videos(0, 10)
+    # 两个爬取进程在对方写入之前都判断这些视频没见过
+    monkeypatch.setattr(CrawlStore, 'previously_seen', lambda self, keys: set())
+    session_a, session_b = first.start_session('a'), second.start_session('b')
+    assert first.add_videos(session_a, videos) == (10, 10)
+    assert second.add_videos(session_b, videos + make_videos(10, 5)) == (15, 5)
+    assert first.seen_filter.count == 15
+    first.close()
+    second.close()
+
+    monkeypatch.setattr(CrawlStore, '_rebuild_seen_filter', lambda self: pytest.fail('不应重建过滤器'))
+    CrawlStore(path).close()
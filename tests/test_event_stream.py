@@ -0,0 +1,89 @@
+import queue
+import threading
+import event_stream
+from event_stream import EventBroker
+from message_log import MessageLog
+
+
+def make_log(tmp_path, count):
+    log = MessageLog(str(tmp_path / 'log.db'), blob_dir=str(tmp_path / 'blobs'))
+    log.append_many([(seq, f"消息{seq}") for seq in range(1, count + 1)])
+    return log
+
+
+def collect(stream, count):
+    """从SSE生成器中取出 count 条事件的序号，跳过 retry 和心跳"""
+    ids = []
+    for chunk in stream:
+        if chunk.startswith('id: '):
+            ids.append(int(chunk.split('\n', 1)[0][4:]))
+            if len(ids) >= count:
+                break
+    return ids
+
+
+def test_resume_after_restart_reads_history(tmp_path):
+    log = make_log(tmp_path, 1200)
+    broker = EventBroker(queue.Queue(), start_seq=log.last_seq, history=log)
+    assert collect(broker.stream(10), 1190) == list(range(11, 1201))
+
+
+def test_resume_past_memory_window(tmp_path):
+    log = make_log(tmp_path, 0)
+    broker = EventBroker(queue.Queue(), max_events=20, on_events=log.append_many, history=log)
+    broker.publish_many([f"消息{i}" for i in range(100)])
+    assert [seq for seq, _ in broker.events_after(0)][:3] == [1, 2, 3]
+    assert collect(broker.stream(5), 95) == list(range(6, 101))
+
+
+def test_missing_events_do_not_spin(monkeypatch):
+    monkeypatch.setattr(event_stream, 'HEARTBEAT_INTERVAL', 0.05)
+    # 重启后内存中没有消息，客户端续传的序号比起始序号小
+    broker = EventBroker(queue.Queue(), start_seq=50)
+    stream = broker.stream(10)
+    chunks = []
+    reader = threading.Thread(target=lambda: chunks.extend([next(stream), next(stream)]), daemon=True)
+    reader.start()
+    reader.join(2)
+    assert chunks == ["retry: 2000\n\n", ": heartbeat\n\n"]
+
+
+def test_clear_empties_memory_and_history(tmp_path):
+    log = make_log(tmp_path, 0)
+    broker = EventBroker(queue.Queue(), on_events=log.append_many, history=log)
+    broker.publish_many(['a', 'b'])
+    broker.clear()
+    assert broker.events_after(0) == []
+    assert log.read(0) == []
+    assert broker.publish_many(['c']) == [(3, 'c')]
+
+
+def test_history_page_counts_skipped_blobs(tmp_path):
+    log = MessageLog(str(tmp_path / 'log.db'), blob_dir=str(tmp_path / 'blobs'), blob_threshold=10)
+    log.append_many([(1, 'x' * 50), (2, 'y' * 50)])
+    for name in (tmp_path / 'blobs').iterdir():
+        name.unlink()
+    page = log.read_page(0, limit=2)
+    assert page['events'] == []
+    assert page['last_seq'] == 2 and page['has_more']
+
+
+def test_prune_does_not_delete_blob_appended_meanwhile(tmp_path, monkeypatch):
+    import message_log
+    log = MessageLog(str(tmp_path / 'log.db'), blob_dir=str(tmp_path / 'blobs'), blob_threshold=10, max_messages=1)
+    payload = 'z' * 50
+    log.append_many([(1, payload), (2, 'short')])
+    remove = message_log.os.remove
+    appender = threading.Thread(target=log.append_many, args=([(3, payload)],))
+
+    def remove_after_append(path):
+        # 清理删除文件前，另一个线程追加内容相同的消息（追加需要等清理结束时最多等0.3秒）
+        monkeypatch.setattr(message_log.os, 'remove', remove)
+        appender.start()
+        appender.join(timeout=0.3)
+        remove(path)
+
+    monkeypatch.setattr(message_log.os, 'remove', remove_after_append)
+    assert log.prune() == 1
+    appender.join(timeout=5)
+    assert log.read_page(2)['events'] == [(3, payload)]
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_feed_spider_does_not_import_selenium():
+    # 把 selenium 标记为不可导入，接口爬取模块仍应能正常导入
+    code = "import sys; sys.modules['selenium'] = None; import BilibiliFeedSpider; print(BilibiliFeedSpider.BilibiliFeed.__mro__[1].__name__)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'CrawlerBase'
+
+
+class FakeTransport:
+    """按页返回固定推荐数据的传输层"""
+
+    def __init__(self, pages, login=True):
+        self.pages = pages
+        self.login = login
+        self.requested = []
+        self.closed = False
+
+    def get_json(self, path, params=None):
+        from BilibiliFeedSpider import FEED_PATH, NAV_PATH
+        if path == NAV_PATH:
+            return {'isLogin': self.login}
+        assert path == FEED_PATH
+        self.requested.append(params['fresh_idx'])
+        return {'item': self.pages.get(params['fresh_idx'], [])}
+
+    def close(self):
+        self.closed = True
+
+
+def feed_item(bvid, title=None, goto='av', view=12345):
+    return {'goto': goto, 'bvid': bvid, 'title': title or f"视频{bvid}", 'pic': 'pic.jpg',
+            'owner': {'mid': 42, 'name': 'UP主'}, 'stat': {'view': view}}
+
+
+def test_feed_crawl_with_fake_transport(tmp_path):
+    import queue
+    from BilibiliFeedSpider import BilibiliFeed, parse_feed_item
+    from crawl_output import read_videos
+
+    pages = {
+        1: [feed_item('BV1aaaaaaaaa'), feed_item('', goto='ad'), feed_item('BV1bbbbbbbbb')],
+        # 第二页重复了第一页的视频，并夹杂非视频条目
+        2: [feed_item('BV1aaaaaaaaa'), feed_item('BV1ccccccccc', goto='live'), feed_item('BV1ddddddddd')],
+        3: [feed_item('BV1eeeeeeeee'), feed_item('BV1fffffffff')],
+        4: [feed_item('BV1ggggggggg')],
+        5: [feed_item('BV1hhhhhhhhh')],
+        6: [feed_item('BV1iiiiiiiii')],
+    }
+    assert parse_feed_item(feed_item('', goto='ad')) is None
+    assert parse_feed_item(feed_item('BV1ccccccccc', goto='live')) is None
+    assert parse_feed_item(feed_item('BV1aaaaaaaaa'))['play_count'] == '1.2万'
+
+    transport = FakeTransport(pages)
+    status_queue = queue.Queue()
+    spider = BilibiliFeed(num=4, status_queue=status_queue, transport=transport, concurrency=2, page_interval=0,
+                          output_dir=str(tmp_path))
+    spider.bilibili()
+    spider.teardown_method(None)
+    assert transport.closed
+
+    expected = ['BV1aaaaaaaaa', 'BV1bbbbbbbbb', 'BV1ddddddddd', 'BV1eeeeeeeee']
+    jsonl = read_videos(str(tmp_path / 'bilibili_videos.jsonl'))
+    assert [video['bvid'] for video in jsonl] == expected
+    assert read_videos(str(tmp_path / 'bilibili_videos.json')) == jsonl
+    assert jsonl[0]['up_link'] == 'https://space.bilibili.com/42'
+    # 每次并发请求两页，第3页达到 num 后不再请求第5页及以后
+    assert sorted(transport.requested) == [1, 2, 3, 4]
+    messages = []
+    while not status_queue.empty():
+        messages.append(status_queue.get())
+    progress = [m for m in messages if isinstance(m, dict) and m['type'] == 'progress']
+    assert [m['data']['current'] for m in progress] == [1, 2, 3, 4]
+    assert any('已使用保存的Cookie登录' in str(m.get('data')) for m in messages if isinstance(m, dict))
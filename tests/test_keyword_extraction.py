@@ -0,0 +1,110 @@
+import jieba
+import jieba.analyse
+import jieba.posseg
+import pytest
+import keyword_extraction
+
+# 导入本文件时全局分词器的状态，测试结束后应恢复为此状态
+INITIAL_DICTIONARY = jieba.dt.dictionary
+INITIAL_READY = keyword_extraction._jieba_ready
+
+# 基线（jieba默认词典）下的关键词都应保留，或被合并进更长的用户词中
+TITLES = [
+    'fps王者荣耀手机游戏',
+    '美体卡牌游戏科普',
+    '原神和星穹铁道新版本',
+    'Python编程教程入门',
+    '【LOL】英雄联盟S14总决赛精彩集锦',
+    '我的世界生存第一天',
+    '美食vlog：自制红烧肉',
+    '考研数学复习攻略',
+]
+
+
+@pytest.fixture(scope='module')
+def jieba_cache(tmp_path_factory):
+    return str(tmp_path_factory.mktemp('jieba'))
+
+
+@pytest.fixture
+def jieba_ready(jieba_cache, restore_jieba):
+    keyword_extraction._jieba_ready = False
+    keyword_extraction.prepare_jieba(jieba_cache)
+
+
+def baseline_keywords(titles):
+    """不加用户词典时的 TextRank 结果，使用独立的分词器，不受全局词典影响"""
+    textrank = jieba.analyse.TextRank()
+    textrank.tokenizer = textrank.postokenizer = jieba.posseg.POSTokenizer(jieba.Tokenizer())
+    return [textrank.textrank(title, topK=5) for title in titles]
+
+
+def test_textrank_keeps_baseline_keywords(jieba_ready):
+    for title, before in zip(TITLES, baseline_keywords(TITLES)):
+        after = keyword_extraction.extract_keywords(title)
+        assert after or not before, title
+        for word in before:
+            assert any(word in keyword for keyword in after), (title, word, after)
+
+
+def test_user_words_are_tagged(jieba_ready):
+    tags = dict(jieba.posseg.lcut('王者荣耀星穹铁道'))
+    assert tags.get('王者荣耀') == keyword_extraction.USER_WORD_TAG
+    assert tags.get('星穹铁道') == keyword_extraction.USER_WORD_TAG
+
+
+def test_build_dictionary_ignores_current_dictionary(jieba_ready, tmp_path):
+    first = keyword_extraction.build_dictionary(str(tmp_path))
+    jieba.set_dictionary(first)
+    jieba.initialize()
+    assert keyword_extraction.build_dictionary(str(tmp_path)) == first
+    with open(first, 'rb') as f:
+        assert all(line.strip() for line in f)
+
+
+def test_build_dictionary_without_extra_words(tmp_path):
+    path = keyword_extraction.build_dictionary(str(tmp_path), words=['游戏'])
+    with open(path, 'rb') as f:
+        assert all(line.strip() for line in f)
+
+
+def test_extract_batch_threads_with_different_workers(jieba_ready, monkeypatch):
+    import threading
+    import time
+    from concurrent.futures import ProcessPoolExecutor
+
+    class SlowMapExecutor(ProcessPoolExecutor):
+        """提交任务前稍作停顿，放大取得进程池与提交任务之间的竞争窗口"""
+
+        def map(self, *args, **kwargs):
+            time.sleep(0.2)
+            return super().map(*args, **kwargs)
+
+    monkeypatch.setattr(keyword_extraction, 'ProcessPoolExecutor', SlowMapExecutor)
+    texts = (TITLES * (keyword_extraction.PARALLEL_MIN_TITLES // len(TITLES) + 1))[:keyword_extraction.PARALLEL_MIN_TITLES]
+    expected = keyword_extraction.extract_batch(texts, 'segment', workers=1)
+    errors = []
+
+    def run(workers):
+        try:
+            for _ in range(3):
+                assert keyword_extraction.extract_batch(texts, 'segment', workers=workers) == expected
+        except Exception as e:
+            errors.append(e)
+
+    # 两个线程的进程数不同，会反复替换共享的进程池
+    threads = [threading.Thread(target=run, args=(workers,)) for workers in (2, 3)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        keyword_extraction.shutdown_pool()
+    assert not errors, errors
+
+
+def test_restore_jieba_after_dictionary_switch():
+    # 本文件前面的测试切换过全局词典，结束后应已恢复
+    assert jieba.dt.dictionary == INITIAL_DICTIONARY
+    assert keyword_extraction._jieba_ready == INITIAL_READY
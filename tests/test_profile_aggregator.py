@@ -0,0 +1,91 @@
+import threading
+import numpy as np
+from profile_aggregator import ProfileAggregator
+from video_table import PlayCounts, VideoTable, play_stats
+
+
+class FakeAnalyzer:
+    """按标题末位数字给出类别，记录每批的大小和调用线程"""
+
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+
+    def analyze_batch(self, videos, chunk_size):
+        self.batches.append(len(videos))
+        self.threads.add(threading.get_ident())
+        results = [{'category': f"类别{video['title'][-1]}", 'topic': None} for video in videos]
+        return results, 0
+
+
+def make_videos(count):
+    return [{'title': f"视频{i}", 'up_name': f"UP{i % 3}", 'play_count': f"{i * 37 % 1000}"} for i in range(count)]
+
+
+def test_classifies_in_batches_off_the_caller_thread():
+    analyzer = FakeAnalyzer()
+    aggregator = ProfileAggregator(analyzer, batch_size=50)
+    videos = make_videos(500)
+    for video in videos:
+        aggregator.add(video)
+    assert aggregator.wait_idle(timeout=10)
+    assert aggregator.video_count == 500 and aggregator.pending_count == 0
+    assert threading.get_ident() not in analyzer.threads
+    assert max(analyzer.batches) <= 50
+    profile = aggregator.profile()
+    assert profile['视频热度分析'] == VideoTable.from_videos(videos).play_stats()
+
+
+def test_pending_videos_spill_until_analyzer_attached():
+    aggregator = ProfileAggregator(max_pending=10, batch_size=8)
+    for video in make_videos(35):
+        aggregator.add(video)
+    assert len(aggregator._pending) < 10
+    assert aggregator.pending_count == 35
+    assert aggregator.profile() is None
+    aggregator.attach_analyzer(FakeAnalyzer())
+    assert aggregator.wait_idle(timeout=10)
+    assert aggregator.video_count == 35
+    assert sum(aggregator.category_counts.values()) == 35
+
+
+def test_play_counts_merge_and_sketch():
+    rng = np.random.default_rng(0)
+    values = np.exp(rng.uniform(0, 14, size=20000))
+    exact = PlayCounts()
+    for part in np.array_split(values, 7):
+        exact.add(part)
+    assert exact.stats() == play_stats(values)
+
+    left, right = PlayCounts(exact_limit=5000), PlayCounts(exact_limit=5000)
+    left.add(values[:12000])
+    right.add(values[12000:])
+    merged = left.merge(right)
+    assert not merged.exact
+    estimate, reference = merged.stats(), play_stats(values)
+    assert estimate['播放量分布'] == reference['播放量分布']
+    assert estimate['最高播放量'] == reference['最高播放量']
+    for key, value in reference['播放量分位数'].items():
+        assert abs(estimate['播放量分位数'][key] - value) <= 0.06 * value
+
+
+def test_failed_batches_are_counted_and_reported():
+    import queue
+
+    class FlakyAnalyzer(FakeAnalyzer):
+        def analyze_batch(self, videos, chunk_size):
+            if len(self.batches) == 1:
+                self.batches.append(len(videos))
+                raise RuntimeError('模型出错')
+            return super().analyze_batch(videos, chunk_size)
+
+    status_queue = queue.Queue()
+    aggregator = ProfileAggregator(FlakyAnalyzer(), batch_size=10, status_queue=status_queue)
+    for video in make_videos(30):
+        aggregator.add(video)
+    assert aggregator.wait_idle(timeout=10)
+    assert aggregator.failed_count + aggregator.video_count == 30
+    assert aggregator.failed_count > 0
+    assert aggregator.profile()['分类失败视频数'] == aggregator.failed_count
+    message = status_queue.get_nowait()
+    assert message['type'] == 'message' and '未计入画像' in message['data']
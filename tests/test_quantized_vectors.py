@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+import keyword_extraction
+from bilibili_analyzer import CATEGORY_KEYWORDS
+from quantized_vectors import QuantizedVectors, _sample_videos, accuracy_report, export_quantized, quantize
+from shared_vectors import open_shared
+from test_analyzer import word_vectors  # noqa: F401
+
+# 各格式下相似度的最大误差和类别判定一致率的下限
+SIMILARITY_TOLERANCE = {'float16': 1e-3, 'int8': 2e-2}
+MIN_AGREEMENT = {'float16': 1.0, 'int8': 0.95}
+
+
+@pytest.fixture(scope='module', params=['float16', 'int8'])
+def quantized(request, word_vectors, tmp_path_factory):  # noqa: F811
+    output = str(tmp_path_factory.mktemp('quantized') / f"test.{request.param}")
+    export_quantized(word_vectors, output, request.param)
+    return request.param, open_shared(output)
+
+
+def test_quantize_int8_error_bound():
+    matrix = np.random.default_rng(0).normal(size=(50, 16)).astype(np.float32)
+    quantized, scales = quantize(matrix, 'int8')
+    assert quantized.dtype == np.int8
+    # 对称量化的误差不超过半个量化步长
+    assert (np.abs(quantized * scales[:, None] - matrix) <= scales[:, None] / 2 + 1e-7).all()
+    with pytest.raises(ValueError):
+        quantize(matrix, 'int4')
+
+
+def test_round_trip(quantized, word_vectors):  # noqa: F811
+    dtype, vectors = quantized
+    assert isinstance(vectors, QuantizedVectors)
+    assert vectors.dtype == dtype
+    assert vectors.nbytes < np.asarray(word_vectors.vectors).nbytes
+    words = list(word_vectors.index_to_key)
+    assert all(word in vectors for word in words)
+    assert '不在词表' not in vectors
+    tolerance = SIMILARITY_TOLERANCE[dtype]
+    for word in words[:20]:
+        scale = np.abs(word_vectors[word]).max()
+        np.testing.assert_allclose(vectors[word], word_vectors[word], atol=scale * tolerance)
+    for a, b in zip(words[:30], words[30:60]):
+        assert vectors.similarity(a, b) == pytest.approx(float(word_vectors.similarity(a, b)), abs=tolerance)
+
+    unit = word_vectors.vectors[:5] / np.linalg.norm(word_vectors.vectors[:5], axis=1, keepdims=True)
+    found, matrix = vectors.similarity_matrix(words[:40] + ['不在词表'], unit)
+    assert found == words[:40]
+    expected = [[word_vectors.similarity(word, other) for other in words[:5]] for word in found]
+    np.testing.assert_allclose(matrix, expected, atol=tolerance)
+
+
+def test_category_agreement(quantized, word_vectors, tmp_path_factory, restore_jieba):  # noqa: F811
+    dtype, vectors = quantized
+    keyword_extraction._jieba_ready = False
+    keyword_extraction.prepare_jieba(str(tmp_path_factory.mktemp('jieba')))
+    rng = np.random.default_rng(2)
+    vocab = [word for info in CATEGORY_KEYWORDS.values() for word in info['core'] + info['related']]
+    videos = [{'title': ''.join(rng.choice(vocab, size=3)), 'up_name': ''} for _ in range(300)]
+    report = accuracy_report(word_vectors, vectors, videos)
+    assert report['videos'] == len(videos)
+    assert report['agreement'] >= MIN_AGREEMENT[dtype]
+    assert report['score_max_abs_diff'] <= SIMILARITY_TOLERANCE[dtype]
+
+
+def test_sample_videos_requires_data(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        _sample_videos([str(tmp_path / 'missing.jsonl')], 10)
+    assert len(_sample_videos([str(tmp_path / 'missing.jsonl')], 10, allow_synthetic=True)) == 10
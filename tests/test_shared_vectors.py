@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+from gensim.models import KeyedVectors
+import shared_vectors
+from shared_vectors import SharedVectors, export_shared
+
+WORDS = ['游戏', '音乐', '原神', '攻略', '实况', '翻唱', '美食', '科技']
+
+
+@pytest.fixture
+def source():
+    kv = KeyedVectors(16)
+    kv.add_vectors(WORDS, np.random.default_rng(0).normal(size=(len(WORDS), 16)).astype(np.float32))
+    return kv
+
+
+def export(source, tmp_path):
+    return SharedVectors(export_shared(source, str(tmp_path / 'test.shared')))
+
+
+def check_matches(shared, source):
+    assert len(shared) == len(source.index_to_key)
+    assert list(shared.index_to_key) == list(source.index_to_key)
+    for word in WORDS:
+        assert word in shared
+        np.testing.assert_array_equal(shared[word], source[word])
+    assert '不在词表' not in shared
+    # 与词表中的词同长度（冲突测试中哈希相同）但不在词表中
+    assert '动画' not in shared
+    with pytest.raises(KeyError):
+        shared['不在词表']
+    assert shared.similarity('游戏', '原神') == pytest.approx(float(source.similarity('游戏', '原神')), abs=1e-6)
+
+    unit = source.vectors[:3] / np.linalg.norm(source.vectors[:3], axis=1, keepdims=True)
+    found, matrix = shared.similarity_matrix(['美食', '不在词表', '音乐'], unit)
+    assert found == ['美食', '音乐']
+    expected = [[source.similarity(word, other) for other in WORDS[:3]] for word in found]
+    np.testing.assert_allclose(matrix, expected, atol=1e-6)
+
+
+def test_shared_vectors_match_source(source, tmp_path):
+    check_matches(export(source, tmp_path), source)
+
+
+def test_shared_vectors_hash_collision(source, tmp_path, monkeypatch):
+    # 让所有词按长度取哈希，两字词全部冲突，查找时必须逐个比较原词
+    monkeypatch.setattr(shared_vectors, 'word_hash', lambda word: len(word))
+    shared = export(source, tmp_path)
+    assert len(set(shared._hashes.tolist())) == 1
+    check_matches(shared, source)
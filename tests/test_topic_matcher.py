@@ -0,0 +1,82 @@
+import random
+import pytest
+from bilibili_analyzer import TOPIC_KEYWORDS
+from topic_matcher import POLICIES, TopicMatcher
+
+# 关键词互相重叠、嵌套：he/she/hers 需要通过失败链输出后缀，'原神' 嵌套在 '原神攻略' 中
+KEYWORDS = {
+    'A': ['he', 'hers'],
+    'B': ['she', '原神'],
+    'C': ['原神攻略', 'His'],
+}
+
+
+@pytest.fixture
+def matcher():
+    return TopicMatcher(KEYWORDS)
+
+
+def brute_force(topic_keywords, text):
+    """逐个关键词查找所有出现位置"""
+    text = text.lower()
+    found = []
+    for topic, keywords in topic_keywords.items():
+        for keyword in keywords:
+            keyword = keyword.lower()
+            start = text.find(keyword)
+            while start >= 0:
+                found.append((start, keyword, topic))
+                start = text.find(keyword, start + 1)
+    return sorted(found)
+
+
+def test_overlapping_and_nested_keywords(matcher):
+    assert sorted(matcher.iter_matches('ushers')) == [(1, 'she', 'B'), (2, 'he', 'A'), (2, 'hers', 'A')]
+    assert sorted(matcher.iter_matches('原神攻略')) == [(0, '原神', 'B'), (0, '原神攻略', 'C')]
+    result = matcher.match('ushers')
+    assert result['A']['count'] == 2 and result['A']['score'] == len('he') + len('hers')
+    assert result['B']['count'] == 1
+
+
+def test_case_insensitive(matcher):
+    assert sorted(matcher.iter_matches('HIS SHE')) == [(0, 'his', 'C'), (4, 'she', 'B'), (5, 'he', 'A')]
+
+
+def test_matches_brute_force():
+    matcher = TopicMatcher(TOPIC_KEYWORDS)
+    rng = random.Random(0)
+    keywords = [keyword for words in TOPIC_KEYWORDS.values() for keyword in words]
+    filler = list('的了是在我有和就不人都一个上也很到说要去你会着看好这abcXYZ 【】')
+    for _ in range(3000):
+        parts = [rng.choice(keywords) if rng.random() < 0.3 else rng.choice(filler) for _ in range(rng.randint(0, 12))]
+        title = ''.join(part.upper() if rng.random() < 0.2 else part for part in parts)
+        assert sorted(matcher.iter_matches(title)) == brute_force(TOPIC_KEYWORDS, title), title
+
+
+def test_policies(matcher):
+    # C 先出现（同一位置取较长的 '原神攻略'）；she 和 hers 中都含有 he，A 的次数和权重最多
+    text = '原神攻略 she she hers hers'
+    assert matcher.primary_topic(text, 'first') == 'C'
+    assert matcher.primary_topic(text, 'most') == 'A'
+    assert matcher.primary_topic('原神 原神 原神 hers', 'most') == 'B'
+    assert matcher.primary_topic('she she hers', 'weighted') == 'A'
+    assert matcher.primary_topic('原神攻略 hers', 'priority') == 'A'
+    assert matcher.primary_topic('没有命中', 'first') is None
+
+
+def test_policy_ties_use_definition_order():
+    matcher = TopicMatcher({'X': ['ab'], 'Y': ['cd'], 'Z': ['ab']})
+    # 同一位置、同样长度，以及次数/权重相同时都按话题定义顺序
+    for policy in POLICIES:
+        assert matcher.primary_topic('cd ab', policy) == ('Y' if policy == 'first' else 'X'), policy
+    assert matcher.primary_topic('ab', 'first') == 'X'
+
+
+def test_custom_weights():
+    matcher = TopicMatcher({'X': ['ab', 'cd'], 'Y': ['efgh']}, weights={'ab': 10})
+    assert matcher.primary_topic('efgh ab', 'weighted') == 'X'
+
+
+def test_unknown_policy(matcher):
+    with pytest.raises(ValueError):
+        matcher.primary_topic('she', 'random')
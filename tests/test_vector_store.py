@@ -0,0 +1,52 @@
+import os
+import numpy as np
+import pytest
+from gensim.models import KeyedVectors
+from vector_store import is_cache_fresh, load_word_vectors, read_meta, save_vectors
+
+
+def make_vectors(seed, count=20, dim=8):
+    kv = KeyedVectors(dim)
+    kv.add_vectors([f"词{i}" for i in range(count)], np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32))
+    return kv
+
+
+@pytest.fixture
+def vec_file(tmp_path):
+    path = tmp_path / 'test.vec'
+    make_vectors(0).save_word2vec_format(str(path))
+    return str(path)
+
+
+def test_cache_round_trip(vec_file):
+    kv_path = vec_file[:-4] + '.kv'
+    word_vectors = load_word_vectors(vec_file)
+    assert is_cache_fresh(vec_file, kv_path)
+    np.testing.assert_allclose(word_vectors['词3'], make_vectors(0)['词3'], atol=1e-5)
+
+
+def test_interrupted_save_is_not_fresh(tmp_path, monkeypatch):
+    # gensim 默认只把超过1000万个元素的数组单独存为 .npy，测试中调低阈值
+    save = KeyedVectors.save
+    monkeypatch.setattr(KeyedVectors, 'save', lambda self, path: save(self, path, sep_limit=0))
+    kv_path = str(tmp_path / 'big.kv')
+    source = str(tmp_path / 'big.vec')
+    save_vectors(make_vectors(0), kv_path)
+    assert is_cache_fresh(source, kv_path)
+    meta = read_meta(kv_path)
+    array_path = kv_path + '.vectors.npy'
+    assert os.path.basename(array_path) in meta['files']
+    # 模拟保存中断：数组已被新一次保存替换，.kv 和元信息仍是旧的
+    np.save(array_path, make_vectors(1).vectors)
+    assert os.path.getsize(array_path) == meta['files'][os.path.basename(array_path)][0]
+    assert not is_cache_fresh(source, kv_path)
+    with pytest.raises(Exception, match='不完整'):
+        load_word_vectors(kv_path)
+
+
+def test_missing_meta_is_not_fresh(vec_file, tmp_path):
+    kv_path = str(tmp_path / 'subset.kv')
+    save_vectors(make_vectors(1), kv_path)
+    assert read_meta(kv_path)['files']
+    os.remove(kv_path + '.meta.json')
+    assert not is_cache_fresh(vec_file, kv_path)
@@ -0,0 +1,21 @@
+import gzip
+import json
+from vocab_subset import crawled_title_words
+
+VIDEOS = [{'title': '原神 攻略', 'up_name': '测试UP'}, {'title': '原神 实况', 'up_name': '测试UP'}]
+
+
+def test_crawled_title_words_reads_all_formats(tmp_path):
+    json_path = tmp_path / 'videos.json'
+    json_path.write_text(json.dumps(VIDEOS, ensure_ascii=False), encoding='utf-8')
+    lines = ''.join(json.dumps(video, ensure_ascii=False) + '\n' for video in VIDEOS)
+    jsonl_path = tmp_path / 'videos.jsonl'
+    jsonl_path.write_text(lines, encoding='utf-8')
+    gz_path = tmp_path / 'videos.jsonl.gz'
+    with gzip.open(gz_path, 'wt', encoding='utf-8') as f:
+        f.write(lines)
+
+    expected = crawled_title_words([str(json_path)])
+    assert expected['原神'] == 2
+    assert crawled_title_words([str(jsonl_path)]) == expected
+    assert crawled_title_words([str(gz_path)]) == expected
@@ -0,0 +1,115 @@
+from collections import deque
+
+# 主话题的判定策略
+POLICIES = ('first', 'most', 'weighted', 'priority')
+
+
+class TopicMatcher:
+    """话题关键词多模式匹配器（Aho–Corasick 自动机）
+
+    所有话题的关键词只编译一次，之后每个标题只需线性扫描一遍，
+    扫描代价与关键词数量无关。匹配不区分大小写。
+    """
+
+    def __init__(self, topic_keywords, weights=None):
+        self.topics = list(topic_keywords.keys())
+        self._order = {topic: index for index, topic in enumerate(self.topics)}
+        weights = weights or {}
+        # 每个关键词对应 (关键词, 话题下标, 权重)，默认权重为关键词长度，越长越具体
+        self.keywords = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for topic_index, topic in enumerate(self.topics):
+            for keyword in topic_keywords[topic]:
+                keyword = keyword.lower()
+                if not keyword:
+                    continue
+                keyword_index = len(self.keywords)
+                self.keywords.append((keyword, topic_index, weights.get(keyword, len(keyword))))
+                self._insert(keyword, keyword_index)
+        self._build_fail_links()
+
+    def _insert(self, keyword, keyword_index):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state].append(keyword_index)
+
+    def _build_fail_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # 合并失败链上的输出，扫描时无需再沿失败链查找
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def _scan(self, text):
+        """单次线性扫描，逐个返回 (结束位置, 关键词下标)"""
+        state = 0
+        for position, char in enumerate(text.lower()):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for keyword_index in self._output[state]:
+                yield position, keyword_index
+
+    def iter_matches(self, text):
+        """逐个返回 (起始位置, 关键词, 话题)"""
+        for end, keyword_index in self._scan(text):
+            keyword, topic_index, _ = self.keywords[keyword_index]
+            yield end - len(keyword) + 1, keyword, self.topics[topic_index]
+
+    def match(self, text):
+        """返回所有命中的话题：{话题: {'count': 次数, 'score': 权重和, 'matches': [(位置, 关键词)]}}"""
+        result = {}
+        for end, keyword_index in self._scan(text):
+            keyword, topic_index, weight = self.keywords[keyword_index]
+            item = result.setdefault(self.topics[topic_index], {'count': 0, 'score': 0, 'matches': []})
+            item['count'] += 1
+            item['score'] += weight
+            item['matches'].append((end - len(keyword) + 1, keyword))
+        return result
+
+    def primary_topic(self, text, policy='first'):
+        """按策略选出主话题，没有命中时返回None
+
+        first: 标题中最先出现的关键词所属话题（同一位置取较长的关键词）
+        most: 命中次数最多的话题
+        weighted: 命中关键词权重之和最大的话题
+        priority: 按话题定义顺序取第一个命中的话题（旧版行为）
+        平局时按话题定义顺序决定。
+        """
+        matches = self.match(text)
+        if not matches:
+            return None
+        order = self._order
+        if policy == 'first':
+            def key(topic):
+                start, keyword = min(matches[topic]['matches'], key=lambda m: (m[0], -len(m[1])))
+                return (start, -len(keyword), order[topic])
+        elif policy == 'most':
+            def key(topic):
+                return (-matches[topic]['count'], order[topic])
+        elif policy == 'weighted':
+            def key(topic):
+                return (-matches[topic]['score'], order[topic])
+        elif policy == 'priority':
+            def key(topic):
+                return order[topic]
+        else:
+            raise ValueError(f"未知的话题判定策略: {policy}，可选: {', '.join(POLICIES)}")
+        return min(matches, key=key)
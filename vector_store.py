@@ -0,0 +1,195 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+
+# 默认的词向量文件，可通过环境变量指向裁剪后的 .kv 子集
+DEFAULT_VEC_FILE = os.environ.get('BILI_WORD_VECTORS', 'wiki.zh.vec')
+# 二进制缓存的扩展名（gensim原生格式，向量矩阵单独存为.npy以便内存映射）
+CACHE_SUFFIX = '.kv'
+
+
+def cache_path_for(vec_path):
+    """根据文本词向量路径得到二进制缓存路径"""
+    return os.path.splitext(vec_path)[0] + CACHE_SUFFIX
+
+
+def _meta_path(kv_path):
+    return kv_path + '.meta.json'
+
+
+def _source_signature(vec_path):
+    """文本词向量文件的签名，用于判断缓存是否过期"""
+    stat = os.stat(vec_path)
+    return {
+        "source": os.path.basename(vec_path),
+        "size": stat.st_size,
+        "mtime": int(stat.st_mtime)
+    }
+
+
+def read_meta(kv_path):
+    """读取缓存的元信息，不存在时返回None"""
+    try:
+        with open(_meta_path(kv_path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _piece_signature(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def pieces_match(kv_path, meta):
+    """检查 .kv 及其 .npy 数组是否都是元信息记录的那一次保存写出的"""
+    files = meta.get("files")
+    if not files:
+        return False
+    directory = os.path.dirname(kv_path)
+    for name, signature in files.items():
+        try:
+            if _piece_signature(os.path.join(directory, name)) != signature:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+def is_cache_fresh(vec_path, kv_path=None):
+    """判断二进制缓存是否存在且与文本词向量一致"""
+    kv_path = kv_path or cache_path_for(vec_path)
+    meta = read_meta(kv_path)
+    if meta is None or not pieces_match(kv_path, meta):
+        return False
+    if not os.path.exists(vec_path):
+        # 源文件已被移除时，只要缓存完整就继续使用
+        return True
+    return meta.get("signature") == _source_signature(vec_path)
+
+
+def save_vectors(word_vectors, kv_path, meta=None):
+    """以原生格式保存词向量
+
+    .kv 和各个 .npy 数组无法一起原子替换，因此先删除元信息使旧缓存失效，
+    逐个替换后最后写入元信息，其中记录每个文件的大小和修改时间；
+    中途崩溃时元信息缺失或与文件不符，缓存会被视为无效并重建。
+    """
+    meta_path = _meta_path(kv_path)
+    if os.path.exists(meta_path):
+        os.remove(meta_path)
+    tmp_path = f"{kv_path}.tmp{os.getpid()}"
+    word_vectors.save(tmp_path)
+    # gensim会把大数组单独保存为 <文件名>.<属性>.npy，需要一起改名
+    pieces = [kv_path]
+    for tmp_array in glob.glob(glob.escape(tmp_path) + '.*.npy'):
+        array_path = kv_path + tmp_array[len(tmp_path):]
+        os.replace(tmp_array, array_path)
+        pieces.append(array_path)
+    os.replace(tmp_path, kv_path)
+
+    meta = dict(meta or {})
+    meta.update({
+        "vocab_size": len(word_vectors.index_to_key),
+        "vector_size": word_vectors.vector_size,
+        "files": {os.path.basename(path): _piece_signature(path) for path in pieces},
+        "created_at": int(time.time())
+    })
+    tmp_meta = f"{meta_path}.tmp{os.getpid()}"
+    with open(tmp_meta, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_meta, meta_path)
+
+
+def model_fingerprint(word_vectors):
+    """词向量模型的版本指纹：词表大小、维度、首尾若干词及其向量"""
+    cached = getattr(word_vectors, '_bili_fingerprint', None)
+    if cached:
+        return cached
+    digest = hashlib.sha1()
+    keys = word_vectors.index_to_key
+    digest.update(f"{len(keys)}:{word_vectors.vector_size}".encode('utf-8'))
+    sample = list(range(min(100, len(keys)))) + list(range(max(0, len(keys) - 100), len(keys)))
+    for index in dict.fromkeys(sample):
+        digest.update(str(keys[index]).encode('utf-8'))
+        digest.update(word_vectors[keys[index]].tobytes())
+    fingerprint = digest.hexdigest()[:16]
+    try:
+        word_vectors._bili_fingerprint = fingerprint
+    except AttributeError:
+        pass
+    return fingerprint
+
+
+def convert_vec(vec_path=DEFAULT_VEC_FILE, kv_path=None):
+    """将文本格式词向量一次性转换为可内存映射的二进制缓存"""
+    from gensim.models import KeyedVectors
+
+    kv_path = kv_path or cache_path_for(vec_path)
+    print(f"正在转换词向量 {vec_path} -> {kv_path} ...")
+    start = time.time()
+    word_vectors = KeyedVectors.load_word2vec_format(vec_path)
+    save_vectors(word_vectors, kv_path, {"signature": _source_signature(vec_path)})
+    print(f"词向量转换完成，耗时 {time.time() - start:.1f} 秒")
+    return kv_path
+
+
+def load_word_vectors(vec_path=DEFAULT_VEC_FILE, mmap='r'):
+    """加载词向量模型
+
+    优先以只读内存映射方式加载二进制缓存，多个进程可共享同一份物理内存；
+    缓存缺失或过期时自动从文本文件重建。直接传入 .kv 文件时跳过转换，
+    传入 shared_vectors 导出的目录时连词表也以映射方式加载，无需导入gensim；
+    传入 category_lexicon 编译的词典目录时返回类别词典，分析器进入词典模式。
+    """
+    from category_lexicon import CategoryLexicon, is_lexicon_dir
+    from shared_vectors import is_shared_dir, open_shared
+
+    if is_lexicon_dir(vec_path):
+        word_vectors = CategoryLexicon(vec_path)
+        print(f"类别词典加载完成 ({vec_path})，{len(word_vectors)} 词")
+        return word_vectors
+    if is_shared_dir(vec_path):
+        start = time.time()
+        word_vectors = open_shared(vec_path)
+        print(f"共享词向量加载完成 ({vec_path})，耗时 {time.time() - start:.2f} 秒")
+        return word_vectors
+
+    from gensim.models import KeyedVectors
+
+    if vec_path.endswith(CACHE_SUFFIX):
+        kv_path = vec_path
+        meta = read_meta(kv_path)
+        # 没有文件记录的 .kv 不是由当前的 save_vectors 写出的，直接加载
+        if meta is not None and meta.get("files") and not pieces_match(kv_path, meta):
+            raise Exception(f"词向量缓存 {kv_path} 不完整（保存时可能中断），请重新生成")
+    else:
+        kv_path = cache_path_for(vec_path)
+        if not is_cache_fresh(vec_path, kv_path):
+            if not os.path.exists(vec_path):
+                raise FileNotFoundError(f"未找到词向量文件: {vec_path}")
+            print("词向量二进制缓存不存在或已过期，开始重建...")
+            convert_vec(vec_path, kv_path)
+
+    start = time.time()
+    word_vectors = KeyedVectors.load(kv_path, mmap=mmap)
+    print(f"词向量缓存加载完成 ({kv_path})，耗时 {time.time() - start:.2f} 秒")
+    return word_vectors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="词向量二进制缓存工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="将 .vec 文本词向量转换为二进制缓存")
+    convert_parser.add_argument("vec_path", nargs="?", default=DEFAULT_VEC_FILE)
+    convert_parser.add_argument("--output", default=None, help="缓存文件路径，默认与 .vec 同名的 .kv 文件")
+
+    args = parser.parse_args()
+    if args.command == "convert":
+        convert_vec(args.vec_path, args.output)
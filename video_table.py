@@ -0,0 +1,356 @@
+import argparse
+import random
+import sys
+import time
+from collections import Counter
+import numpy as np
+from crawl_output import iter_jsonl, open_text, read_videos
+
+UNKNOWN = '未知'
+# 播放量分布区间：(名称, 下限, 上限)，可在分析时传入自定义区间
+PLAY_COUNT_BUCKETS = [
+    ('10万+', 100000, float('inf')),
+    ('1万-10万', 10000, 100000),
+    ('1千-1万', 1000, 10000),
+    ('1千以下', float('-inf'), 1000)
+]
+# 画像中给出的播放量分位数
+PLAY_COUNT_PERCENTILES = (25, 50, 75, 90, 99)
+# 增量统计时最多保存这么多个原始播放量用于精确计算分位数，超过后改用对数直方图估算
+EXACT_PLAY_LIMIT = 1_000_000
+# 估算分位数用的对数分桶：0 到 1 一个桶，1 到 100亿每个桶约相差6%
+PLAY_SKETCH_EDGES = np.concatenate([[0.0], np.logspace(0, 10, 401)])
+
+
+def convert_play_count(count):
+    """将 "12.3万" 这类播放量字符串转换为数值"""
+    if isinstance(count, (int, float)) and not isinstance(count, bool):
+        return float(count)
+    if isinstance(count, str):
+        if '万' in count:
+            try:
+                return float(count.replace('万', '')) * 10000
+            except ValueError:
+                return 0
+        try:
+            return float(count)
+        except ValueError:
+            return 0
+    return 0
+
+
+def play_count_bucket(count, buckets=PLAY_COUNT_BUCKETS):
+    """返回播放量所属的区间名称"""
+    for label, low, high in buckets:
+        if low <= count < high:
+            return label
+    return buckets[-1][0]
+
+
+def bucket_counts(values, buckets=PLAY_COUNT_BUCKETS):
+    """统计播放量数组落在各区间的数量，每个值只计入第一个匹配的区间，与 play_count_bucket 一致"""
+    distribution = {}
+    remaining = np.ones(len(values), dtype=bool)
+    for label, low, high in buckets:
+        matched = remaining & (values >= low) & (values < high)
+        distribution[label] = int(matched.sum())
+        remaining &= ~matched
+    if remaining.any():
+        distribution[buckets[-1][0]] += int(remaining.sum())
+    return distribution
+
+
+def play_stats(known, buckets=PLAY_COUNT_BUCKETS, percentiles=PLAY_COUNT_PERCENTILES):
+    """由已知播放量数组计算平均值、最大值、区间分布和分位数，数组为空时返回None"""
+    known = np.asarray(known, dtype=np.float64)
+    if not len(known):
+        return None
+    return {
+        '平均播放量': float(known.mean()),
+        '最高播放量': int(known.max()),
+        '播放量分布': bucket_counts(known, buckets),
+        '播放量分位数': {f"P{p}": int(value) for p, value in zip(percentiles, np.percentile(known, percentiles))}
+    }
+
+
+class PlayCounts:
+    """可逐批累加、可合并的播放量统计，结果与 play_stats 结构相同
+
+    平均值、最大值和区间分布始终精确。已知播放量不超过 exact_limit 个时保存原始值，
+    分位数直接用 play_stats 计算；超过后并入对数直方图，在所在桶内插值估算，内存占用不再增长。
+    """
+
+    def __init__(self, buckets=PLAY_COUNT_BUCKETS, exact_limit=EXACT_PLAY_LIMIT):
+        self.buckets = buckets
+        self.exact_limit = exact_limit
+        self.known = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.distribution = Counter({label: 0 for label, _, _ in buckets})
+        self._values = []
+        self._sketch = None
+
+    def add(self, values):
+        """加入一批已知播放量"""
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        self.known += len(values)
+        self.total += float(values.sum())
+        self.max = max(self.max, float(values.max()))
+        self.distribution.update(bucket_counts(values, self.buckets))
+        if self._sketch is None:
+            self._values.append(values)
+            if self.known > self.exact_limit:
+                self._to_sketch()
+        else:
+            self._sketch += self._histogram(values)
+
+    @staticmethod
+    def _histogram(values):
+        clipped = np.clip(values, PLAY_SKETCH_EDGES[0], PLAY_SKETCH_EDGES[-1])
+        return np.histogram(clipped, PLAY_SKETCH_EDGES)[0]
+
+    def _to_sketch(self):
+        self._sketch = np.zeros(len(PLAY_SKETCH_EDGES) - 1, dtype=np.int64)
+        for values in self._values:
+            self._sketch += self._histogram(values)
+        self._values = []
+
+    def merge(self, other):
+        """合并另一个统计结果，两者应使用相同的区间"""
+        self.known += other.known
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self.distribution.update(other.distribution)
+        if self._sketch is None and other._sketch is None and self.known <= self.exact_limit:
+            self._values.extend(other._values)
+            return self
+        if self._sketch is None:
+            self._to_sketch()
+        if other._sketch is not None:
+            self._sketch += other._sketch
+        for values in other._values:
+            self._sketch += self._histogram(values)
+        return self
+
+    @property
+    def exact(self):
+        """分位数是否为精确值"""
+        return self._sketch is None
+
+    def _estimate_percentiles(self, percentiles):
+        cumulative = np.cumsum(self._sketch)
+        estimates = {}
+        for p in percentiles:
+            target = p / 100 * self.known
+            index = min(int(np.searchsorted(cumulative, target)), len(cumulative) - 1)
+            before = cumulative[index - 1] if index else 0
+            inside = self._sketch[index]
+            fraction = (target - before) / inside if inside else 0.0
+            low, high = PLAY_SKETCH_EDGES[index], PLAY_SKETCH_EDGES[index + 1]
+            estimates[f"P{p}"] = int(min(low + (high - low) * fraction, self.max))
+        return estimates
+
+    def stats(self, percentiles=PLAY_COUNT_PERCENTILES):
+        """平均值、最大值、区间分布和分位数，没有已知播放量时返回None"""
+        if not self.known:
+            return None
+        if self._sketch is None:
+            # 合并成一个数组，之后再次统计时不必重复拼接
+            self._values = [np.concatenate(self._values)]
+            return play_stats(self._values[0], self.buckets, percentiles)
+        return {
+            '平均播放量': self.total / self.known,
+            '最高播放量': int(self.max),
+            '播放量分布': {label: self.distribution[label] for label, _, _ in self.buckets},
+            '播放量分位数': self._estimate_percentiles(percentiles)
+        }
+
+
+def make_buckets(edges, unit=10000, unit_name='万'):
+    """由递增的分界点生成播放量区间，如 [1000, 10000] -> 1万+ / 1000-1万 / 1000以下"""
+    def fmt(value):
+        return f"{value / unit:g}{unit_name}" if value >= unit else f"{value:g}"
+
+    edges = sorted(edges)
+    bounds = [float('-inf')] + list(edges) + [float('inf')]
+    buckets = []
+    for low, high in zip(bounds[:-1], bounds[1:]):
+        if low == float('-inf'):
+            label = f"{fmt(high)}以下"
+        elif high == float('inf'):
+            label = f"{fmt(low)}+"
+        else:
+            label = f"{fmt(low)}-{fmt(high)}"
+        buckets.append((label, low, high))
+    return buckets[::-1]
+
+
+class StringColumn:
+    """UTF-8 编码后连续存放的字符串列
+
+    所有字符串拼成一个字节数组，再用偏移数组定位，每条只占编码后的字节数加8字节偏移，
+    比逐个保存Python字符串对象省得多。按下标访问时才解码。
+    """
+
+    def __init__(self, buffer, offsets):
+        self._buffer = buffer
+        self._offsets = offsets
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [(value or '').encode('utf-8') for value in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        start, end = self._offsets[index], self._offsets[index + 1]
+        return self._buffer[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    @property
+    def nbytes(self):
+        return self._buffer.nbytes + self._offsets.nbytes
+
+
+class VideoTable:
+    """列式存储的视频数据
+
+    只保留分析用到的字段：标题和链接为 StringColumn，UP主为分类编码（-1 表示未知），
+    播放量在加载时一次性解析为float64（NaN 表示未知）。
+    按下标或切片访问时返回与原来相同字段的字典，画像中的统计直接在数组上计算。
+    """
+
+    def __init__(self, titles, links, up_codes, up_names, play_counts):
+        self.titles = titles
+        self.links = links
+        self.up_codes = up_codes
+        self.up_names = up_names
+        self.play_counts = play_counts
+
+    @classmethod
+    def from_videos(cls, videos):
+        """由视频字典序列构建，只遍历一遍"""
+        titles, links, up_codes, play_counts = [], [], [], []
+        up_index = {}
+        for video in videos:
+            titles.append(video.get('title') or '')
+            links.append(video.get('link') or '')
+            up_name = video.get('up_name')
+            if up_name and up_name != UNKNOWN:
+                up_codes.append(up_index.setdefault(up_name, len(up_index)))
+            else:
+                up_codes.append(-1)
+            play_count = video.get('play_count', UNKNOWN)
+            play_counts.append(np.nan if play_count == UNKNOWN or play_count is None else convert_play_count(play_count))
+        return cls(StringColumn.from_strings(titles), StringColumn.from_strings(links),
+                   np.array(up_codes, dtype=np.int32), list(up_index),
+                   np.array(play_counts, dtype=np.float64))
+
+    @classmethod
+    def load(cls, path):
+        """加载视频数据文件，JSON Lines 文件逐行构建，不先生成完整的字典列表"""
+        with open_text(path) as f:
+            is_array = f.read(64).lstrip().startswith('[')
+        return cls.from_videos(read_videos(path) if is_array else iter_jsonl(path))
+
+    def __len__(self):
+        return len(self.titles)
+
+    def row(self, index):
+        code = int(self.up_codes[index])
+        play_count = self.play_counts[index]
+        return {
+            'title': self.titles[index],
+            'link': self.links[index],
+            'up_name': self.up_names[code] if code >= 0 else UNKNOWN,
+            'play_count': UNKNOWN if np.isnan(play_count) else float(play_count)
+        }
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self.row(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.row(index)
+
+    def known_play_counts(self):
+        """已知的播放量数组"""
+        return self.play_counts[~np.isnan(self.play_counts)]
+
+    @property
+    def nbytes(self):
+        """各列数组占用的字节数（不含UP主名称表）"""
+        return self.titles.nbytes + self.links.nbytes + self.up_codes.nbytes + self.play_counts.nbytes
+
+    def up_counts(self):
+        """各UP主的视频数，未知UP主不计入"""
+        counts = np.bincount(self.up_codes[self.up_codes >= 0], minlength=len(self.up_names))
+        return Counter({self.up_names[code]: int(count) for code, count in enumerate(counts) if count})
+
+    def play_stats(self, buckets=PLAY_COUNT_BUCKETS, percentiles=PLAY_COUNT_PERCENTILES):
+        """播放量的平均值、最大值、区间分布和分位数，没有已知播放量时返回None"""
+        return play_stats(self.known_play_counts(), buckets, percentiles)
+
+
+def _synthetic_videos(count):
+    """基准测试用的随机视频"""
+    rng = random.Random(0)
+    ups = [f"UP主{i}" for i in range(max(1, count // 20))]
+    videos = []
+    for i in range(count):
+        plays = rng.choice([f"{rng.randint(1, 999)}", f"{rng.uniform(1, 500):.1f}万", UNKNOWN])
+        videos.append({
+            'title': f"测试视频标题{i} 编程教程 游戏实况 美食vlog",
+            'thumbnail': f"https://i0.hdslb.com/bfs/archive/{i:032x}.jpg",
+            'link': f"https://www.bilibili.com/video/BV{i:010d}",
+            'up_name': rng.choice(ups),
+            'up_link': f"https://space.bilibili.com/{i}",
+            'play_count': plays
+        })
+    return videos
+
+
+def _deep_size(videos):
+    """估算字典列表占用的内存"""
+    size = sys.getsizeof(videos)
+    for video in videos:
+        size += sys.getsizeof(video) + sum(sys.getsizeof(value) for value in video.values())
+    return size
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="列式视频表的内存占用和画像统计耗时")
+    parser.add_argument("--data", default=None, help="视频数据文件，默认生成随机视频")
+    parser.add_argument("--count", type=int, default=100000, help="随机生成的视频数")
+    args = parser.parse_args()
+
+    videos = read_videos(args.data) if args.data else _synthetic_videos(args.count)
+    if not videos:
+        sys.exit("没有视频数据")
+    start = time.perf_counter()
+    table = VideoTable.from_videos(videos)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    table.up_counts()
+    table.play_stats()
+    stats_seconds = time.perf_counter() - start
+    print(f"视频数: {len(table)}，构建耗时 {build_seconds:.3f} 秒")
+    print(f"字典列表约 {_deep_size(videos) / len(videos):.0f} 字节/视频，列式表约 {table.nbytes / len(table):.0f} 字节/视频")
+    print(f"UP主分布与播放量统计耗时 {stats_seconds * 1000:.1f} 毫秒")
@@ -0,0 +1,126 @@
+import argparse
+import os
+import time
+import numpy as np
+import jieba
+from bilibili_analyzer import CATEGORY_KEYWORDS
+from crawl_output import latest_videos_path, read_videos
+from vector_store import DEFAULT_VEC_FILE, load_word_vectors, save_vectors
+
+# 裁剪后词向量子集的默认输出路径
+DEFAULT_SUBSET_FILE = 'wiki.zh.pruned.kv'
+
+
+def jieba_dictionary_words(top_n):
+    """按词频从高到低返回jieba主词典中的前 top_n 个词"""
+    entries = []
+    with jieba.get_dict_file() as f:
+        for line in f:
+            parts = line.decode('utf-8').strip().split(' ')
+            if len(parts) >= 2:
+                try:
+                    entries.append((parts[0], int(parts[1])))
+                except ValueError:
+                    continue
+    entries.sort(key=lambda x: x[1], reverse=True)
+    return [word for word, _ in entries[:top_n]]
+
+
+def category_words(category_keywords=CATEGORY_KEYWORDS):
+    """所有类别的核心词和相关词"""
+    words = []
+    for keywords in category_keywords.values():
+        words.extend(keywords['core'])
+        words.extend(keywords['related'])
+    return list(dict.fromkeys(words))
+
+
+def crawled_title_words(json_files):
+    """统计已爬取视频标题和UP主名称中出现的词及其出现次数，支持 JSON、JSON Lines 及 .gz 归档"""
+    counts = {}
+    for json_file in json_files:
+        if not os.path.exists(json_file):
+            print(f"跳过不存在的数据文件: {json_file}")
+            continue
+        for video in read_videos(json_file):
+            text = f"{video.get('title', '')} {video.get('up_name', '')}"
+            for word in jieba.lcut(text):
+                word = word.strip()
+                if word:
+                    counts[word] = counts.get(word, 0) + 1
+    return counts
+
+
+def _coverage(words, word_vectors):
+    found = sum(1 for word in words if word in word_vectors)
+    return {
+        "total": len(words),
+        "found": found,
+        "ratio": round(found / len(words), 4) if words else 0
+    }
+
+
+def build_subset(vec_path=DEFAULT_VEC_FILE, output=DEFAULT_SUBSET_FILE, jieba_top=100000, json_files=None):
+    """构建只包含任务相关词汇的精简词向量文件，并返回覆盖率统计"""
+    from gensim.models import KeyedVectors
+
+    start = time.time()
+    source = load_word_vectors(vec_path)
+
+    dict_words = jieba_dictionary_words(jieba_top)
+    cat_words = category_words()
+    title_counts = crawled_title_words(json_files or [latest_videos_path()])
+
+    vocabulary = list(dict.fromkeys(cat_words + list(title_counts) + dict_words))
+    indices = sorted(source.key_to_index[word] for word in vocabulary if word in source)
+    # 按原始索引顺序读取，内存映射下可以顺序访问磁盘
+    keys = [source.index_to_key[i] for i in indices]
+    subset = KeyedVectors(source.vector_size, dtype=np.float32)
+    subset.add_vectors(keys, np.asarray(source.vectors[indices], dtype=np.float32))
+
+    title_tokens = sum(title_counts.values())
+    covered_tokens = sum(count for word, count in title_counts.items() if word in subset)
+    stats = {
+        "source_vocab_size": len(source.index_to_key),
+        "subset_vocab_size": len(keys),
+        "subset_ratio": round(len(keys) / len(source.index_to_key), 4) if source.index_to_key else 0,
+        "subset_size_mb": round(len(keys) * source.vector_size * 4 / 1024 / 1024, 1),
+        "jieba_dictionary": _coverage(dict_words, source),
+        "category_keywords": _coverage(cat_words, source),
+        "category_missing": [word for word in cat_words if word not in source],
+        "title_words": _coverage(list(title_counts), source),
+        "title_token_coverage": round(covered_tokens / title_tokens, 4) if title_tokens else 0
+    }
+
+    save_vectors(subset, output, {
+        "source": os.path.basename(vec_path),
+        "source_vocab_size": stats["source_vocab_size"],
+        "jieba_top": jieba_top,
+        "coverage": stats
+    })
+    print(f"精简词向量已保存到 {output}，耗时 {time.time() - start:.1f} 秒")
+    return stats
+
+
+def print_stats(stats):
+    """打印覆盖率统计"""
+    print("\n=== 词向量子集统计 ===")
+    print(f"原始词表: {stats['source_vocab_size']} 词")
+    print(f"子集词表: {stats['subset_vocab_size']} 词 ({stats['subset_ratio'] * 100:.1f}%)，约 {stats['subset_size_mb']} MB")
+    for name, label in [('jieba_dictionary', 'jieba词典'), ('category_keywords', '类别关键词'), ('title_words', '标题词汇')]:
+        item = stats[name]
+        print(f"{label}覆盖率: {item['found']}/{item['total']} ({item['ratio'] * 100:.1f}%)")
+    print(f"标题词频覆盖率: {stats['title_token_coverage'] * 100:.1f}%")
+    if stats['category_missing']:
+        print(f"词向量中缺失的类别关键词: {', '.join(stats['category_missing'])}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="构建任务相关的精简词向量子集")
+    parser.add_argument("--source", default=DEFAULT_VEC_FILE, help="完整词向量文件(.vec 或 .kv)")
+    parser.add_argument("--output", default=DEFAULT_SUBSET_FILE, help="输出的 .kv 文件")
+    parser.add_argument("--jieba-top", type=int, default=100000, help="按词频保留jieba词典中的前N个词")
+    parser.add_argument("--data", nargs="*", default=None, help="已爬取的视频数据文件(.json、.jsonl 或 .gz)，默认使用最新的爬取结果")
+    args = parser.parse_args()
+
+    print_stats(build_subset(args.source, args.output, args.jieba_top, args.data))
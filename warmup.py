@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+# 进程启动时间，各项耗时指标都相对于它计算
+PROCESS_START = time.time()
+# 可预热的组件：jieba词典、词向量模型、浏览器池
+COMPONENTS = ('jieba', 'vectors', 'driver')
+
+
+class Warmup:
+    """服务启动预热
+
+    每个组件在独立的后台线程中加载，状态和耗时可通过 status() 查询。
+    未启用预热的组件在首次使用时通过 ensure() 按需加载。
+    启用哪些组件由环境变量 BILI_WARMUP 指定（逗号分隔），默认全部启用。
+    """
+
+    def __init__(self, enabled=None):
+        if enabled is None:
+            enabled = os.environ.get('BILI_WARMUP', ','.join(COMPONENTS))
+        if isinstance(enabled, str):
+            enabled = [name.strip() for name in enabled.split(',')]
+        self.enabled = {name for name in enabled if name}
+        self.components = {}
+        self.metrics = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, func):
+        """注册一个组件的加载函数"""
+        self._tasks[name] = func
+        self.components[name] = {
+            'state': 'pending' if name in self.enabled else 'skipped',
+            'started_at': None,
+            'seconds': None,
+            'error': None
+        }
+
+    def start(self):
+        """在后台启动所有启用的组件"""
+        for name in self._tasks:
+            if name in self.enabled:
+                self.ensure(name)
+
+    def ensure(self, name, wait=False):
+        """确保组件已开始加载，wait 为True时等待加载结束"""
+        with self._lock:
+            component = self.components[name]
+            thread = component.get('thread')
+            if thread is None:
+                component['state'] = 'running'
+                component['started_at'] = round(time.time() - PROCESS_START, 3)
+                thread = threading.Thread(target=self._run, args=(name,), daemon=True)
+                component['thread'] = thread
+                thread.start()
+        if wait:
+            thread.join()
+        return self.components[name]['state']
+
+    def _run(self, name):
+        start = time.time()
+        try:
+            self._tasks[name]()
+            state, error = 'ready', None
+        except Exception as e:
+            state, error = 'error', str(e)
+            print(f"预热 {name} 失败: {e}")
+        with self._lock:
+            component = self.components[name]
+            component['state'] = state
+            component['error'] = error
+            component['seconds'] = round(time.time() - start, 3)
+        print(f"预热 {name} 完成，耗时 {time.time() - start:.2f} 秒")
+
+    def mark(self, metric):
+        """记录某个事件第一次发生时距进程启动的秒数，如首次请求、首次分析"""
+        with self._lock:
+            if metric not in self.metrics:
+                self.metrics[metric] = round(time.time() - PROCESS_START, 3)
+
+    def status(self):
+        """各组件的加载状态和耗时指标"""
+        with self._lock:
+            components = {
+                name: {key: value for key, value in component.items() if key != 'thread'}
+                for name, component in self.components.items()
+            }
+            return {'components': components, 'metrics': dict(self.metrics)}